@@ -0,0 +1,70 @@
+import logging
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIRECTORY = Path(__file__).parent / "fixtures"
+
+REPORT_CSV = "claim_id,status,amount\n" + "".join(
+    f"CLM-{i:06d},{['Paid', 'Pending', 'Denied'][i % 3]},{(i * 37) % 1000}.00\n"
+    for i in range(500)
+)
+
+
+class FixtureRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the HTML fixtures, a generated download under /files/, and answers every
+    POST with an empty JSON object so the engine's server calls stay local.
+    """
+
+    def do_GET(self):
+        if self.path.startswith("/files/"):
+            body = REPORT_CSV.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.send_header("Content-Disposition", 'attachment; filename="report.csv"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        super().do_GET()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"Fixture server: {format % args}")
+
+
+class FixtureServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        handler = partial(FixtureRequestHandler, directory=str(FIXTURES_DIRECTORY))
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Fixture server listening on {self.base_url}")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
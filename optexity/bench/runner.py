@@ -0,0 +1,370 @@
+import asyncio
+import json
+import logging
+import shutil
+import statistics
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import psutil
+from pydantic import BaseModel, Field
+
+from optexity.bench.fixture_server import FixtureServer
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CASES_DIRECTORY = Path(__file__).parent / "cases"
+
+COMPARED_METRICS = [
+    "end_to_end_seconds",
+    "overhead_seconds",
+    "cpu_seconds",
+    "peak_rss_mb",
+]
+## Changes below these are treated as noise, whatever the relative change
+ABSOLUTE_TOLERANCE = {
+    "end_to_end_seconds": 0.05,
+    "overhead_seconds": 0.05,
+    "cpu_seconds": 0.05,
+    "peak_rss_mb": 5.0,
+}
+
+
+class BenchCase(BaseModel):
+    name: str
+    description: str = ""
+    ## Automation JSON, `{base_url}` is replaced with the fixture server URL
+    automation: dict
+    ## Stub LLM responses keyed by response schema name
+    llm_responses: dict[str, dict] = Field(default_factory=dict)
+
+
+class StepResult(BaseModel):
+    step_index: int
+    seconds: float
+    sleep_seconds: float
+
+
+class RunResult(BaseModel):
+    status: str
+    error: str | None = None
+    browser_start_seconds: float
+    end_to_end_seconds: float
+    task_seconds: float
+    sleep_seconds: float
+    overhead_seconds: float
+    llm_calls: int
+    cpu_seconds: float
+    peak_rss_mb: float
+    steps: list[StepResult] = Field(default_factory=list)
+
+
+class CaseSummary(BaseModel):
+    name: str
+    runs: list[RunResult] = Field(default_factory=list)
+    ## Median of every numeric RunResult field over the runs
+    median: dict[str, float] = Field(default_factory=dict)
+
+
+class BenchReport(BaseModel):
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    repeat: int
+    llm_latency_seconds: float
+    cases: dict[str, CaseSummary] = Field(default_factory=dict)
+
+
+class MetricComparison(BaseModel):
+    case: str
+    metric: str
+    baseline: float
+    current: float
+    relative_change: float
+    regressed: bool
+
+
+class ProcessTreeSampler:
+    """
+    Samples CPU time and RSS of this process and all its descendants (the browser
+    and the playwright driver) while a run is in progress.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.cpu_start: dict[int, float] = {}
+        self.cpu_last: dict[int, float] = {}
+        self.peak_rss_mb = 0.0
+        self.sampler: asyncio.Task | None = None
+
+    def sample(self):
+        rss = 0
+        for process in [self.process] + self.process.children(recursive=True):
+            try:
+                cpu_times = process.cpu_times()
+                rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            cpu = cpu_times.user + cpu_times.system
+            self.cpu_start.setdefault(process.pid, 0.0)
+            self.cpu_last[process.pid] = cpu
+        self.peak_rss_mb = max(self.peak_rss_mb, rss / (1024**2))
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.sample()
+        self.cpu_start = dict(self.cpu_last)
+        self.sampler = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.sampler is not None:
+            self.sampler.cancel()
+            try:
+                await self.sampler
+            except asyncio.CancelledError:
+                pass
+        self.sample()
+
+    @property
+    def cpu_seconds(self) -> float:
+        return sum(
+            self.cpu_last[pid] - self.cpu_start.get(pid, 0.0) for pid in self.cpu_last
+        )
+
+
+def load_cases(
+    cases_directory: Path, names: list[str] | None = None
+) -> list[BenchCase]:
+    cases = [
+        BenchCase.model_validate_json(path.read_text())
+        for path in sorted(cases_directory.glob("*.json"))
+    ]
+    if names:
+        cases = [case for case in cases if case.name in names]
+    return cases
+
+
+def summarize_trace(trace: dict) -> dict:
+    events = trace.get("traceEvents", [])
+    steps: dict[int, StepResult] = {}
+    task_seconds = 0.0
+    sleep_seconds = 0.0
+    llm_calls = 0
+
+    for event in events:
+        seconds = event["dur"] / 1e6
+        step_index = event["args"].get("step_index", -1)
+        if event["cat"] == "task":
+            task_seconds += seconds
+        elif event["cat"] == "node":
+            steps.setdefault(
+                step_index,
+                StepResult(step_index=step_index, seconds=0.0, sleep_seconds=0.0),
+            ).seconds += seconds
+        elif event["cat"] == "sleep":
+            sleep_seconds += seconds
+            if step_index in steps:
+                steps[step_index].sleep_seconds += seconds
+        elif event["cat"] == "llm":
+            llm_calls += 1
+
+    return {
+        "task_seconds": task_seconds,
+        "sleep_seconds": sleep_seconds,
+        "overhead_seconds": max(0.0, task_seconds - sleep_seconds),
+        "llm_calls": llm_calls,
+        "steps": sorted(steps.values(), key=lambda step: step.step_index),
+    }
+
+
+async def run_case(
+    case: BenchCase,
+    base_url: str,
+    save_directory: Path,
+    child_process_id: int,
+    headless: bool,
+    keep_data: bool,
+) -> RunResult:
+    from optexity.inference.core.run_automation import run_automation
+    from optexity.inference.infra.actual_browser import ActualBrowser
+    from optexity.inference.models.stub import StubLLMModel
+    from optexity.schema.automation import Automation
+    from optexity.schema.task import Task
+
+    automation = Automation.model_validate_json(
+        json.dumps(case.automation).replace("{base_url}", base_url)
+    )
+    task = Task(
+        task_id=str(uuid.uuid4()),
+        user_id="bench",
+        recording_id="bench",
+        endpoint_name=f"bench_{case.name}",
+        automation=automation,
+        input_parameters=automation.parameters.input_parameters,
+        secure_parameters=automation.parameters.secure_parameters,
+        unique_parameter_names=[],
+        created_at=datetime.now(timezone.utc),
+        status="queued",
+        api_key="bench",
+        save_directory=save_directory,
+    )
+    StubLLMModel.responses = case.llm_responses
+
+    ## Same lifecycle as a non dedicated task on the inference server
+    actual_browser = ActualBrowser(
+        channel=automation.browser_channel,
+        unique_child_arn=f"bench_{child_process_id}",
+        port=9222 + child_process_id,
+        headless=headless,
+    )
+    start = time.monotonic()
+    await actual_browser.start()
+    browser_start_seconds = time.monotonic() - start
+
+    sampler = ProcessTreeSampler()
+    try:
+        sampler.start()
+        start = time.monotonic()
+        await run_automation(task, f"bench_{child_process_id}", child_process_id)
+        end_to_end_seconds = time.monotonic() - start
+        await sampler.stop()
+    finally:
+        await actual_browser.stop(graceful=True)
+
+    trace_path = task.logs_directory / "trace.json"
+    trace = json.loads(trace_path.read_text()) if trace_path.exists() else {}
+    result = RunResult(
+        status=task.status,
+        error=task.error,
+        browser_start_seconds=browser_start_seconds,
+        end_to_end_seconds=end_to_end_seconds,
+        cpu_seconds=sampler.cpu_seconds,
+        peak_rss_mb=sampler.peak_rss_mb,
+        **summarize_trace(trace),
+    )
+
+    if not keep_data:
+        shutil.rmtree(task.task_directory, ignore_errors=True)
+    return result
+
+
+def median_of_runs(runs: list[RunResult]) -> dict[str, float]:
+    metrics = [
+        name
+        for name, field in RunResult.model_fields.items()
+        if field.annotation in (float, int)
+    ]
+    return {
+        name: statistics.median(getattr(run, name) for run in runs) for name in metrics
+    }
+
+
+async def run_bench(
+    cases: list[BenchCase],
+    repeat: int = 3,
+    headless: bool = True,
+    llm_latency_seconds: float = 0.0,
+    child_process_id: int = 0,
+    save_directory: Path = Path("/tmp/optexity_bench"),
+    keep_data: bool = False,
+) -> BenchReport:
+    from optexity.inference.models.stub import StubLLMModel
+
+    server = FixtureServer()
+    server.start()
+
+    ## Keep every server call and LLM call local and deterministic
+    settings.SERVER_URL = server.base_url
+    settings.LOCAL_CALLBACK_URL = None
+    settings.LLM_BACKEND = "stub"
+    StubLLMModel.latency_seconds = llm_latency_seconds
+
+    report = BenchReport(repeat=repeat, llm_latency_seconds=llm_latency_seconds)
+    try:
+        for case in cases:
+            summary = CaseSummary(name=case.name)
+            for run_index in range(repeat):
+                logger.info(
+                    f"Running bench case {case.name} ({run_index + 1}/{repeat})"
+                )
+                result = await run_case(
+                    case,
+                    server.base_url,
+                    save_directory,
+                    child_process_id,
+                    headless,
+                    keep_data,
+                )
+                if result.status != "success":
+                    logger.warning(
+                        f"Bench case {case.name} finished with status {result.status}: {result.error}"
+                    )
+                summary.runs.append(result)
+            summary.median = median_of_runs(summary.runs)
+            report.cases[case.name] = summary
+    finally:
+        server.stop()
+
+    return report
+
+
+def compare_reports(
+    baseline: BenchReport, current: BenchReport, threshold: float = 0.1
+) -> list[MetricComparison]:
+    comparisons = []
+    for name, summary in current.cases.items():
+        if name not in baseline.cases:
+            continue
+        for metric in COMPARED_METRICS:
+            base_value = baseline.cases[name].median.get(metric)
+            current_value = summary.median.get(metric)
+            if base_value is None or current_value is None:
+                continue
+            change = current_value - base_value
+            relative_change = change / base_value if base_value > 0 else 0.0
+            comparisons.append(
+                MetricComparison(
+                    case=name,
+                    metric=metric,
+                    baseline=base_value,
+                    current=current_value,
+                    relative_change=relative_change,
+                    regressed=relative_change > threshold
+                    and change > ABSOLUTE_TOLERANCE.get(metric, 0.0),
+                )
+            )
+    return comparisons
+
+
+def format_report(report: BenchReport) -> str:
+    lines = [
+        f"{'case':<14}{'status':>10}{'e2e s':>10}{'overhead s':>12}{'sleep s':>10}{'llm':>6}{'cpu s':>10}{'rss MB':>10}"
+    ]
+    for name, summary in report.cases.items():
+        statuses = {run.status for run in summary.runs}
+        status = statuses.pop() if len(statuses) == 1 else "mixed"
+        median = summary.median
+        lines.append(
+            f"{name:<14}{status:>10}{median['end_to_end_seconds']:>10.2f}"
+            f"{median['overhead_seconds']:>12.2f}{median['sleep_seconds']:>10.2f}"
+            f"{median['llm_calls']:>6.0f}{median['cpu_seconds']:>10.2f}"
+            f"{median['peak_rss_mb']:>10.0f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(comparisons: list[MetricComparison]) -> str:
+    lines = [f"{'case':<14}{'metric':<22}{'baseline':>10}{'current':>10}{'change':>10}"]
+    for comparison in comparisons:
+        flag = "  REGRESSION" if comparison.regressed else ""
+        lines.append(
+            f"{comparison.case:<14}{comparison.metric:<22}{comparison.baseline:>10.2f}"
+            f"{comparison.current:>10.2f}{comparison.relative_change:>+10.1%}{flag}"
+        )
+    return "\n".join(lines)
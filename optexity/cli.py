@@ -3,6 +3,7 @@ import logging
 import os
 import subprocess
 import sys
+from pathlib import Path
 
 from dotenv import load_dotenv
 from uvicorn import run
@@ -43,6 +44,66 @@ def run_inference(args: argparse.Namespace) -> None:
     )
 
 
+def run_bench(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from optexity.bench.runner import format_report, load_cases
+    from optexity.bench.runner import run_bench as _run_bench
+
+    cases = load_cases(Path(args.cases), args.case)
+    if len(cases) == 0:
+        print("❌ No bench cases found", file=sys.stderr)
+        sys.exit(1)
+
+    report = asyncio.run(
+        _run_bench(
+            cases,
+            repeat=args.repeat,
+            headless=not args.headed,
+            llm_latency_seconds=args.llm_latency,
+            child_process_id=args.child_process_id,
+            keep_data=args.keep_data,
+        )
+    )
+    Path(args.output).write_text(report.model_dump_json(indent=2))
+    print(format_report(report))
+    print(f"Report saved to {args.output}")
+
+
+def compare_bench(args: argparse.Namespace) -> None:
+    from optexity.bench.runner import BenchReport, compare_reports, format_comparison
+
+    baseline = BenchReport.model_validate_json(Path(args.baseline).read_text())
+    current = BenchReport.model_validate_json(Path(args.current).read_text())
+    comparisons = compare_reports(baseline, current, args.threshold)
+    print(format_comparison(comparisons))
+
+    if any(comparison.regressed for comparison in comparisons):
+        print("❌ Regressions found", file=sys.stderr)
+        sys.exit(1)
+
+
+def run_replay(args: argparse.Namespace) -> None:
+    import asyncio
+
+    from optexity.inference.core.replay import format_replay_report, replay_trajectory
+
+    report = asyncio.run(
+        replay_trajectory(
+            Path(args.trajectory),
+            headless=not args.headed,
+            replay_network=not args.live_network,
+            child_process_id=args.child_process_id,
+        )
+    )
+    Path(args.output).write_text(report.model_dump_json(indent=2))
+    print(format_replay_report(report))
+    print(f"Report saved to {args.output}")
+
+    if len(report.divergent_steps) > 0:
+        sys.exit(1)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(prog="optexity")
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -74,6 +135,64 @@ def main() -> None:
 
     inference_cmd.set_defaults(func=run_inference)
 
+    # ---------------------------
+    # bench
+    # ---------------------------
+    bench_cmd = subparsers.add_parser(
+        "bench", help="Benchmark the engine against local fixture sites"
+    )
+    bench_subparsers = bench_cmd.add_subparsers(dest="bench_command", required=True)
+
+    bench_run_cmd = bench_subparsers.add_parser("run", help="Run the bench cases")
+    bench_run_cmd.add_argument(
+        "--cases", default=str(Path(__file__).parent / "bench" / "cases")
+    )
+    bench_run_cmd.add_argument(
+        "--case", action="append", help="Only run the named case, can be repeated"
+    )
+    bench_run_cmd.add_argument("--repeat", type=int, default=3)
+    bench_run_cmd.add_argument("--output", default="bench_report.json")
+    bench_run_cmd.add_argument(
+        "--llm_latency", "--llm-latency", type=float, default=0.0
+    )
+    bench_run_cmd.add_argument(
+        "--child_process_id", "--child-process-id", type=int, default=0
+    )
+    bench_run_cmd.add_argument("--headed", action="store_true", default=False)
+    bench_run_cmd.add_argument(
+        "--keep_data", "--keep-data", action="store_true", default=False
+    )
+    bench_run_cmd.set_defaults(func=run_bench)
+
+    bench_compare_cmd = bench_subparsers.add_parser(
+        "compare", help="Compare two bench reports and flag regressions"
+    )
+    bench_compare_cmd.add_argument("baseline")
+    bench_compare_cmd.add_argument("current")
+    bench_compare_cmd.add_argument("--threshold", type=float, default=0.1)
+    bench_compare_cmd.set_defaults(func=compare_bench)
+
+    # ---------------------------
+    # replay
+    # ---------------------------
+    replay_cmd = subparsers.add_parser(
+        "replay", help="Replay a recorded trajectory and report divergences"
+    )
+    replay_cmd.add_argument("trajectory", help="Task directory or its logs directory")
+    replay_cmd.add_argument("--output", default="replay_report.json")
+    replay_cmd.add_argument(
+        "--live_network",
+        "--live-network",
+        action="store_true",
+        default=False,
+        help="Load pages from the live sites instead of the recorded traffic",
+    )
+    replay_cmd.add_argument(
+        "--child_process_id", "--child-process-id", type=int, default=0
+    )
+    replay_cmd.add_argument("--headed", action="store_true", default=False)
+    replay_cmd.set_defaults(func=run_replay)
+
     args = parser.parse_args()
     args.func(args)
 
@@ -1,14 +1,17 @@
 import logging
+import re
 from typing import Optional
 
 from pydantic import BaseModel, Field
 
 from optexity.inference.agents.index_prediction.prompt import system_prompt
-from optexity.inference.models import GeminiModels, get_llm_model
+from optexity.inference.models import GeminiModels, TieredModelRouter
 from optexity.schema.token_usage import TokenUsage
 
 logger = logging.getLogger(__name__)
 
+AXTREE_INDEX_PATTERN = re.compile(r"\[(\d+)\]<([A-Za-z0-9_-]+)")
+
 
 class IndexPredictionOutput(BaseModel):
     index: int = Field(
@@ -16,12 +19,24 @@ class IndexPredictionOutput(BaseModel):
     )
 
 
+def get_axtree_index_tags(axtree: str) -> dict[int, str]:
+    return {
+        int(index): tag.lower() for index, tag in AXTREE_INDEX_PATTERN.findall(axtree)
+    }
+
+
 class ActionPredictionLocatorAxtree:
     def __init__(self):
-        self.model = get_llm_model(GeminiModels.GEMINI_2_5_FLASH, True)
+        self.model = TieredModelRouter(
+            [GeminiModels.GEMINI_2_5_FLASH_LITE, GeminiModels.GEMINI_2_5_FLASH], True
+        )
 
     def predict_action(
-        self, goal: str, axtree: str, screenshot: Optional[str] = None
+        self,
+        goal: str,
+        axtree: str,
+        screenshot: Optional[str] = None,
+        expected_tags: Optional[list[str]] = None,
     ) -> tuple[str, IndexPredictionOutput, TokenUsage]:
 
         final_prompt = f"""
@@ -35,9 +50,19 @@ class ActionPredictionLocatorAxtree:
         [/INPUT]
         """
 
+        index_tags = get_axtree_index_tags(axtree)
+
+        def validate(response: IndexPredictionOutput) -> bool:
+            if response.index not in index_tags:
+                return False
+            if expected_tags is not None:
+                return index_tags[response.index] in expected_tags
+            return True
+
         response, token_usage = self.model.get_model_response_with_structured_output(
             prompt=final_prompt,
             response_schema=IndexPredictionOutput,
+            validate=validate,
             screenshot=screenshot,
             system_instruction=system_prompt,
         )
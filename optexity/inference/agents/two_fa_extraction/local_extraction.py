@@ -0,0 +1,58 @@
+import logging
+import re
+
+from optexity.schema.inference import Message
+
+logger = logging.getLogger(__name__)
+
+## A code right next to its keyword, e.g. "Your verification code is 123456", "OTP: 123-456"
+## or "123456 is your login code". Digits further away, like an account number, do not count,
+## and a code next to more digit groups, like "1234 5678", is left to the LLM.
+OTP_PATTERNS = [
+    re.compile(
+        r"(?:code|otp|passcode|password|pin|token)\b\s*(?:is\b\s*)?[:#=-]?\s*(?<![\d-])(?<!\d[ -])(\d{3}[- ]?\d{3}|\d{4,8})(?![\d-]|[ -]\d)",
+        re.IGNORECASE,
+    ),
+    re.compile(
+        r"(?<![\d-])(?<!\d[ -])(\d{3}[- ]?\d{3}|\d{4,8})(?![\d-]|[ -]\d)\s+is\s+(?:your|the)(?:\s+[a-z-]+){0,3}?\s+(?:code|otp|passcode|password|pin)\b",
+        re.IGNORECASE,
+    ),
+]
+
+
+def find_codes(text: str, code_regex: str | None = None) -> list[str]:
+    patterns = [re.compile(code_regex)] if code_regex is not None else OTP_PATTERNS
+    codes = []
+    for pattern in patterns:
+        for match in pattern.finditer(text):
+            code = match.group(1) if pattern.groups > 0 else match.group(0)
+            code = re.sub(r"[- ]", "", code) if code_regex is None else code
+            if code not in codes:
+                codes.append(code)
+    return codes
+
+
+def extract_code_locally(
+    messages: list[Message],
+    code_regex: str | None = None,
+    sender_regex: str | None = None,
+) -> str | None:
+    """
+    Returns the code in the newest message that contains one, if that message
+    holds exactly one distinct code. Anything ambiguous is left to the LLM.
+    """
+    for message in sorted(messages, key=lambda m: m.timestamp, reverse=True):
+        if (
+            sender_regex is not None
+            and message.sender is not None
+            and re.search(sender_regex, message.sender, re.IGNORECASE) is None
+        ):
+            continue
+
+        codes = find_codes(message.message_text, code_regex)
+        if len(codes) == 1:
+            return codes[0]
+        if len(codes) > 1:
+            logger.debug(f"Found several candidate 2FA codes {codes}, using the LLM")
+            return None
+    return None
@@ -4,9 +4,8 @@ import json
 import logging
 import os
 import pathlib
-import signal
-import subprocess
 import sys
+import time
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
@@ -16,15 +15,43 @@ from urllib.parse import urljoin
 import httpx
 import psutil
 from fastapi import Body, FastAPI
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from uvicorn import run
 
 from optexity.inference.core.logging import delete_local_data, save_trajectory_in_server
+from optexity.inference.core.task_dedup import (
+    deliver_cached_result,
+    get_coalesce_key,
+    task_deduplicator,
+)
+from optexity.inference.core.task_lifecycle import (
+    TaskLifecycleManager,
+    report_stopped_task,
+)
+from optexity.inference.core.task_scheduler import TaskScheduler
 from optexity.inference.infra.actual_browser import ActualBrowser
-from optexity.schema.inference import InferenceRequest
+from optexity.inference.infra.asset_cache import get_asset_cache
+from optexity.inference.infra.process_memory import (
+    BrowserRecyclePolicy,
+    ProcessTreeMemory,
+    sample_process_tree,
+)
+from optexity.schema.inference import CancelTaskRequest, InferenceRequest
 from optexity.schema.memory import SystemInfo
 from optexity.schema.task import Task
+from optexity.utils.metrics import (
+    BROWSER_RESTARTS_TOTAL,
+    BROWSER_RSS_MB,
+    MEMORY_HIGH_WATER_MB,
+    MEMORY_USED_MB,
+    TASK_DURATION_SECONDS,
+    TASK_QUEUE_DEPTH,
+    TASK_QUEUE_WAIT_SECONDS,
+    TASK_RUNNING,
+    TASKS_TOTAL,
+    metrics,
+)
 from optexity.utils.settings import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -39,14 +66,20 @@ child_process_id = -1
 unique_child_arn: str = str(uuid.uuid4())
 task_running = False
 last_task_start_time = None
-task_queue: asyncio.Queue[Task] = asyncio.Queue()
+task_queue = TaskScheduler()
+task_lifecycle = TaskLifecycleManager()
+## Deliveries of cached results run in the background of the request that asked
+cached_deliveries: set[asyncio.Task] = set()
 _global_actual_browser: ActualBrowser | None = None
+browser_recycle_policy = BrowserRecyclePolicy()
 
 
-def log_system_info(comment: str):
+async def log_system_info(comment: str) -> ProcessTreeMemory:
     logger.info("=" * 100 + "\n")
     logger.info(comment)
     system_info = SystemInfo()
+    MEMORY_USED_MB.set(system_info.total_system_memory_used)
+    MEMORY_HIGH_WATER_MB.set_max(system_info.total_system_memory_used)
     logger.info(
         json.dumps(
             {
@@ -70,37 +103,54 @@ def log_system_info(comment: str):
             }
         )
     )
+    ## The tree walk reads /proc for every Chrome process, keep it off the event loop
+    process_memory = await asyncio.to_thread(sample_process_tree, os.getpid())
+    BROWSER_RSS_MB.set(process_memory.browser_mb)
+    logger.info(
+        json.dumps(
+            {
+                "process_tree_memory": {
+                    name: round(value, 2)
+                    for name, value in process_memory.model_dump().items()
+                }
+            }
+        )
+    )
     logger.info("=" * 100 + "\n")
+    return process_memory
 
 
 async def setup_browser(task: Task, unique_child_arn: str, child_process_id: int):
     global _global_actual_browser
-    system_info = SystemInfo()
-    memory_exceeded = (
-        system_info.total_system_memory_used / system_info.total_system_memory > 0.6
-    )
-
     if _global_actual_browser is not None:
 
-        restart_browser = False
+        restart_reason = None
         if not await _global_actual_browser.check_browser_alive():
             logger.info("CDP is not alive, restarting browser")
-            restart_browser = True
+            restart_reason = "cdp_not_alive"
 
-        if memory_exceeded:
-            logger.info("Memory exceeded, restarting browser")
-            restart_browser = True
+        system_info = SystemInfo()
+        recycle_reason = browser_recycle_policy.get_restart_reason(
+            await asyncio.to_thread(sample_process_tree, os.getpid()),
+            system_info.total_system_memory_used / system_info.total_system_memory,
+            await _global_actual_browser.get_tab_count(),
+        )
+        if recycle_reason is not None:
+            logger.info(f"Recycling browser, reason: {recycle_reason}")
+            restart_reason = recycle_reason
 
         if not task.is_dedicated:
             logger.info("Previous browser was not dedicated, restarting browser")
-            restart_browser = True
+            restart_reason = "not_dedicated"
 
-        if restart_browser:
+        if restart_reason is not None:
+            BROWSER_RESTARTS_TOTAL.inc(reason=restart_reason)
             await _global_actual_browser.stop(graceful=True)
             _global_actual_browser = None
 
     if _global_actual_browser is None:
         logger.info("Starting new actual browser")
+        browser_recycle_policy.reset()
         _global_actual_browser = ActualBrowser(
             channel=task.automation.browser_channel,
             unique_child_arn=unique_child_arn,
@@ -132,59 +182,132 @@ async def run_automation_in_process(
     logger.info(
         f"---------- Starting to run automation for task {task.task_id} ----------\n"
     )
-    log_system_info("Memory info before starting browser")
+    await log_system_info("Memory info before starting browser")
 
     await setup_browser(task, unique_child_arn, child_process_id)
 
-    log_system_info("Memory info after starting browser")
+    await log_system_info("Memory info after starting browser")
 
     logger.debug("Running automation in process")
     worker_path = pathlib.Path(__file__).parent / "worker.py"
 
-    proc = await asyncio.create_subprocess_exec(
-        sys.executable,
-        worker_path,
-        task.model_dump_json(),
-        unique_child_arn,
-        str(child_process_id),
-        preexec_fn=os.setsid,
+    task.deadline_at = datetime.now(timezone.utc) + timedelta(
+        seconds=task.get_timeout_seconds()
     )
-
+    stop_reason = None
     try:
+        if task_lifecycle.is_cancelled(task.task_id):
+            logger.debug("Task cancelled before its worker started")
+            stop_reason = "cancelled"
+            return -2
+
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable,
+            worker_path,
+            task.model_dump_json(),
+            unique_child_arn,
+            str(child_process_id),
+            preexec_fn=os.setsid,
+        )
         logger.debug("Waiting for automation to finish")
-        # returncode = proc.wait(timeout=600)  # seconds
-        returncode = await asyncio.wait_for(proc.wait(), timeout=600)
+        returncode, stop_reason = await task_lifecycle.wait(task, proc)
+        if stop_reason == "timeout":
+            logger.debug("Automation timed out in process")
+            return -1
+        if stop_reason == "cancelled":
+            logger.debug("Automation cancelled in process")
+            return -2
         logger.debug("Automation finished in process")
         return returncode
-    except subprocess.TimeoutExpired:
-        logger.debug("Automation timed out in process")
-        os.killpg(proc.pid, signal.SIGKILL)
-        logger.debug("Automation killed in process")
-        return -1
     finally:
         logger.info(
             f"---------- Automation for task {task.task_id} finished ----------\n"
         )
-        log_system_info("Memory info after automation finished in process")
+        browser_recycle_policy.record_task(
+            await log_system_info("Memory info after automation finished in process")
+        )
 
-        if _global_actual_browser is not None and not task.is_dedicated:
-            logger.debug("Stopping actual browser as not dedicated")
+        ## A worker killed mid-run never reported its result
+        if stop_reason is not None and not task.result_path.exists():
+            await report_stopped_task(task, stop_reason, child_process_id)
+
+        ## The page state of a stopped run is unknown, so its browser is not reused
+        if _global_actual_browser is not None and (
+            not task.is_dedicated or stop_reason is not None
+        ):
+            logger.debug("Stopping actual browser as not dedicated or task stopped")
             try:
                 await _global_actual_browser.stop(graceful=True)
                 _global_actual_browser = None
             except Exception as e:
                 logger.error(f"Error stopping actual browser: {e}")
 
-        log_system_info("Memory info after stopping actual browser")
+        await log_system_info("Memory info after stopping actual browser")
 
         file_handler.flush()
         file_handler.close()
         logging.getLogger(current_module).removeHandler(file_handler)
 
+        ## LLM calls and worker-side uploads are recorded in the worker process
+        metrics.merge_snapshot_file(task.worker_metrics_path)
+        task.worker_metrics_path.unlink(missing_ok=True)
+        task_deduplicator.store_result(task)
+
         await save_trajectory_in_server(task)
         await delete_local_data(task)
 
 
+async def enqueue_task(task: Task):
+    """Queues a task unless a duplicate is in flight or was answered recently."""
+    decision = task_deduplicator.submit(task)
+    if decision == "cached":
+        cached = task_deduplicator.get_cached_result(get_coalesce_key(task))
+        delivery = asyncio.create_task(
+            deliver_cached_result(task, cached, unique_child_arn, child_process_id)
+        )
+        ## The loop only keeps weak references to tasks
+        cached_deliveries.add(delivery)
+        delivery.add_done_callback(cached_deliveries.discard)
+    elif decision == "run":
+        await task_queue.put(task)
+    TASK_QUEUE_DEPTH.set(task_queue.qsize())
+
+
+async def finish_deduplicated_task(task: Task):
+    cached, duplicates = task_deduplicator.complete(task)
+    for duplicate in duplicates:
+        if cached is not None:
+            await deliver_cached_result(
+                duplicate, cached, unique_child_arn, child_process_id
+            )
+        else:
+            await task_queue.put(duplicate)
+    task_deduplicator.evict_expired()
+    TASK_QUEUE_DEPTH.set(task_queue.qsize())
+
+
+async def cancel_task(task_id: str) -> str | None:
+    """Cancels a running, queued or coalesced task. Returns the state it was in."""
+    if task_lifecycle.cancel(task_id):
+        return "running"
+
+    task = await task_queue.remove(task_id)
+    if task is not None:
+        await report_stopped_task(task, "cancelled", child_process_id)
+        await delete_local_data(task)
+        ## Duplicates waiting on the cancelled task are queued in its place
+        await finish_deduplicated_task(task)
+        return "queued"
+
+    task = task_deduplicator.remove_waiting(task_id)
+    if task is not None:
+        await report_stopped_task(task, "cancelled", child_process_id)
+        await delete_local_data(task)
+        return "coalesced"
+
+    return None
+
+
 async def task_processor():
     """Background worker that processes tasks from the queue one at a time."""
     global task_running
@@ -192,21 +315,50 @@ async def task_processor():
     logger.info("Task processor started")
 
     while True:
+        task = None
         try:
             # Get next task from queue (blocks until one is available)
             task = await task_queue.get()
+            task_lifecycle.register(task)
+            TASK_QUEUE_DEPTH.set(task_queue.qsize())
             task_running = True
+            TASK_RUNNING.set(1)
             last_task_start_time = datetime.now()
-            await run_automation_in_process(task, unique_child_arn, child_process_id)
+            if task.allocated_at is not None:
+                TASK_QUEUE_WAIT_SECONDS.observe(
+                    (datetime.now(timezone.utc) - task.allocated_at).total_seconds()
+                )
+            start = time.monotonic()
+            returncode = await run_automation_in_process(
+                task, unique_child_arn, child_process_id
+            )
+            TASK_DURATION_SECONDS.observe(time.monotonic() - start)
+            if returncode == 0:
+                TASKS_TOTAL.inc(result="success")
+            elif returncode == -1:
+                TASKS_TOTAL.inc(result="timeout")
+            elif returncode == -2:
+                TASKS_TOTAL.inc(result="cancelled")
+            else:
+                TASKS_TOTAL.inc(result="failed")
 
         except asyncio.CancelledError:
             logger.info("Task processor cancelled")
             break
         except Exception as e:
             logger.error(f"Error in task processor: {e}")
+            TASKS_TOTAL.inc(result="error")
         finally:
 
             task_running = False
+            TASK_RUNNING.set(0)
+            if task is not None:
+                task_lifecycle.unregister(task.task_id)
+                await task_queue.task_done(task)
+                try:
+                    await finish_deduplicated_task(task)
+                except Exception as e:
+                    logger.error(f"Error finishing deduplicated task: {e}")
 
 
 async def register_with_master():
@@ -300,9 +452,30 @@ def get_app_with_endpoints(is_aws: bool, child_id: int):
                 "status": "healthy",
                 "task_running": task_running,
                 "queued_tasks": task_queue.qsize(),
+                "queue": [info.model_dump() for info in task_queue.queue_positions()],
             },
         )
 
+    @app.get("/metrics", tags=["info"])
+    async def get_metrics():
+        """Prometheus metrics endpoint."""
+        TASK_QUEUE_DEPTH.set(task_queue.qsize())
+        return PlainTextResponse(
+            metrics.render(), media_type="text/plain; version=0.0.4"
+        )
+
+    @app.get("/asset_cache", tags=["info"])
+    async def asset_cache_stats():
+        """Per-domain hit rates of the node's shared asset cache."""
+        if not settings.ASSET_CACHE_ENABLED:
+            return JSONResponse(
+                content={"enabled": False, "domains": {}}, status_code=200
+            )
+        stats = get_asset_cache().get_node_stats()
+        return JSONResponse(
+            content={"enabled": True, **stats.model_dump()}, status_code=200
+        )
+
     @app.post("/set_child_process_id", tags=["info"])
     async def set_child_process_id(request: ChildProcessIdRequest):
         """Set child process id endpoint."""
@@ -313,12 +486,35 @@ def get_app_with_endpoints(is_aws: bool, child_id: int):
             status_code=200,
         )
 
+    @app.post("/cancel_task")
+    async def cancel_task_endpoint(request: CancelTaskRequest = Body(...)):
+        """Cancel a queued or running task."""
+        try:
+            state = await cancel_task(request.task_id)
+            if state is None:
+                return JSONResponse(
+                    content={"success": False, "message": "Task not found"},
+                    status_code=404,
+                )
+            return JSONResponse(
+                content={
+                    "success": True,
+                    "message": f"Task was {state} and has been cancelled",
+                },
+                status_code=200,
+            )
+        except Exception as e:
+            logger.error(f"Error cancelling task {request.task_id}: {e}")
+            return JSONResponse(
+                content={"success": False, "message": str(e)}, status_code=500
+            )
+
     @app.post("/allocate_task")
     async def allocate_task(task: Task = Body(...)):
         """Get details of a specific task."""
         try:
 
-            await task_queue.put(task)
+            await enqueue_task(task)
             return JSONResponse(
                 content={
                     "success": True,
@@ -356,8 +552,11 @@ def get_app_with_endpoints(is_aws: bool, child_id: int):
                         "PROXY_URL is not set and is required when use_proxy is True"
                     )
                 task.is_dedicated = inference_request.is_dedicated
+                task.priority = inference_request.priority
+                task.timeout_seconds = inference_request.timeout_seconds
+                task.deduplicate = inference_request.deduplicate
                 task.allocated_at = datetime.now(timezone.utc)
-                await task_queue.put(task)
+                await enqueue_task(task)
 
                 return JSONResponse(
                     content={
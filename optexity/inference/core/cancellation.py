@@ -0,0 +1,51 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Literal
+
+_current_cancellation: ContextVar["TaskCancellation | None"] = ContextVar(
+    "current_cancellation", default=None
+)
+
+
+class TaskCancelledError(Exception):
+    def __init__(self, reason: Literal["cancelled", "timeout"], message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class TaskCancellation:
+    """
+    Cooperative cancellation for one automation run. The worker requests it on
+    SIGTERM, and the run stops at the next node boundary. Passing the task's
+    deadline stops the run the same way, whether or not it was requested.
+    """
+
+    def __init__(self, deadline_at: datetime | None = None):
+        self.deadline_at = deadline_at
+        self.requested = False
+
+    def request(self):
+        self.requested = True
+
+    def check(self):
+        if (
+            self.deadline_at is not None
+            and datetime.now(timezone.utc) >= self.deadline_at
+        ):
+            raise TaskCancelledError(
+                "timeout",
+                f"Task exceeded its deadline of {self.deadline_at.isoformat()}",
+            )
+        if self.requested:
+            raise TaskCancelledError("cancelled", "Task was cancelled")
+
+
+def set_current_cancellation(cancellation: TaskCancellation | None):
+    _current_cancellation.set(cancellation)
+
+
+def check_cancelled():
+    """Raises TaskCancelledError if the current run was cancelled or is past its deadline."""
+    cancellation = _current_cancellation.get()
+    if cancellation is not None:
+        cancellation.check()
@@ -0,0 +1,172 @@
+import ast
+import hashlib
+import logging
+from collections import OrderedDict
+from types import CodeType
+from typing import Any, Callable
+
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_CACHED_ENTRIES = 512
+
+## Builtins that run code, touch files or reach attributes by name
+BLOCKED_NAMES = {
+    "breakpoint",
+    "compile",
+    "delattr",
+    "eval",
+    "exec",
+    "getattr",
+    "globals",
+    "input",
+    "locals",
+    "open",
+    "setattr",
+    "vars",
+}
+
+ALLOWED_CONDITION_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.And,
+    ast.Or,
+    ast.UnaryOp,
+    ast.Not,
+    ast.USub,
+    ast.UAdd,
+    ast.Invert,
+    ast.BinOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+    ast.BitAnd,
+    ast.BitOr,
+    ast.BitXor,
+    ast.LShift,
+    ast.RShift,
+    ast.Compare,
+    ast.Eq,
+    ast.NotEq,
+    ast.Lt,
+    ast.LtE,
+    ast.Gt,
+    ast.GtE,
+    ast.In,
+    ast.NotIn,
+    ast.Is,
+    ast.IsNot,
+    ast.IfExp,
+    ast.Call,
+    ast.keyword,
+    ast.Starred,
+    ast.Attribute,
+    ast.Name,
+    ast.Load,
+    ast.Store,
+    ast.Constant,
+    ast.JoinedStr,
+    ast.FormattedValue,
+    ast.Subscript,
+    ast.Slice,
+    ast.List,
+    ast.Tuple,
+    ast.Set,
+    ast.Dict,
+    ast.ListComp,
+    ast.SetComp,
+    ast.DictComp,
+    ast.GeneratorExp,
+    ast.comprehension,
+    ast.Lambda,
+    ast.arguments,
+    ast.arg,
+)
+
+## Format strings can walk attributes, e.g. "{0.__class__}".format(x)
+BLOCKED_ATTRIBUTES = {"format", "format_map"}
+## Frame and code objects reachable from generators and functions
+BLOCKED_ATTRIBUTE_PREFIXES = ("_", "gi_", "cr_", "ag_", "f_", "co_", "tb_")
+
+
+class _LRUCache(OrderedDict):
+    def get_or_create(self, key: str, create: Callable[[], Any]) -> Any:
+        if key in self:
+            self.move_to_end(key)
+            return self[key]
+        value = create()
+        self[key] = value
+        while len(self) > MAX_CACHED_ENTRIES:
+            self.popitem(last=False)
+        return value
+
+
+_condition_cache = _LRUCache()
+_script_cache = _LRUCache()
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def validate_condition(tree: ast.Expression):
+    """
+    Keeps conditions to plain expressions over variables. This catches mistakes in
+    recordings, it is not a sandbox: conditions must still come from trusted users.
+    """
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_CONDITION_NODES):
+            raise ValueError(f"{type(node).__name__} is not allowed in conditions")
+        if isinstance(node, ast.Attribute) and (
+            node.attr in BLOCKED_ATTRIBUTES
+            or node.attr.startswith(BLOCKED_ATTRIBUTE_PREFIXES)
+        ):
+            raise ValueError(f"Attribute {node.attr} is not allowed in conditions")
+        if isinstance(node, ast.Name) and (
+            node.id.startswith("__") or node.id in BLOCKED_NAMES
+        ):
+            raise ValueError(f"Name {node.id} is not allowed in conditions")
+
+
+def check_condition(condition: str):
+    """Raises a ValueError for conditions that cannot be evaluated, used when automations load."""
+    try:
+        tree = ast.parse(condition.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Condition {condition!r} is not valid Python: {e}")
+    try:
+        validate_condition(tree)
+    except ValueError as e:
+        if not settings.ALLOW_UNRESTRICTED_CONDITIONS:
+            raise ValueError(f"Condition {condition!r} is not supported: {e}")
+
+
+def _compile_condition(condition: str) -> CodeType:
+    check_condition(condition)
+    return compile(condition.strip(), "<condition>", "eval")
+
+
+def evaluate_compiled_condition(condition: str, variables: dict[str, Any]) -> Any:
+    code = _condition_cache.get_or_create(
+        source_hash(condition), lambda: _compile_condition(condition)
+    )
+    ## Variables are globals so comprehensions, which get their own scope, can see them
+    return eval(code, dict(variables))
+
+
+def get_code_fn(source: str) -> Callable:
+    """
+    Returns the code_fn a script defines. Only the compiled code is cached, the
+    script runs on every call so no state is kept between calls.
+    """
+    code = _script_cache.get_or_create(
+        source_hash(source), lambda: compile(source, "<script>", "exec")
+    )
+    local_vars = {}
+    exec(code, {}, local_vars)
+    return local_vars["code_fn"]
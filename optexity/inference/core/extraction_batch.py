@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+from contextvars import ContextVar
+
+from pydantic import BaseModel, create_model
+
+from optexity.inference.models import GeminiModels, get_llm_model
+from optexity.inference.models.llm_model import LLMModel
+from optexity.schema.actions.extraction_action import LLMExtraction
+from optexity.schema.memory import Memory, OutputData
+from optexity.schema.token_usage import TokenUsage
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+_current_extraction_batch: ContextVar["ExtractionBatch | None"] = ContextVar(
+    "current_extraction_batch", default=None
+)
+
+## One client per model, shared by extractions submitted from threads
+_llm_models: dict[str, LLMModel] = {}
+
+
+def get_extraction_prompts(
+    llm_extraction: LLMExtraction, axtree: str | None
+) -> tuple[str, str]:
+    system_instruction = f"""
+    You are an expert in extracting information from a website. You will be given an axtree of a webpage.
+    Your task is to extract the information from the webpage and return it in the format specified by the instructions. You will be first provided the instructions and then the axtree.
+    Instructions: {llm_extraction.extraction_instructions}
+    """
+
+    prompt = f"""
+    [INPUT]
+    Axtree: {axtree}
+    [/INPUT]
+    """
+    return system_instruction, prompt
+
+
+def get_extraction_model(llm_provider: str, model_name: str) -> LLMModel:
+    if llm_provider != "gemini":
+        raise ValueError(f"Invalid LLM provider: {llm_provider}")
+    if model_name not in _llm_models:
+        _llm_models[model_name] = get_llm_model(GeminiModels(model_name), True)
+    return _llm_models[model_name]
+
+
+class DeferredExtraction(BaseModel):
+    llm_extraction: LLMExtraction
+    axtree: str | None = None
+    screenshot: str | None = None
+    output_data: OutputData
+
+
+class ExtractionBatch:
+    """
+    Collects deferred LLM extractions, typically one per for-loop iteration, and
+    submits them as multi-item structured requests. Items with the same model and
+    extraction_format share a request, and a group is submitted in the background as
+    soon as it reaches DEFERRED_EXTRACTION_BATCH_SIZE. Each item already has its
+    OutputData in memory, filled in once its batch returns.
+    """
+
+    def __init__(self, memory: Memory):
+        self.memory = memory
+        self.pending: dict[tuple[str, str], list[DeferredExtraction]] = {}
+        self.submissions: set[asyncio.Task] = set()
+
+    def add(
+        self,
+        llm_extraction: LLMExtraction,
+        axtree: str | None,
+        screenshot: str | None,
+        output_data: OutputData,
+    ):
+        key = (
+            llm_extraction.llm_model_name,
+            json.dumps(llm_extraction.extraction_format, sort_keys=True),
+        )
+        group = self.pending.setdefault(key, [])
+        group.append(
+            DeferredExtraction(
+                llm_extraction=llm_extraction,
+                axtree=axtree,
+                screenshot=screenshot,
+                output_data=output_data,
+            )
+        )
+        if len(group) >= settings.DEFERRED_EXTRACTION_BATCH_SIZE:
+            self.submit(self.pending.pop(key))
+
+    def submit(self, items: list[DeferredExtraction]):
+        submission = asyncio.create_task(self.run_batch(items))
+        self.submissions.add(submission)
+        submission.add_done_callback(self.submissions.discard)
+
+    async def flush(self, timeout: float | None = None):
+        """Submits what is pending and waits up to timeout for every submission."""
+        for items in self.pending.values():
+            self.submit(items)
+        self.pending = {}
+        if len(self.submissions) == 0:
+            return
+        _, not_done = await asyncio.wait(set(self.submissions), timeout=timeout)
+        if len(not_done) > 0:
+            logger.warning(
+                f"{len(not_done)} deferred extraction batches did not finish in {timeout:.1f}s, cancelling them"
+            )
+            self.cancel()
+
+    def cancel(self):
+        for submission in self.submissions:
+            submission.cancel()
+        self.pending = {}
+
+    async def run_batch(self, items: list[DeferredExtraction]):
+        model = get_extraction_model(
+            items[0].llm_extraction.llm_provider, items[0].llm_extraction.llm_model_name
+        )
+        results: dict[int, dict] = {}
+        if len(items) > 1:
+            try:
+                results, token_usage = await asyncio.to_thread(
+                    get_batch_response, model, items
+                )
+                self.memory.token_usage += token_usage
+                logger.info(
+                    f"Extracted {len(results)} of {len(items)} deferred items in one request"
+                )
+            except Exception as e:
+                logger.error(
+                    f"Batched extraction failed, extracting items one by one: {e}"
+                )
+
+        await asyncio.gather(
+            *[
+                self.extract_item(model, item)
+                for index, item in enumerate(items)
+                if index not in results
+            ]
+        )
+        for index, result in results.items():
+            items[index].output_data.json_data = result
+
+    async def extract_item(self, model: LLMModel, item: DeferredExtraction):
+        try:
+            system_instruction, prompt = get_extraction_prompts(
+                item.llm_extraction, item.axtree
+            )
+            response, token_usage = await asyncio.to_thread(
+                model.get_model_response_with_structured_output,
+                prompt=prompt,
+                response_schema=item.llm_extraction.build_model(),
+                screenshot=item.screenshot,
+                system_instruction=system_instruction,
+                priority="bulk",
+            )
+            self.memory.token_usage += token_usage
+            item.output_data.json_data = response.model_dump()
+        except Exception as e:
+            logger.error(
+                f"Deferred extraction {item.output_data.unique_identifier} failed: {e}"
+            )
+
+
+def get_batch_response(
+    model: LLMModel, items: list[DeferredExtraction]
+) -> tuple[dict[int, dict], TokenUsage]:
+    """Returns the extracted data by item index, items missing from the answer are left out."""
+    item_schema = create_model(
+        "ExtractionBatchItem",
+        item_index=(int, ...),
+        result=(items[0].llm_extraction.build_model(), ...),
+    )
+    batch_schema = create_model(
+        "ExtractionBatchResponse", results=(list[item_schema], ...)
+    )
+
+    instructions = {item.llm_extraction.extraction_instructions for item in items}
+    shared_instructions = instructions.pop() if len(instructions) == 1 else None
+
+    system_instruction = f"""
+    You are an expert in extracting information from websites. You will be given several numbered items, each with an axtree or screenshot of a webpage.
+    Extract the information from every item separately, following the instructions, and return one result per item with item_index set to the item's number.
+    {f"Instructions: {shared_instructions}" if shared_instructions is not None else "Each item has its own instructions."}
+    """
+
+    screenshots = []
+    prompt_items = []
+    for index, item in enumerate(items):
+        prompt_item = f"[ITEM {index}]\n"
+        if shared_instructions is None:
+            prompt_item += (
+                f"Instructions: {item.llm_extraction.extraction_instructions}\n"
+            )
+        if item.screenshot is not None:
+            screenshots.append(item.screenshot)
+            prompt_item += f"Screenshot: image {len(screenshots)}\n"
+        if "axtree" in item.llm_extraction.source:
+            prompt_item += f"Axtree: {item.axtree}\n"
+        prompt_items.append(prompt_item + f"[/ITEM {index}]")
+
+    prompt = "[INPUT]\n" + "\n".join(prompt_items) + "\n[/INPUT]"
+
+    response, token_usage = model.get_model_response_with_structured_output(
+        prompt=prompt,
+        response_schema=batch_schema,
+        screenshot=screenshots if len(screenshots) > 0 else None,
+        system_instruction=system_instruction,
+        priority="bulk",
+    )
+    results = {
+        result.item_index: result.result.model_dump()
+        for result in response.results
+        if 0 <= result.item_index < len(items)
+    }
+    return results, token_usage
+
+
+def set_current_extraction_batch(batch: ExtractionBatch | None):
+    _current_extraction_batch.set(batch)
+
+
+def get_current_extraction_batch() -> ExtractionBatch | None:
+    return _current_extraction_batch.get()
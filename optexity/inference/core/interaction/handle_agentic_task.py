@@ -12,6 +12,52 @@ from optexity.schema.task import Task
 
 logger = logging.getLogger(__name__)
 
+CLOSE_OVERLAY_POPUP_EXCLUDED_ACTIONS = [
+    "search",
+    "navigate",
+    "go_back",
+    "upload_file",
+    "scroll",
+    "find_text",
+    "send_keys",
+    "evaluate",
+    "switch",
+    "close",
+    "extract",
+    "dropdown_options",
+    "select_dropdown",
+    "write_file",
+    "read_file",
+    "replace_file",
+]
+
+_tools_cache: dict[str, Tools] = {}
+_llm: ChatGoogle | None = None
+
+
+def get_agentic_tools(
+    agentic_task_action: AgenticTask | CloseOverlayPopupAction,
+) -> Tools:
+    """Tools are built once per action type and swapped into each new Agent."""
+    if isinstance(agentic_task_action, CloseOverlayPopupAction):
+        key = "close_overlay_popup"
+        if key not in _tools_cache:
+            _tools_cache[key] = Tools(
+                exclude_actions=CLOSE_OVERLAY_POPUP_EXCLUDED_ACTIONS
+            )
+    else:
+        key = "agentic_task"
+        if key not in _tools_cache:
+            _tools_cache[key] = Tools()
+    return _tools_cache[key]
+
+
+def get_agentic_llm() -> ChatGoogle:
+    global _llm
+    if _llm is None:
+        _llm = ChatGoogle(model="gemini-flash-latest")
+    return _llm
+
 
 async def handle_agentic_task(
     agentic_task_action: AgenticTask | CloseOverlayPopupAction,
@@ -22,33 +68,19 @@ async def handle_agentic_task(
 
     if agentic_task_action.backend == "browser_use":
 
-        if isinstance(agentic_task_action, CloseOverlayPopupAction):
-            tools = Tools(
-                exclude_actions=[
-                    "search",
-                    "navigate",
-                    "go_back",
-                    "upload_file",
-                    "scroll",
-                    "find_text",
-                    "send_keys",
-                    "evaluate",
-                    "switch",
-                    "close",
-                    "extract",
-                    "dropdown_options",
-                    "select_dropdown",
-                    "write_file",
-                    "read_file",
-                    "replace_file",
-                ]
+        tools = get_agentic_tools(agentic_task_action)
+        llm = get_agentic_llm()
+
+        ## Attach to the session already held by the browser so we do not pay for a
+        ## new CDP attach and watchdog startup on every agentic task. A dedicated
+        ## session is only created when the task asks not to keep the browser alive.
+        browser_session = browser.get_browser_session()
+        owns_browser_session = False
+        if browser_session is None or not agentic_task_action.keep_alive:
+            browser_session = BrowserSession(
+                cdp_url=browser.cdp_url, keep_alive=agentic_task_action.keep_alive
             )
-        else:
-            tools = Tools()
-        llm = ChatGoogle(model="gemini-flash-latest")
-        browser_session = BrowserSession(
-            cdp_url=browser.cdp_url, keep_alive=agentic_task_action.keep_alive
-        )
+            owns_browser_session = True
 
         step_directory = (
             task.logs_directory / f"step_{str(memory.automation_state.step_index)}"
@@ -64,14 +96,21 @@ async def handle_agentic_task(
             calculate_cost=True,
             save_conversation_path=step_directory,
         )
-        logger.debug(f"Starting browser session for agentic task {browser.cdp_url} ")
-        await agent.browser_session.start()
+
+        if owns_browser_session:
+            logger.debug(
+                f"Starting browser session for agentic task {browser.cdp_url} "
+            )
+            await agent.browser_session.start()
+        else:
+            logger.debug(f"Reusing browser session for agentic task {browser.cdp_url}")
+
         logger.debug(f"Finally running agentic task on browser_use {browser.cdp_url} ")
         await agent.run(max_steps=agentic_task_action.max_steps)
         logger.debug(f"Agentic task completed on browser_use {browser.cdp_url} ")
 
         agent.stop()
-        if agent.browser_session:
+        if owns_browser_session and agent.browser_session:
             await agent.browser_session.stop()
             await agent.browser_session.reset()
 
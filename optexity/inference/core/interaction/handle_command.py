@@ -21,6 +21,7 @@ from optexity.schema.actions.interaction_action import (
 )
 from optexity.schema.memory import BrowserState, Memory
 from optexity.schema.task import Task
+from optexity.utils.locator_compiler import compile_locator_command
 
 logger = logging.getLogger(__name__)
 
@@ -49,79 +50,87 @@ async def command_based_action_with_retry(
 
     logger.debug(f"Executing command-based action: {action.__class__.__name__}")
 
+    ## A command that does not parse fails the same way on every try
+    try:
+        compile_locator_command(action.command)
+    except ValueError as e:
+        last_error = f"error: {e}"
+        max_tries = 0
+
     for try_index in range(max_tries):
         last_error = None
-        try:
-            # https://playwright.dev/docs/actionability
-            locator = await browser.get_locator_from_command(action.command)
-            if locator is None:
-                continue
-            if try_index == 0:
-                try:
-                    await locator.wait_for(
-                        state="visible", timeout=max_timeout_seconds_per_try * 1000
-                    )
-                except Exception as e:
-                    pass
-            is_visible = await locator.is_visible()
-
-            if is_visible:
-                await locator.scroll_into_view_if_needed(
-                    timeout=max_timeout_seconds_per_try * 1000
-                )
-                await asyncio.sleep(0.05)
-                # browser_state_summary = await browser.get_browser_state_summary()
-                memory.browser_states[-1] = BrowserState(
-                    url=await browser.get_current_page_url(),
-                    screenshot=await browser.get_screenshot(),
-                    title=await browser.get_current_page_title(),
-                    axtree=None,
-                )
-
-                if isinstance(action, ClickElementAction):
-                    await click_locator(
-                        action,
-                        locator,
-                        browser,
-                        memory,
-                        task,
-                        max_timeout_seconds_per_try,
-                    )
-                elif isinstance(action, InputTextAction):
-                    await input_text_locator(
-                        action, locator, browser, max_timeout_seconds_per_try
+        with memory.trace.span("try", "try", try_index=try_index):
+            try:
+                # https://playwright.dev/docs/actionability
+                locator = await browser.get_locator_from_command(action.command)
+                if locator is None:
+                    continue
+                if try_index == 0:
+                    try:
+                        await locator.wait_for(
+                            state="visible", timeout=max_timeout_seconds_per_try * 1000
+                        )
+                    except Exception as e:
+                        pass
+                is_visible = await locator.is_visible()
+
+                if is_visible:
+                    await locator.scroll_into_view_if_needed(
+                        timeout=max_timeout_seconds_per_try * 1000
                     )
-                elif isinstance(action, SelectOptionAction):
-                    await select_option_locator(
-                        action,
-                        locator,
-                        browser,
-                        memory,
-                        task,
-                        max_timeout_seconds_per_try,
+                    await asyncio.sleep(0.05)
+                    # browser_state_summary = await browser.get_browser_state_summary()
+                    memory.browser_states[-1] = BrowserState(
+                        url=await browser.get_current_page_url(),
+                        screenshot=await browser.get_screenshot(),
+                        title=await browser.get_current_page_title(),
+                        axtree=None,
                     )
-                elif isinstance(action, CheckAction):
-                    await check_locator(
-                        action, locator, max_timeout_seconds_per_try, browser
-                    )
-                elif isinstance(action, UncheckAction):
-                    await uncheck_locator(
-                        action, locator, max_timeout_seconds_per_try, browser
+
+                    if isinstance(action, ClickElementAction):
+                        await click_locator(
+                            action,
+                            locator,
+                            browser,
+                            memory,
+                            task,
+                            max_timeout_seconds_per_try,
+                        )
+                    elif isinstance(action, InputTextAction):
+                        await input_text_locator(
+                            action, locator, browser, max_timeout_seconds_per_try
+                        )
+                    elif isinstance(action, SelectOptionAction):
+                        await select_option_locator(
+                            action,
+                            locator,
+                            browser,
+                            memory,
+                            task,
+                            max_timeout_seconds_per_try,
+                        )
+                    elif isinstance(action, CheckAction):
+                        await check_locator(
+                            action, locator, max_timeout_seconds_per_try, browser
+                        )
+                    elif isinstance(action, UncheckAction):
+                        await uncheck_locator(
+                            action, locator, max_timeout_seconds_per_try, browser
+                        )
+                    elif isinstance(action, HoverAction):
+                        await hover_locator(locator, max_timeout_seconds_per_try)
+                    elif isinstance(action, UploadFileAction):
+                        await upload_file_locator(action, locator)
+                    logger.debug(
+                        f"{action.__class__.__name__} successful on try {try_index + 1}"
                     )
-                elif isinstance(action, HoverAction):
-                    await hover_locator(locator, max_timeout_seconds_per_try)
-                elif isinstance(action, UploadFileAction):
-                    await upload_file_locator(action, locator)
-                logger.debug(
-                    f"{action.__class__.__name__} successful on try {try_index + 1}"
-                )
-                return
-            else:
+                    return
+                else:
+                    await asyncio.sleep(max_timeout_seconds_per_try)
+                    last_error = f"error: locator not visible"
+            except Exception as e:
+                last_error = f"error: {e}"
                 await asyncio.sleep(max_timeout_seconds_per_try)
-                last_error = f"error: locator not visible"
-        except Exception as e:
-            last_error = f"error: {e}"
-            await asyncio.sleep(max_timeout_seconds_per_try)
 
     if last_error is None:
         last_error = "error in executing command"
@@ -261,7 +270,10 @@ async def select_option_locator(
         ]
 
         matched_values = await smart_select(
-            select_option_values, select_option_action.select_values, memory
+            select_option_values,
+            select_option_action.select_values,
+            memory,
+            cache_key=f"{locator.page.url}|{select_option_action.command}",
         )
 
         logger.debug(
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+import time
+
+from playwright.async_api import ElementHandle
+
+from optexity.inference.core.interaction.handle_input import INT_INDEX_PATTERN
+from optexity.inference.core.interaction.handle_select_utils import (
+    SelectOptionValue,
+    smart_select,
+)
+from optexity.inference.infra.browser import Browser
+from optexity.schema.actions.interaction_action import (
+    FillFormAction,
+    FormField,
+    InteractionAction,
+)
+from optexity.schema.memory import BrowserState, Memory
+from optexity.schema.task import Task
+
+logger = logging.getLogger(__name__)
+
+## Checks every field element at once and returns the options of selects.
+RESOLVE_FIELDS_SCRIPT = """
+elements => elements.map(el => {
+    if (!el.isConnected) return { fillable: false, reason: "detached" };
+    const style = window.getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    if (style.display === "none" || style.visibility === "hidden" || rect.width === 0 || rect.height === 0) {
+        return { fillable: false, reason: "not visible" };
+    }
+    if (el.disabled) return { fillable: false, reason: "disabled" };
+    const tag = el.tagName.toLowerCase();
+    if (tag === "select") {
+        return {
+            fillable: true,
+            tag,
+            options: Array.from(el.options).map(o => ({ value: o.value, label: o.label || o.textContent })),
+        };
+    }
+    const textTypes = ["text", "email", "password", "search", "tel", "url", "number", "date", "datetime-local", "month", "time", "week"];
+    if (tag === "textarea" || (tag === "input" && textTypes.includes(el.type))) {
+        if (el.readOnly) return { fillable: false, reason: "read only" };
+        return { fillable: true, tag };
+    }
+    return { fillable: false, reason: `unsupported element ${tag}` };
+})
+"""
+
+## Sets every value through the native setters, so framework-bound inputs see the change.
+APPLY_FIELDS_SCRIPT = """
+([elements, values]) => elements.map((el, i) => {
+    const tag = el.tagName.toLowerCase();
+    if (tag === "select") {
+        const wanted = new Set(values[i]);
+        let found = false;
+        for (const option of el.options) {
+            const selected = wanted.has(option.value) && (el.multiple || !found);
+            option.selected = selected;
+            found = found || selected;
+        }
+        if (!found) return false;
+    } else {
+        const prototype = tag === "textarea" ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+        Object.getOwnPropertyDescriptor(prototype, "value").set.call(el, values[i]);
+    }
+    el.dispatchEvent(new Event("input", { bubbles: true }));
+    el.dispatchEvent(new Event("change", { bubbles: true }));
+    return tag === "select" || el.value === values[i];
+})
+"""
+
+
+def can_fill_in_batch(field: FormField) -> bool:
+    """Only plain fills and selects without side effects are set in one pass."""
+    if field.input_text is not None:
+        action = field.input_text
+        return (
+            action.command is not None
+            and not action.skip_command
+            and action.input_text is not None
+            and INT_INDEX_PATTERN.match(action.input_text) is None
+            and action.fill_or_type == "fill"
+            and not action.press_enter
+            and not action.is_slider
+        )
+    action = field.select_option
+    return (
+        action is not None
+        and action.command is not None
+        and not action.skip_command
+        and not action.expect_download
+    )
+
+
+async def handle_fill_form(
+    fill_form_action: FillFormAction,
+    task: Task,
+    memory: Memory,
+    browser: Browser,
+    max_timeout_seconds_per_try: float,
+    max_tries: int,
+):
+    """
+    Fills a form with a few page evaluations instead of one retried action per field.
+    Consecutive batchable fields are resolved concurrently, checked in one evaluation
+    and set in another. A select closes its batch, since it may change the fields after
+    it. Fields that cannot be batched, or fail in the batch, run their own handler.
+    """
+    start = time.monotonic()
+    batch: list[FormField] = []
+    batched = 0
+
+    async def _flush():
+        nonlocal batch, batched
+        if len(batch) == 0:
+            return
+        failed = await fill_batch(batch, memory, browser, max_timeout_seconds_per_try)
+        batched += len(batch) - len(failed)
+        for field in failed:
+            await fill_field(
+                field, task, memory, browser, max_timeout_seconds_per_try, max_tries
+            )
+        batch = []
+
+    for field in fill_form_action.fields:
+        if not can_fill_in_batch(field):
+            await _flush()
+            await fill_field(
+                field, task, memory, browser, max_timeout_seconds_per_try, max_tries
+            )
+            continue
+        batch.append(field)
+        if field.select_option is not None:
+            await _flush()
+    await _flush()
+
+    logger.debug(
+        f"Filled {batched} of {len(fill_form_action.fields)} form fields in batches in {time.monotonic() - start:.2f}s"
+    )
+
+
+async def fill_field(
+    field: FormField,
+    task: Task,
+    memory: Memory,
+    browser: Browser,
+    max_timeout_seconds_per_try: float,
+    max_tries: int,
+):
+    """
+    Runs one field as its own interaction action, so a field failing its locator
+    assertion is classified and retried alone instead of re-running the whole form.
+    """
+    ## run_interaction imports this module
+    from optexity.inference.core.run_interaction import run_interaction_action
+
+    await run_interaction_action(
+        InteractionAction(
+            input_text=field.input_text,
+            select_option=field.select_option,
+            max_tries=max_tries,
+            max_timeout_seconds_per_try=max_timeout_seconds_per_try,
+        ),
+        task,
+        memory,
+        browser,
+        2,
+    )
+
+
+async def fill_batch(
+    fields: list[FormField],
+    memory: Memory,
+    browser: Browser,
+    max_timeout_seconds_per_try: float,
+) -> list[FormField]:
+    """Fills fields in one pass and returns the ones that could not be filled."""
+    page = await browser.get_current_page()
+    if page is None:
+        return fields
+
+    actions = [field.input_text or field.select_option for field in fields]
+    locators = await asyncio.gather(
+        *[browser.get_locator_from_command(action.command) for action in actions],
+        return_exceptions=True,
+    )
+    handles = await asyncio.gather(
+        *[
+            (
+                locator.element_handle(timeout=max_timeout_seconds_per_try * 1000)
+                if locator is not None and not isinstance(locator, Exception)
+                else asyncio.sleep(0)
+            )
+            for locator in locators
+        ],
+        return_exceptions=True,
+    )
+
+    def _in_form_order(failed: list[FormField]) -> list[FormField]:
+        return [field for field in fields if any(field is f for f in failed)]
+
+    failed = []
+    resolved: list[tuple[FormField, ElementHandle]] = []
+    for field, handle in zip(fields, handles):
+        if handle is None or isinstance(handle, Exception):
+            failed.append(field)
+        else:
+            resolved.append((field, handle))
+
+    try:
+        if len(resolved) == 0:
+            return _in_form_order(failed)
+
+        states = await page.evaluate(
+            RESOLVE_FIELDS_SCRIPT, [handle for _, handle in resolved]
+        )
+        fillable: list[tuple[FormField, ElementHandle]] = []
+        values: list[str | list[str]] = []
+        for (field, handle), state in zip(resolved, states):
+            is_select = state.get("tag") == "select"
+            if not state["fillable"] or is_select != (field.select_option is not None):
+                logger.debug(
+                    f"Form field {(field.input_text or field.select_option).command} not filled in batch: {state.get('reason', state.get('tag'))}"
+                )
+                failed.append(field)
+                continue
+            if is_select:
+                options = [
+                    SelectOptionValue(value=o["value"], label=o["label"])
+                    for o in state["options"]
+                ]
+                values.append(
+                    await smart_select(
+                        options,
+                        field.select_option.select_values,
+                        memory,
+                        cache_key=f"{page.url}|{field.select_option.command}",
+                    )
+                )
+            else:
+                values.append(field.input_text.input_text)
+            fillable.append((field, handle))
+
+        if len(fillable) == 0:
+            return _in_form_order(failed)
+
+        memory.browser_states[-1] = BrowserState(
+            url=await browser.get_current_page_url(),
+            screenshot=await browser.get_screenshot(),
+            title=await browser.get_current_page_title(),
+            axtree=None,
+        )
+        results = await page.evaluate(
+            APPLY_FIELDS_SCRIPT, [[handle for _, handle in fillable], values]
+        )
+        failed += [field for (field, _), ok in zip(fillable, results) if not ok]
+    except Exception as e:
+        logger.debug(f"Batch form fill failed, filling fields one by one: {e}")
+        failed = fields
+    finally:
+        for _, handle in resolved:
+            try:
+                await handle.dispose()
+            except Exception:
+                pass
+
+    return _in_form_order(failed)
@@ -12,6 +12,9 @@ from optexity.schema.task import Task
 
 logger = logging.getLogger(__name__)
 
+# {some english chars [0]}
+INT_INDEX_PATTERN = re.compile(r"^\{([A-Za-z_][A-Za-z0-9_]*)\[(\d+)\]\}$")
+
 
 async def handle_input_text(
     input_text_action: InputTextAction,
@@ -22,9 +25,6 @@ async def handle_input_text(
     max_tries: int,
 ):
 
-    # {some english chars [0]}
-    INT_INDEX_PATTERN = re.compile(r"^\{([A-Za-z_][A-Za-z0-9_]*)\[(\d+)\]\}$")
-
     if INT_INDEX_PATTERN.match(input_text_action.input_text) is not None:
         logger.debug(
             "Skipping input text because input variable was not present for this step"
@@ -60,6 +60,7 @@ async def input_text_index(
             input_text_action.prompt_instructions,
             browser,
             task,
+            expected_tags=["input", "textarea"],
         )
         if index is None:
             return
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import os
+import uuid
+from pathlib import Path
+
+import aiofiles
+from pydantic import BaseModel, Field
+
+from optexity.inference.core.interaction.handle_agentic_task import (
+    handle_agentic_task,
+)
+from optexity.inference.infra.browser import Browser
+from optexity.schema.actions.interaction_action import CloseOverlayPopupAction
+from optexity.schema.memory import Memory
+from optexity.schema.task import Task
+from optexity.utils.utils import clean_url
+
+logger = logging.getLogger(__name__)
+
+LEARNED_OVERLAY_RULES_PATH = Path("/tmp/optexity/overlay_rules.json")
+
+
+class OverlayRule(BaseModel):
+    name: str
+    selector: str
+
+
+## Ordered from most specific (known consent managers) to most generic.
+OVERLAY_RULES: list[OverlayRule] = [
+    OverlayRule(name="onetrust_accept", selector="#onetrust-accept-btn-handler"),
+    OverlayRule(
+        name="cookiebot_accept",
+        selector="#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll, #CybotCookiebotDialogBodyButtonAccept",
+    ),
+    OverlayRule(name="trustarc_accept", selector="#truste-consent-button"),
+    OverlayRule(name="didomi_accept", selector="#didomi-notice-agree-button"),
+    OverlayRule(
+        name="quantcast_accept",
+        selector=".qc-cmp2-summary-buttons button[mode='primary']",
+    ),
+    OverlayRule(
+        name="usercentrics_accept", selector="[data-testid='uc-accept-all-button']"
+    ),
+    OverlayRule(name="cookieyes_accept", selector=".cky-btn-accept"),
+    OverlayRule(name="osano_accept", selector=".osano-cm-accept-all"),
+    OverlayRule(name="cookie_notice_accept", selector="#cn-accept-cookie"),
+    OverlayRule(
+        name="cc_banner_accept",
+        selector=".cc-banner .cc-btn.cc-allow, .cc-window .cc-dismiss",
+    ),
+    OverlayRule(
+        name="gdpr_accept",
+        selector="[id*='cookie' i] button[id*='accept' i], [class*='cookie' i] button[class*='accept' i]",
+    ),
+    OverlayRule(
+        name="modal_close_aria",
+        selector="[role='dialog'] [aria-label*='close' i], [aria-modal='true'] [aria-label*='close' i]",
+    ),
+    OverlayRule(
+        name="modal_close_class",
+        selector=".modal.show .close, .modal.show .btn-close, .modal[style*='display: block'] .close",
+    ),
+    OverlayRule(
+        name="popup_close_class",
+        selector="[class*='popup' i] [class*='close' i], [class*='modal' i] [class*='close' i]",
+    ),
+    OverlayRule(
+        name="newsletter_dismiss",
+        selector="[class*='newsletter' i] [class*='close' i], [id*='newsletter' i] [class*='close' i]",
+    ),
+]
+
+## Text of buttons inside a blocking overlay that a human would click to get past it.
+## Words like "continue" or "ok" also label form and wizard buttons, so they are not used.
+DISMISS_BUTTON_TEXT_PATTERN = (
+    r"^(accept( all)?( cookies)?|agree|i agree|allow( all)?( cookies)?|got it"
+    r"|close|dismiss|no,? thanks|not now|maybe later|skip|×|x|✕)$"
+)
+
+## Only dialogs and consent banners are dismissed, never headers or sticky footers.
+OVERLAY_CONTAINER_SELECTOR = (
+    "dialog[open], [role='dialog'], [role='alertdialog'], [aria-modal='true'],"
+    " [id*='cookie' i], [class*='cookie' i], [id*='consent' i], [class*='consent' i]"
+)
+
+DISMISS_OVERLAY_SCRIPT = """
+async ({ rules, textPattern, containerSelector }) => {
+    const sleep = ms => new Promise(r => setTimeout(r, ms));
+    const isVisible = el => {
+        if (!el || !el.isConnected) return false;
+        const style = window.getComputedStyle(el);
+        if (style.visibility === "hidden" || style.display === "none" || Number(style.opacity) === 0) return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    // Links and submit buttons would navigate or submit a form, not close the overlay
+    const isSafeButton = el => {
+        if (el.matches("a[href], input[type='submit']")) return false;
+        return !(el.tagName === "BUTTON" && el.form && el.type === "submit");
+    };
+    // Success means the overlay itself is gone, not just the clicked button
+    const clickAndVerify = async (el, container) => {
+        el.click();
+        await sleep(300);
+        return !isVisible(container);
+    };
+
+    for (const rule of rules) {
+        let elements = [];
+        try {
+            elements = Array.from(document.querySelectorAll(rule.selector));
+        } catch (e) {
+            continue;
+        }
+        const el = elements.find(e => isVisible(e) && isSafeButton(e));
+        if (el && await clickAndVerify(el, el.closest(containerSelector) || el)) return rule.name;
+    }
+
+    const overlays = Array.from(document.querySelectorAll(containerSelector)).filter(isVisible);
+    const regex = new RegExp(textPattern, "i");
+    for (const overlay of overlays) {
+        const buttons = Array.from(
+            overlay.querySelectorAll("button, [role='button'], a:not([href]), input[type='button']")
+        ).filter(b => isVisible(b) && isSafeButton(b));
+        const button = buttons.find(b => {
+            const text = (b.innerText || b.value || b.getAttribute("aria-label") || "").trim();
+            return regex.test(text);
+        });
+        if (button && await clickAndVerify(button, overlay)) return "heuristic_overlay_button";
+    }
+    return null;
+}
+"""
+
+BLOCKING_OVERLAY_PRESENT_SCRIPT = """
+() => {
+    const viewportArea = window.innerWidth * window.innerHeight;
+    return Array.from(document.querySelectorAll("body *")).some(el => {
+        const style = window.getComputedStyle(el);
+        if (style.position !== "fixed") return false;
+        if (style.visibility === "hidden" || style.display === "none") return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width * rect.height >= viewportArea * 0.3 && (parseInt(style.zIndex, 10) || 0) >= 100;
+    });
+}
+"""
+
+
+class LearnedOverlayRules(BaseModel):
+    rules_by_domain: dict[str, list[str]] = Field(default_factory=dict)
+
+
+async def load_learned_overlay_rules() -> LearnedOverlayRules:
+    try:
+        async with aiofiles.open(LEARNED_OVERLAY_RULES_PATH, "r") as f:
+            return LearnedOverlayRules.model_validate_json(await f.read())
+    except FileNotFoundError:
+        return LearnedOverlayRules()
+    except Exception as e:
+        logger.error(f"Failed to load learned overlay rules: {e}")
+        return LearnedOverlayRules()
+
+
+async def save_learned_overlay_rule(domain: str, rule_name: str):
+    try:
+        learned = await load_learned_overlay_rules()
+        rule_names = learned.rules_by_domain.get(domain, [])
+        if rule_name in rule_names:
+            rule_names.remove(rule_name)
+        learned.rules_by_domain[domain] = [rule_name] + rule_names
+
+        ## Written to a scratch file and renamed, so other workers never read a torn file
+        LEARNED_OVERLAY_RULES_PATH.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = LEARNED_OVERLAY_RULES_PATH.with_name(
+            f"{LEARNED_OVERLAY_RULES_PATH.name}.{uuid.uuid4().hex}.tmp"
+        )
+        async with aiofiles.open(temporary_path, "w") as f:
+            await f.write(learned.model_dump_json(indent=4))
+        os.replace(temporary_path, LEARNED_OVERLAY_RULES_PATH)
+    except Exception as e:
+        logger.error(f"Failed to save learned overlay rule: {e}")
+
+
+def order_overlay_rules(learned_rule_names: list[str]) -> list[OverlayRule]:
+    rules_by_name = {rule.name: rule for rule in OVERLAY_RULES}
+    ordered = [
+        rules_by_name[name] for name in learned_rule_names if name in rules_by_name
+    ]
+    ordered += [rule for rule in OVERLAY_RULES if rule.name not in learned_rule_names]
+    return ordered
+
+
+async def dismiss_overlay_popup_with_rules(browser: Browser) -> str | None:
+    """
+    Tries the known overlay rules in a single page-side evaluation, followed by an
+    Escape key press. Returns the name of the rule that dismissed the overlay, or None.
+    Rules that worked before on the same domain are tried first.
+    """
+    page = await browser.get_current_page()
+    if page is None:
+        return None
+
+    domain = clean_url(page.url)
+    learned = await load_learned_overlay_rules()
+    rules = order_overlay_rules(learned.rules_by_domain.get(domain, []))
+
+    matched_rule = None
+    try:
+        matched_rule = await page.evaluate(
+            DISMISS_OVERLAY_SCRIPT,
+            {
+                "rules": [rule.model_dump() for rule in rules],
+                "textPattern": DISMISS_BUTTON_TEXT_PATTERN,
+                "containerSelector": OVERLAY_CONTAINER_SELECTOR,
+            },
+        )
+        if matched_rule is None and await page.evaluate(
+            BLOCKING_OVERLAY_PRESENT_SCRIPT
+        ):
+            await page.keyboard.press("Escape")
+            await asyncio.sleep(0.3)
+            if not await page.evaluate(BLOCKING_OVERLAY_PRESENT_SCRIPT):
+                matched_rule = "escape_key"
+    except Exception as e:
+        logger.error(f"Error in rule based overlay dismissal: {e}")
+        return None
+
+    if matched_rule is not None:
+        logger.debug(f"Overlay dismissed on {domain} with rule {matched_rule}")
+        await save_learned_overlay_rule(domain, matched_rule)
+    else:
+        logger.debug(f"No overlay rule matched on {domain}")
+
+    return matched_rule
+
+
+async def handle_close_overlay_popup(
+    close_overlay_popup_action: CloseOverlayPopupAction,
+    task: Task,
+    memory: Memory,
+    browser: Browser,
+):
+    matched_rule = await dismiss_overlay_popup_with_rules(browser)
+    if matched_rule is not None:
+        memory.browser_states[-1].llm_response = {"overlay_rule": matched_rule}
+        return
+
+    logger.debug("Falling back to agentic overlay popup dismissal")
+    await handle_agentic_task(close_overlay_popup_action, task, memory, browser)
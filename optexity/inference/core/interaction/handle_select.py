@@ -60,7 +60,11 @@ async def select_option_index(
     try:
 
         index = await get_index_from_prompt(
-            memory, select_option_action.prompt_instructions, browser, task
+            memory,
+            select_option_action.prompt_instructions,
+            browser,
+            task,
+            expected_tags=["select"],
         )
         if index is None:
             return
@@ -1,5 +1,9 @@
+import asyncio
+import bisect
+import heapq
 import logging
 import re
+from collections import OrderedDict, defaultdict
 
 from pydantic import BaseModel
 
@@ -8,6 +12,7 @@ from optexity.inference.agents.select_value_prediction.select_value_prediction i
 )
 from optexity.schema.actions.interaction_action import Locator
 from optexity.schema.memory import Memory
+from optexity.utils.settings import settings
 
 logger = logging.getLogger(__name__)
 select_value_prediction_agent = SelectValuePredictionAgent()
@@ -18,13 +23,13 @@ class SelectOptionValue(BaseModel):
     label: str
 
 
-def llm_select_match(
+async def llm_select_match(
     options: list[SelectOptionValue], patterns: list[str], memory: Memory
 ) -> list[str]:
-    final_prompt, response, token_usage = (
-        select_value_prediction_agent.predict_select_value(
-            [o.model_dump() for o in options], patterns
-        )
+    final_prompt, response, token_usage = await asyncio.to_thread(
+        select_value_prediction_agent.predict_select_value,
+        [o.model_dump() for o in options],
+        patterns,
     )
     memory.token_usage += token_usage
     memory.browser_states[-1].final_prompt = final_prompt
@@ -53,8 +58,186 @@ def score_match(pat: str, val: str) -> int:
     return 0
 
 
+def normalize_option_text(text: str) -> str:
+    return text.lower().replace(" ", "")
+
+
+def get_trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+## Words too common to say anything about which option is meant
+STOP_WORDS = {"a", "an", "and", "of", "the", "or", "for", "in", "on", "to"}
+
+
+def get_tokens(text: str) -> list[str]:
+    return [
+        token
+        for token in re.findall(r"[a-z0-9]+", text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def get_acronym(tokens: list[str]) -> str | None:
+    """Initials of a multi-word text, e.g. usa for United States of America."""
+    return "".join(token[0] for token in tokens) if len(tokens) > 1 else None
+
+
+class OptionFieldIndex:
+    """Lookups over one field (value or label) of every option, in option order."""
+
+    def __init__(self, texts: list[str]):
+        self.normalized = [normalize_option_text(text) for text in texts]
+        ## Score matching is only used when no two options look the same
+        self.is_unique = len(set(zip(self.normalized, texts))) == len(texts)
+        self.exact: dict[str, int] = {}
+        self.trigrams: dict[str, set[int]] = defaultdict(set)
+        self.trigram_counts: list[int] = []
+        for index, text in enumerate(self.normalized):
+            self.exact.setdefault(text, index)
+            trigrams = get_trigrams(text)
+            self.trigram_counts.append(len(trigrams))
+            for trigram in trigrams:
+                self.trigrams[trigram].add(index)
+        self.sorted = sorted(
+            (text, index) for index, text in enumerate(self.normalized)
+        )
+        self.tokens: dict[str, set[int]] = defaultdict(set)
+        self.acronyms: dict[str, set[int]] = defaultdict(set)
+        for index, text in enumerate(texts):
+            tokens = get_tokens(text)
+            for token in tokens:
+                self.tokens[token].add(index)
+            acronym = get_acronym(tokens)
+            if acronym is not None:
+                self.acronyms[acronym].add(index)
+
+    def best_match(self, pattern: str) -> int | None:
+        """First option with the best score_match for pattern, None if nothing scores."""
+        if pattern in self.exact:
+            return self.exact[pattern]
+
+        prefixed = []
+        position = bisect.bisect_left(self.sorted, (pattern, -1))
+        while position < len(self.sorted) and self.sorted[position][0].startswith(
+            pattern
+        ):
+            prefixed.append(self.sorted[position][1])
+            position += 1
+        if len(prefixed) > 0:
+            return min(prefixed)
+
+        if len(pattern) < 3:
+            candidates = range(len(self.normalized))
+        else:
+            candidates = set.intersection(
+                *[
+                    self.trigrams.get(trigram, set())
+                    for trigram in get_trigrams(pattern)
+                ]
+            )
+        containing = [
+            index for index in candidates if pattern in self.normalized[index]
+        ]
+        return min(containing) if len(containing) > 0 else None
+
+    def token_matches(self, pattern: str) -> set[int]:
+        """Options sharing a word with pattern, or matching it as an acronym either way."""
+        tokens = get_tokens(pattern)
+        matches: set[int] = set()
+        for token in tokens:
+            matches |= self.tokens.get(token, set())
+            matches |= self.acronyms.get(token, set())
+        acronym = get_acronym(tokens)
+        if acronym is not None:
+            matches |= self.tokens.get(acronym, set())
+        return matches
+
+    def similarity_scores(self, pattern: str) -> dict[int, float]:
+        """Trigram Dice similarity of pattern to every option sharing a trigram with it."""
+        pattern_trigrams = get_trigrams(pattern)
+        shared: dict[int, int] = defaultdict(int)
+        for trigram in pattern_trigrams:
+            for index in self.trigrams.get(trigram, ()):
+                shared[index] += 1
+        return {
+            index: 2 * count / (len(pattern_trigrams) + self.trigram_counts[index])
+            for index, count in shared.items()
+        }
+
+
+class SelectOptionIndex:
+    """
+    Normalized option index built once per select: exact lookups, prefix search over
+    sorted options and trigram postings for substring and similarity candidates.
+    """
+
+    def __init__(self, options: list[SelectOptionValue]):
+        self.options = options
+        self.raw: dict[str, list[int]] = defaultdict(list)
+        for index, option in enumerate(options):
+            self.raw[option.value].append(index)
+            if option.label != option.value:
+                self.raw[option.label].append(index)
+        self.values = OptionFieldIndex([option.value for option in options])
+        self.labels = OptionFieldIndex([option.label for option in options])
+        ## Values smart_select matched per patterns, so retries do not ask the LLM again
+        self.matched_values: dict[tuple[str, ...], list[str]] = {}
+
+    def exact_matches(self, pattern: str) -> list[str]:
+        return [
+            self.options[index].value
+            for index in sorted(set(self.raw.get(pattern, [])))
+        ]
+
+    def top_candidates(
+        self, patterns: list[str], k: int
+    ) -> list[tuple[bool, float, int]]:
+        """
+        Best (word match, similarity, option index) across patterns, highest first:
+        options sharing a word or acronym with a pattern, then by trigram similarity.
+        """
+        scores: dict[int, float] = defaultdict(float)
+        token_matches: set[int] = set()
+        for pattern in patterns:
+            processed_pattern = normalize_option_text(pattern)
+            for field in (self.values, self.labels):
+                for index, score in field.similarity_scores(processed_pattern).items():
+                    scores[index] = max(scores[index], score)
+                token_matches |= field.token_matches(pattern)
+        return heapq.nlargest(
+            k,
+            (
+                (index in token_matches, scores[index], index)
+                for index in scores.keys() | token_matches
+            ),
+        )
+
+
+_option_indexes: OrderedDict[str, SelectOptionIndex] = OrderedDict()
+
+
+def get_select_option_index(
+    options: list[SelectOptionValue], cache_key: str | None
+) -> SelectOptionIndex:
+    """Reuses the index built for cache_key, typically page URL and selector, while its options are unchanged."""
+    if cache_key is None:
+        return SelectOptionIndex(options)
+    index = _option_indexes.get(cache_key)
+    if index is None or index.options != options:
+        index = SelectOptionIndex(options)
+        _option_indexes[cache_key] = index
+        while len(_option_indexes) > settings.SELECT_OPTION_INDEX_CACHE_SIZE:
+            _option_indexes.popitem(last=False)
+    _option_indexes.move_to_end(cache_key)
+    return index
+
+
 async def smart_select(
-    options: list[SelectOptionValue], patterns: list[str], memory: Memory
+    options: list[SelectOptionValue],
+    patterns: list[str],
+    memory: Memory,
+    cache_key: str | None = None,
 ):
     # Get all options from the <select>
     ## TODO: remove this once we have a better way to handle select one
@@ -70,6 +253,10 @@ async def smart_select(
         else:
             return [options[0].value]
 
+    option_index = get_select_option_index(options, cache_key)
+    if tuple(patterns) in option_index.matched_values:
+        return list(option_index.matched_values[tuple(patterns)])
+
     for p in patterns:
         # If pattern contains regex characters, treat as regex
         is_regex = p.startswith("^") or p.endswith("$") or ".*" in p
@@ -82,61 +269,44 @@ async def smart_select(
                     matched_values.append(opt.value)
         else:
             # try exact match
-            for opt in options:
-                if opt.value == p or opt.label == p:
-                    matched_values.append(opt.value)
-
-    if len(matched_values) == 0:
-        ## If no matches, check if all values are unique and try score matching of values
-
-        processed_values = [
-            (v.value.lower().replace(" ", ""), v.value) for v in options
-        ]
-
-        if len(processed_values) == len(set(processed_values)):
-            for p in patterns:
-                processed_pattern = p.lower().replace(" ", "")
+            matched_values += option_index.exact_matches(p)
 
-                best_score = 0
-                best_value = None
-
-                for processed_value, value in processed_values:
-                    score = score_match(processed_pattern, processed_value)
-                    if score > best_score:
-                        best_score = score
-                        best_value = value
-
-                if best_value is not None and best_score > 0:
-                    matched_values.append(best_value)
+    ## If no matches, try score matching of values and then of labels
+    for field in (option_index.values, option_index.labels):
+        if len(matched_values) > 0 or not field.is_unique:
+            continue
+        for p in patterns:
+            best_index = field.best_match(normalize_option_text(p))
+            if best_index is not None:
+                matched_values.append(options[best_index].value)
 
     if len(matched_values) == 0:
-        processed_labels = [
-            (v.label.lower().replace(" ", ""), v.label) for v in options
-        ]
-
-        if len(processed_labels) == len(set(processed_labels)):
-            for p in patterns:
-                processed_pattern = p.lower().replace(" ", "")
-
-                best_score = 0
-                best_label = None
-                best_value = None
-
-                for opt in options:
-                    processed_label = opt.label.lower().replace(" ", "")
-                    score = score_match(processed_pattern, processed_label)
-                    if score > best_score:
-                        best_score = score
-                        best_label = opt.label
-                        best_value = opt.value
-
-                if best_label is not None and best_score > 0:
-                    matched_values.append(best_value)
-
-    if len(matched_values) == 0:
-        matched_values = llm_select_match(options, patterns, memory)
+        candidates = option_index.top_candidates(patterns, settings.SELECT_LLM_TOP_K)
+        best_similarity, best_index = max(
+            ((similarity, index) for _, similarity, index in candidates),
+            default=(0.0, -1),
+        )
+        if (
+            len(patterns) == 1
+            and best_similarity >= settings.SELECT_FUZZY_MATCH_THRESHOLD
+        ):
+            matched_values = [options[best_index].value]
+        ## A shortlist of lexical near-misses could leave out the option meant, e.g. USA
+        ## for "United States of America", so the LLM then sees every option
+        elif len(options) > settings.SELECT_LLM_TOP_K and (
+            (len(candidates) > 0 and candidates[0][0])
+            or best_similarity >= settings.SELECT_LLM_MIN_SIMILARITY
+        ):
+            ## The LLM only sees the closest options, in their original order
+            candidate_options = [
+                options[index] for index in sorted(i for _, _, i in candidates)
+            ]
+            matched_values = await llm_select_match(candidate_options, patterns, memory)
+        else:
+            matched_values = await llm_select_match(options, patterns, memory)
 
     if len(matched_values) == 0:
-        matched_values = patterns
+        return patterns
 
+    option_index.matched_values[tuple(patterns)] = list(matched_values)
     return matched_values
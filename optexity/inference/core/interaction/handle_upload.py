@@ -45,7 +45,11 @@ async def upload_file_index(
 
     try:
         index = await get_index_from_prompt(
-            memory, upload_file_action.prompt_instructions, browser, task
+            memory,
+            upload_file_action.prompt_instructions,
+            browser,
+            task,
+            expected_tags=["input"],
         )
         if index is None:
             return
@@ -0,0 +1,100 @@
+import logging
+import time
+
+from optexity.inference.agents.error_handler.error_handler import ErrorHandlerOutput
+from optexity.inference.core.interaction.handle_overlay_popup import (
+    OVERLAY_CONTAINER_SELECTOR,
+)
+from optexity.inference.infra.browser import Browser
+
+logger = logging.getLogger(__name__)
+
+## Statuses bot challenges such as Cloudflare's answer with before the real page loads
+CHALLENGE_STATUSES = {403, 429, 503}
+## Requests started or finished this recently mean the page is still loading content
+NETWORK_QUIET_SECONDS = 0.5
+
+## Scrolls the element to the middle of the viewport, away from sticky headers, and
+## returns the dialog or consent banner drawn on top of its centre, if any.
+COVERING_ELEMENT_SCRIPT = """
+(el, containerSelector) => {
+    el.scrollIntoView({ block: "center", inline: "center" });
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) return { in_viewport: false, covered_by: null };
+    const x = rect.left + rect.width / 2;
+    const y = rect.top + rect.height / 2;
+    if (x < 0 || y < 0 || x > window.innerWidth || y > window.innerHeight) {
+        return { in_viewport: false, covered_by: null };
+    }
+    const top = document.elementFromPoint(x, y);
+    if (top === null || top === el || el.contains(top) || top.contains(el)) {
+        return { in_viewport: true, covered_by: null };
+    }
+    const overlay = top.closest(containerSelector);
+    if (overlay === null || overlay.contains(el)) {
+        return { in_viewport: true, covered_by: null };
+    }
+    const description = overlay.tagName.toLowerCase()
+        + (overlay.id ? "#" + overlay.id : "")
+        + (typeof overlay.className === "string" && overlay.className ? "." + overlay.className.trim().split(/\\s+/).join(".") : "");
+    return { in_viewport: true, covered_by: description };
+}
+"""
+
+
+async def classify_error_locally(
+    command: str, browser: Browser
+) -> ErrorHandlerOutput | None:
+    """
+    Classifies a locator failure from cheap page signals: the current page's HTTP
+    status, document.readyState, recent network activity and elementFromPoint over
+    the locator. Returns None when the signals are ambiguous and the LLM should decide.
+    """
+    try:
+        page = await browser.get_current_page()
+        if page is None:
+            return None
+
+        status = browser.main_frame_statuses.get(page)
+        if status is not None and status >= 400:
+            if status in CHALLENGE_STATUSES:
+                return ErrorHandlerOutput(
+                    error_type="website_not_loaded",
+                    detailed_reason=f"Page answered with HTTP status {status}, which may be a bot challenge that has not finished.",
+                )
+            return None
+
+        ready_state = await page.evaluate("() => document.readyState")
+        locator = await browser.get_locator_from_command(command)
+        if locator is None:
+            return None
+        count = await locator.count()
+
+        if count == 0:
+            if ready_state != "complete":
+                return ErrorHandlerOutput(
+                    error_type="website_not_loaded",
+                    detailed_reason=f"Page is still loading (document.readyState={ready_state}) and element `{command}` is not yet present.",
+                )
+            ## Long-poll requests stay open, so only recent activity counts. Beacons and
+            ## sockets are not tracked by the browser, they never let a page go quiet.
+            quiet_seconds = time.monotonic() - browser.last_network_activity
+            if quiet_seconds < NETWORK_QUIET_SECONDS:
+                return ErrorHandlerOutput(
+                    error_type="website_not_loaded",
+                    detailed_reason=f"Page is still making network requests and element `{command}` is not yet present.",
+                )
+            return None
+
+        result = await locator.first.evaluate(
+            COVERING_ELEMENT_SCRIPT, OVERLAY_CONTAINER_SELECTOR, timeout=1000
+        )
+        if result.get("covered_by") is not None:
+            return ErrorHandlerOutput(
+                error_type="overlay_popup_blocking",
+                detailed_reason=f"Element `{command}` is covered by `{result['covered_by']}`.",
+            )
+    except Exception as e:
+        logger.debug(f"Local error classification failed, deferring to LLM: {e}")
+
+    return None
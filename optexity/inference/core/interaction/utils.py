@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from pathlib import Path
 from typing import Callable
@@ -18,7 +19,11 @@ index_prediction_agent = ActionPredictionLocatorAxtree()
 
 
 async def get_index_from_prompt(
-    memory: Memory, prompt_instructions: str, browser: Browser, task: Task
+    memory: Memory,
+    prompt_instructions: str,
+    browser: Browser,
+    task: Task,
+    expected_tags: list[str] | None = None,
 ):
     browser_state_summary = await browser.get_browser_state_summary()
     memory.browser_states[-1] = BrowserState(
@@ -31,8 +36,11 @@ async def get_index_from_prompt(
     )
 
     try:
-        final_prompt, response, token_usage = index_prediction_agent.predict_action(
-            prompt_instructions, memory.browser_states[-1].axtree
+        final_prompt, response, token_usage = await asyncio.to_thread(
+            index_prediction_agent.predict_action,
+            prompt_instructions,
+            memory.browser_states[-1].axtree,
+            expected_tags=expected_tags,
         )
         memory.token_usage += token_usage
         memory.browser_states[-1].final_prompt = final_prompt
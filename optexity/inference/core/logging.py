@@ -13,8 +13,10 @@ import httpx
 
 from optexity.schema.automation import ActionNode
 from optexity.schema.memory import Memory
-from optexity.schema.task import Task
+from optexity.schema.task import Task, TaskResult
 from optexity.schema.token_usage import TokenUsage
+from optexity.schema.trace import trace_span
+from optexity.utils.metrics import track_upload
 from optexity.utils.settings import settings
 from optexity.utils.utils import save_screenshot
 
@@ -127,15 +129,16 @@ async def save_output_data_in_server(task: Task, memory: Memory):
         if len(for_loop_status) > 0:
             body["for_loop_status"] = for_loop_status
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                url,
-                headers=headers,
-                json=body,
-            )
+        with trace_span("save_output_data", "upload"), track_upload("output_data"):
+            async with httpx.AsyncClient(timeout=30.0) as client:
+                response = await client.post(
+                    url,
+                    headers=headers,
+                    json=body,
+                )
 
-            response.raise_for_status()
-            return response.json()
+                response.raise_for_status()
+                return response.json()
     except httpx.HTTPStatusError as e:
         logger.error(
             f"Failed to save output data in server: {e.response.status_code} - {e.response.text}"
@@ -201,14 +204,18 @@ async def save_downloads_in_server(task: Task, memory: Memory):
         if len(files) == 0:
             return
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        with (
+            trace_span("save_downloads", "upload", files=len(files)),
+            track_upload("downloads"),
+        ):
+            async with httpx.AsyncClient(timeout=30.0) as client:
 
-            response = await client.post(
-                url, headers=headers, data=payload, files=files
-            )
+                response = await client.post(
+                    url, headers=headers, data=payload, files=files
+                )
 
-            response.raise_for_status()
-            return response.json()
+                response.raise_for_status()
+                return response.json()
     except httpx.HTTPStatusError as e:
         logger.error(
             f"Failed to save downloads in server: {e.response.status_code} - {e.response.text}"
@@ -226,20 +233,23 @@ async def save_trajectory_in_server(task: Task):
             "task_id": task.task_id,  # form field
         }
 
-        tar_bytes = create_tar_in_memory(task.task_directory, task.task_id)
-        files = {
-            "compressed_trajectory": (
-                f"{task.task_id}.tar.gz",
-                tar_bytes,
-                "application/gzip",
-            )
-        }
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        with trace_span("save_trajectory", "upload"), track_upload("trajectory"):
+            tar_bytes = create_tar_in_memory(task.task_directory, task.task_id)
+            files = {
+                "compressed_trajectory": (
+                    f"{task.task_id}.tar.gz",
+                    tar_bytes,
+                    "application/gzip",
+                )
+            }
+            async with httpx.AsyncClient(timeout=30.0) as client:
 
-            response = await client.post(url, headers=headers, data=data, files=files)
+                response = await client.post(
+                    url, headers=headers, data=data, files=files
+                )
 
-            response.raise_for_status()
-            return response.json()
+                response.raise_for_status()
+                return response.json()
     except httpx.HTTPStatusError as e:
         logger.error(
             f"Failed to save trajectory in server: {e.response.status_code} - {e.response.text}"
@@ -348,6 +358,13 @@ async def save_latest_memory_state_locally(
         async with aiofiles.open(step_directory / "state.json", "w") as f:
             await f.write(json.dumps(state_dict, indent=4))
 
+        async with aiofiles.open(step_directory / "trace.json", "w") as f:
+            await f.write(
+                json.dumps(
+                    memory.trace.to_chrome_trace(step_index=automation_state.step_index)
+                )
+            )
+
         if browser_state.axtree:
             async with aiofiles.open(step_directory / "axtree.txt", "w") as f:
                 await f.write(browser_state.axtree)
@@ -360,6 +377,13 @@ async def save_latest_memory_state_locally(
             async with aiofiles.open(step_directory / "llm_response.json", "w") as f:
                 await f.write(json.dumps(browser_state.llm_response, indent=4))
 
+        llm_calls = memory.recording.llm_calls_for_step(automation_state.step_index)
+        if llm_calls:
+            async with aiofiles.open(step_directory / "llm_calls.json", "w") as f:
+                await f.write(
+                    json.dumps([call.model_dump() for call in llm_calls], indent=4)
+                )
+
         if node:
             async with aiofiles.open(step_directory / "action_node.json", "w") as f:
                 await f.write(
@@ -412,6 +436,62 @@ async def save_latest_memory_state_locally(
         logger.error(f"Failed to save latest memory state locally: {e}")
 
 
+async def save_trace_locally(task: Task, memory: Memory):
+    try:
+        async with aiofiles.open(task.logs_directory / "trace.json", "w") as f:
+            await f.write(json.dumps(memory.trace.to_chrome_trace()))
+    except Exception as e:
+        logger.error(f"Failed to save trace locally: {e}")
+
+
+async def save_task_result_locally(task: Task, memory: Memory):
+    try:
+        if task.status not in ("success", "failed", "cancelled"):
+            return
+        result = TaskResult(
+            status=task.status,
+            error=task.error,
+            output_data=memory.variables.output_data,
+            for_loop_status=memory.variables.for_loop_status,
+            final_screenshot=memory.final_screenshot,
+        )
+        async with aiofiles.open(task.result_path, "w") as f:
+            await f.write(result.model_dump_json())
+    except Exception as e:
+        logger.error(f"Failed to save task result locally: {e}")
+
+
+async def save_task_locally(task: Task):
+    """Saves the task without credentials, used by the replay engine."""
+    try:
+        async with aiofiles.open(task.logs_directory / "task.json", "w") as f:
+            await f.write(
+                task.model_dump_json(
+                    indent=4,
+                    exclude={"api_key", "callback_url", "secure_parameters"},
+                )
+            )
+    except Exception as e:
+        logger.error(f"Failed to save task locally: {e}")
+
+
+async def save_network_recording_locally(task: Task, memory: Memory):
+    try:
+        if len(memory.recording.network) == 0:
+            return
+        network_directory = task.logs_directory / "network"
+        network_directory.mkdir(parents=True, exist_ok=True)
+        async with aiofiles.open(network_directory / "index.json", "w") as f:
+            await f.write(
+                json.dumps(
+                    [record.model_dump() for record in memory.recording.network],
+                    indent=4,
+                )
+            )
+    except Exception as e:
+        logger.error(f"Failed to save network recording locally: {e}")
+
+
 async def delete_local_data(task: Task):
     try:
         if settings.DEPLOYMENT == "dev" or task.task_directory is None:
@@ -0,0 +1,375 @@
+import json
+import logging
+import shutil
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Literal
+
+import aiofiles
+from pydantic import BaseModel, Field
+
+from optexity.bench.fixture_server import FixtureServer
+from optexity.inference.core.logging import save_trace_locally
+from optexity.inference.infra.actual_browser import ActualBrowser
+from optexity.inference.infra.asset_cache import strip_encoding_headers
+from optexity.inference.infra.browser import Browser
+from optexity.schema.automation import ActionNode
+from optexity.schema.memory import Memory
+from optexity.schema.recording import (
+    LLMCallRecord,
+    NetworkRecord,
+    set_current_recording,
+)
+from optexity.schema.task import Task
+from optexity.schema.trace import set_current_trace
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RecordedStep(BaseModel):
+    step_index: int
+    node: ActionNode
+    llm_calls: list[LLMCallRecord] = Field(default_factory=list)
+    state: dict = Field(default_factory=dict)
+    recorded_seconds: float | None = None
+
+
+class ReplayDivergence(BaseModel):
+    kind: Literal[
+        "error", "url", "title", "downloads", "llm_missing", "llm_unused", "network"
+    ]
+    expected: Any = None
+    actual: Any = None
+
+
+class ReplayStepResult(BaseModel):
+    step_index: int
+    action: str
+    recorded_seconds: float | None = None
+    replay_seconds: float | None = None
+    delta_seconds: float | None = None
+    divergences: list[ReplayDivergence] = Field(default_factory=list)
+
+
+class ReplayReport(BaseModel):
+    source: str
+    replay_directory: str
+    steps: list[ReplayStepResult] = Field(default_factory=list)
+    recorded_total_seconds: float = 0.0
+    replay_total_seconds: float = 0.0
+
+    @property
+    def divergent_steps(self) -> list[int]:
+        return [step.step_index for step in self.steps if len(step.divergences) > 0]
+
+
+class NetworkReplay:
+    """
+    Serves recorded responses through context.route, in recorded order for repeated
+    requests to the same URL. Requests that were never recorded are aborted.
+    """
+
+    def __init__(self, network_directory: Path):
+        self.network_directory = network_directory
+        self.responses: dict[tuple[str, str], list[NetworkRecord]] = defaultdict(list)
+        self.served: dict[tuple[str, str], int] = defaultdict(int)
+        self.misses: list[str] = []
+
+        index_path = network_directory / "index.json"
+        if index_path.exists():
+            for record in json.loads(index_path.read_text()):
+                record = NetworkRecord.model_validate(record)
+                self.responses[(record.method, record.url)].append(record)
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.responses) == 0
+
+    async def handle(self, route):
+        request = route.request
+        key = (request.method, request.url)
+        records = self.responses.get(key)
+        if not records:
+            self.misses.append(f"{request.method} {request.url}")
+            await route.abort()
+            return
+
+        record = records[min(self.served[key], len(records) - 1)]
+        self.served[key] += 1
+
+        body = b""
+        if record.body_file is not None:
+            async with aiofiles.open(
+                self.network_directory / record.body_file, "rb"
+            ) as f:
+                body = await f.read()
+
+        await route.fulfill(
+            status=record.status,
+            headers=strip_encoding_headers(record.headers),
+            body=body,
+        )
+
+
+def get_logs_directory(path: Path) -> Path:
+    """Accepts either a task directory or its logs directory."""
+    if (path / "logs").is_dir():
+        return path / "logs"
+    return path
+
+
+def load_recorded_steps(logs_directory: Path) -> list[RecordedStep]:
+    steps = []
+    for step_directory in logs_directory.glob("step_*"):
+        node_path = step_directory / "action_node.json"
+        if not node_path.exists():
+            continue
+
+        llm_calls = []
+        if (step_directory / "llm_calls.json").exists():
+            llm_calls = [
+                LLMCallRecord.model_validate(call)
+                for call in json.loads((step_directory / "llm_calls.json").read_text())
+            ]
+
+        state = {}
+        if (step_directory / "state.json").exists():
+            state = json.loads((step_directory / "state.json").read_text())
+
+        recorded_seconds = None
+        if (step_directory / "trace.json").exists():
+            events = json.loads((step_directory / "trace.json").read_text())
+            recorded_seconds = sum(
+                event["dur"] / 1e6
+                for event in events.get("traceEvents", [])
+                if event["cat"] == "node"
+            )
+
+        steps.append(
+            RecordedStep(
+                step_index=int(step_directory.name.split("_")[1]),
+                node=ActionNode.model_validate_json(node_path.read_text()),
+                llm_calls=llm_calls,
+                state=state,
+                recorded_seconds=recorded_seconds,
+            )
+        )
+
+    return sorted(steps, key=lambda step: step.step_index)
+
+
+def load_recorded_task(logs_directory: Path, save_directory: Path) -> Task:
+    task_data = json.loads((logs_directory / "task.json").read_text())
+    ## Secure parameters are never saved, recorded nodes already hold their values
+    task_data["automation"]["parameters"]["secure_parameters"] = {}
+    task_data.update(
+        task_id=str(uuid.uuid4()),
+        api_key="replay",
+        secure_parameters={},
+        status="queued",
+        save_directory=str(save_directory),
+        is_dedicated=False,
+    )
+    return Task.model_validate(task_data)
+
+
+def describe_node(node: ActionNode) -> str:
+    for action in [
+        node.interaction_action,
+        node.extraction_action,
+        node.assertion_action,
+    ]:
+        if action is None:
+            continue
+        for name, value in action:
+            if isinstance(value, BaseModel):
+                return name
+    if node.python_script_action is not None:
+        return "python_script"
+    return "unknown"
+
+
+def compare_step(
+    step: RecordedStep, memory: Memory, network_misses: list[str]
+) -> list[ReplayDivergence]:
+    from optexity.inference.models.replay import ReplayLLMModel
+
+    divergences = []
+    if len(memory.browser_states) > 0:
+        browser_state = memory.browser_states[-1]
+        for kind, actual in [
+            ("url", browser_state.url),
+            ("title", browser_state.title),
+        ]:
+            expected = step.state.get(kind)
+            if expected is not None and expected != actual:
+                divergences.append(
+                    ReplayDivergence(kind=kind, expected=expected, actual=actual)
+                )
+
+    expected_downloads = step.state.get("downloaded_files")
+    actual_downloads = [download.name for download in memory.downloads]
+    if expected_downloads is not None and len(expected_downloads) != len(
+        actual_downloads
+    ):
+        divergences.append(
+            ReplayDivergence(
+                kind="downloads", expected=expected_downloads, actual=actual_downloads
+            )
+        )
+
+    for schema_name in ReplayLLMModel.misses:
+        divergences.append(ReplayDivergence(kind="llm_missing", actual=schema_name))
+    for call in ReplayLLMModel.pending:
+        divergences.append(
+            ReplayDivergence(kind="llm_unused", expected=call.schema_name)
+        )
+    for miss in network_misses:
+        divergences.append(ReplayDivergence(kind="network", actual=miss))
+
+    return divergences
+
+
+async def replay_trajectory(
+    recorded_directory: Path,
+    save_directory: Path = Path("/tmp/optexity_replay"),
+    headless: bool = True,
+    replay_network: bool = True,
+    child_process_id: int = 0,
+    keep_data: bool = True,
+) -> ReplayReport:
+    """
+    Re-runs the action nodes of a recorded run step by step, with LLM answers from
+    the recorded llm_calls.json files and, when recorded, network responses from
+    logs/network. Reports divergences and timing deltas per step.
+    """
+    from optexity.inference.models.replay import ReplayLLMModel
+
+    logs_directory = get_logs_directory(recorded_directory)
+    steps = load_recorded_steps(logs_directory)
+    task = load_recorded_task(logs_directory, save_directory)
+    network_replay = NetworkReplay(logs_directory / "network")
+
+    ## Answers the engine's server calls locally
+    server = FixtureServer()
+    server.start()
+    settings.SERVER_URL = server.base_url
+    settings.LOCAL_CALLBACK_URL = None
+    settings.LLM_BACKEND = "replay"
+    ## Imported after LLM_BACKEND is set since agents create their models on import
+    from optexity.inference.core.run_automation import run_action_node
+
+    memory = Memory(unique_child_arn="replay")
+    set_current_trace(memory.trace)
+    set_current_recording(memory.recording)
+
+    report = ReplayReport(
+        source=str(recorded_directory), replay_directory=str(task.task_directory)
+    )
+
+    actual_browser = ActualBrowser(
+        channel=task.automation.browser_channel,
+        unique_child_arn=f"replay_{child_process_id}",
+        port=9222 + child_process_id,
+        headless=headless,
+    )
+    browser = None
+    try:
+        await actual_browser.start()
+        browser = Browser(
+            memory=memory,
+            headless=headless,
+            channel=task.automation.browser_channel,
+            debug_port=9222 + child_process_id,
+        )
+        await browser.start()
+
+        if replay_network and not network_replay.is_empty:
+            await browser.context.route("**/*", network_replay.handle)
+        elif replay_network:
+            logger.warning("No recorded network traffic, replaying against live sites")
+
+        await browser.go_to_url(task.automation.url)
+
+        for step in steps:
+            logger.info(
+                f"Replaying step {step.step_index} ({describe_node(step.node)})"
+            )
+            memory.automation_state.step_index = step.step_index - 1
+            ReplayLLMModel.load_step(step.llm_calls)
+            network_misses_before = len(network_replay.misses)
+            spans_before = len(memory.trace.spans)
+
+            divergences = []
+            try:
+                await run_action_node(step.node, task, memory, browser)
+            except Exception as e:
+                divergences.append(ReplayDivergence(kind="error", actual=str(e)))
+
+            replay_seconds = None
+            for span in memory.trace.spans[spans_before:]:
+                if span.category == "node" and span.duration_us is not None:
+                    replay_seconds = span.duration_us / 1e6
+                    break
+
+            divergences += compare_step(
+                step, memory, network_replay.misses[network_misses_before:]
+            )
+            report.steps.append(
+                ReplayStepResult(
+                    step_index=step.step_index,
+                    action=describe_node(step.node),
+                    recorded_seconds=step.recorded_seconds,
+                    replay_seconds=replay_seconds,
+                    delta_seconds=(
+                        replay_seconds - step.recorded_seconds
+                        if replay_seconds is not None
+                        and step.recorded_seconds is not None
+                        else None
+                    ),
+                    divergences=divergences,
+                )
+            )
+    finally:
+        await save_trace_locally(task, memory)
+        if browser is not None:
+            await browser.stop()
+        await actual_browser.stop(graceful=True)
+        server.stop()
+        if not keep_data:
+            shutil.rmtree(task.task_directory, ignore_errors=True)
+
+    report.recorded_total_seconds = sum(
+        step.recorded_seconds or 0.0 for step in report.steps
+    )
+    report.replay_total_seconds = sum(
+        step.replay_seconds or 0.0 for step in report.steps
+    )
+    return report
+
+
+def format_replay_report(report: ReplayReport) -> str:
+    lines = [
+        f"{'step':>5}  {'action':<20}{'recorded s':>12}{'replay s':>10}{'delta s':>10}  divergences"
+    ]
+    for step in report.steps:
+        recorded = (
+            f"{step.recorded_seconds:.2f}" if step.recorded_seconds is not None else "-"
+        )
+        replay = (
+            f"{step.replay_seconds:.2f}" if step.replay_seconds is not None else "-"
+        )
+        delta = f"{step.delta_seconds:+.2f}" if step.delta_seconds is not None else "-"
+        divergences = (
+            ", ".join(divergence.kind for divergence in step.divergences) or "-"
+        )
+        lines.append(
+            f"{step.step_index:>5}  {step.action:<20}{recorded:>12}{replay:>10}{delta:>10}  {divergences}"
+        )
+    lines.append(
+        f"Total: recorded {report.recorded_total_seconds:.2f}s, replay {report.replay_total_seconds:.2f}s, "
+        f"{len(report.divergent_steps)} of {len(report.steps)} steps diverged"
+    )
+    return "\n".join(lines)
@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import os
 import time
 import traceback
 from copy import deepcopy
@@ -7,13 +8,23 @@ from copy import deepcopy
 from patchright._impl._errors import TimeoutError as PatchrightTimeoutError
 from playwright._impl._errors import TimeoutError as PlaywrightTimeoutError
 
+from optexity.inference.core.cancellation import TaskCancelledError, check_cancelled
+from optexity.inference.core.compiled_code import evaluate_compiled_condition
+from optexity.inference.core.extraction_batch import (
+    ExtractionBatch,
+    set_current_extraction_batch,
+)
 from optexity.inference.core.interaction.utils import clean_download
 from optexity.inference.core.logging import (
     complete_task_in_server,
     initiate_callback,
     save_downloads_in_server,
     save_latest_memory_state_locally,
+    save_network_recording_locally,
     save_output_data_in_server,
+    save_task_locally,
+    save_task_result_locally,
+    save_trace_locally,
     save_trajectory_in_server,
     start_task_in_server,
 )
@@ -24,11 +35,18 @@ from optexity.inference.core.run_interaction import (
     run_interaction_action,
 )
 from optexity.inference.core.run_python_script import run_python_script_action
+from optexity.inference.infra.asset_cache import get_asset_cache
 from optexity.inference.infra.browser import Browser
+from optexity.inference.infra.process_memory import TaskMemorySampler
+from optexity.inference.infra.resource_blocker import ResourceBlocker
 from optexity.schema.actions.interaction_action import DownloadUrlAsPdfAction
 from optexity.schema.automation import ActionNode, ForLoopNode, IfElseNode
 from optexity.schema.memory import BrowserState, ForLoopStatus, Memory, OutputData
+from optexity.schema.recording import set_current_recording
 from optexity.schema.task import Task
+from optexity.schema.trace import set_current_trace
+from optexity.utils.metrics import metrics
+from optexity.utils.secret_store import SecretStore, set_current_secret_store
 from optexity.utils.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -71,10 +89,28 @@ async def run_automation(
     logger.info(f"Task {task.task_id} started running")
     memory = None
     browser = None
+    cancelled = False
+    retried = False
+    ## The worker's parent is the server, whose tree also holds the browser
+    memory_sampler = TaskMemorySampler(server_pid=os.getppid(), worker_pid=os.getpid())
+    secret_store = SecretStore()
+    set_current_secret_store(secret_store)
+    prefetch_secrets = None
+    extraction_batch = None
 
     try:
+        memory_sampler.start()
+        ## Resolves secrets while the browser starts, steps wait on them only if still in flight
+        prefetch_secrets = asyncio.create_task(
+            secret_store.prefetch(get_onepassword_references(task))
+        )
         await start_task_in_server(task)
         memory = Memory(unique_child_arn=unique_child_arn)
+        set_current_trace(memory.trace)
+        set_current_recording(memory.recording)
+        extraction_batch = ExtractionBatch(memory)
+        set_current_extraction_batch(extraction_batch)
+        await save_task_locally(task)
         memory.update_system_info()
 
         def _get_browser():
@@ -90,6 +126,18 @@ async def run_automation(
             )
 
         browser = _get_browser()
+        policy = task.automation.resource_blocking
+        if policy is not None:
+            browser.resource_blocker = ResourceBlocker(
+                policy,
+                allow_images=policy.allow_images_for_screenshots
+                and task.automation.uses_screenshots(),
+            )
+        if settings.ASSET_CACHE_ENABLED:
+            browser.asset_cache = get_asset_cache()
+        if settings.RECORD_NETWORK_TRAFFIC:
+            browser.network_recording_directory = task.logs_directory / "network"
+            browser.network_recording_directory.mkdir(parents=True, exist_ok=True)
         memory.update_system_info()
 
         automation = task.automation
@@ -97,8 +145,9 @@ async def run_automation(
         memory.automation_state.try_index = 0
 
         try:
-            await browser.start()
-            await browser.go_to_url("about:blank")
+            with memory.trace.span("browser_start", "cdp"):
+                await browser.start()
+                await browser.go_to_url("about:blank")
             memory.update_system_info()
         except Exception as e:
             logger.error(
@@ -133,26 +182,37 @@ async def run_automation(
                 except Exception as e:
                     logger.error(f"Error getting IP info: {e}")
 
-        await browser.go_to_url(task.automation.url)
+        with memory.trace.span("go_to_url", "cdp", url=task.automation.url):
+            await browser.go_to_url(task.automation.url)
         memory.update_system_info()
 
         full_automation = []
 
-        for node in automation.nodes:
-            if isinstance(node, ForLoopNode):
-                await handle_for_loop_node(node, memory, task, browser, full_automation)
-            elif isinstance(node, IfElseNode):
-                await handle_if_else_node(node, memory, task, browser, full_automation)
-            else:
-                full_automation.append(node.model_dump())
-                await run_action_node(
-                    node,
-                    task,
-                    memory,
-                    browser,
-                )
+        with memory.trace.span("task", "task", task_id=task.task_id):
+            for node in automation.nodes:
+                if isinstance(node, ForLoopNode):
+                    await handle_for_loop_node(
+                        node, memory, task, browser, full_automation
+                    )
+                elif isinstance(node, IfElseNode):
+                    await handle_if_else_node(
+                        node, memory, task, browser, full_automation
+                    )
+                else:
+                    full_automation.append(node.model_dump())
+                    await run_action_node(
+                        node,
+                        task,
+                        memory,
+                        browser,
+                    )
 
         task.status = "success"
+    except TaskCancelledError as e:
+        logger.info(f"Task {task.task_id} stopped: {e}")
+        cancelled = True
+        task.error = str(e)
+        task.status = "cancelled" if e.reason == "cancelled" else "failed"
     except AssertionError as e:
         logger.error(f"Assertion error: {e}")
         task.error = str(e)
@@ -166,6 +226,7 @@ async def run_automation(
             logger.info(
                 f"Running automations again with {max_retries - 1} retries left"
             )
+            retried = True
             return await run_automation(
                 task, unique_child_arn, child_process_id, max_retries - 1
             )
@@ -175,13 +236,57 @@ async def run_automation(
             task.status = "failed"
 
     finally:
-        if task and memory and browser:
+        if extraction_batch is not None:
+            ## A retried attempt's extractions are redone by the retry
+            if cancelled or retried:
+                extraction_batch.cancel()
+            else:
+                with memory.trace.span("deferred_extractions", "llm"):
+                    await extraction_batch.flush(task.get_remaining_seconds())
+            set_current_extraction_batch(None)
+        if task and memory and browser and not cancelled:
             await run_final_downloads_check(task, memory, browser)
             await run_post_processing_nodes(task, memory, browser)
+        memory_usage = await memory_sampler.stop()
+        if memory and settings.RECORD_TASK_MEMORY_USAGE:
+            memory.variables.output_data.append(
+                OutputData(
+                    unique_identifier="memory_usage",
+                    json_data=memory_usage.model_dump(),
+                )
+            )
+        if memory and browser and browser.resource_blocker is not None:
+            resource_blocking_stats = browser.resource_blocker.stats()
+            logger.info(
+                f"Blocked {resource_blocking_stats.requests_blocked} requests, "
+                f"about {resource_blocking_stats.estimated_bytes_saved} bytes saved"
+            )
+            memory.variables.output_data.append(
+                OutputData(
+                    unique_identifier="resource_blocking",
+                    json_data=resource_blocking_stats.model_dump(),
+                )
+            )
+        if memory and browser and browser.asset_cache is not None:
+            memory.variables.output_data.append(
+                OutputData(
+                    unique_identifier="asset_cache",
+                    json_data=browser.asset_cache.get_stats().model_dump(),
+                )
+            )
+            try:
+                browser.asset_cache.flush_stats()
+            except Exception as e:
+                logger.error(f"Error saving asset cache stats: {e}")
         if memory and browser:
             await run_final_logging(task, memory, browser, child_process_id)
         if browser is not None:
             await browser.stop()
+        if prefetch_secrets is not None and not prefetch_secrets.done():
+            prefetch_secrets.cancel()
+        secret_store.clear()
+        set_current_secret_store(None)
+        metrics.save_snapshot(task.worker_metrics_path)
 
     logger.info(f"Task {task.task_id} completed with status {task.status}")
     file_handler.flush()
@@ -189,6 +294,21 @@ async def run_automation(
     logging.getLogger(current_module).removeHandler(file_handler)
 
 
+def get_onepassword_references(task: Task) -> list[tuple[str, str, str]]:
+    """1Password values behind the secure parameters the automation's nodes use."""
+    automation_json = task.automation.model_dump_json(
+        include={"nodes", "post_processing_nodes"}
+    )
+    references = []
+    for name, values in task.secure_parameters.items():
+        if f"{{{name}[" not in automation_json:
+            continue
+        for value in values:
+            if value.onepassword_reference is not None:
+                references.append(value.onepassword_reference)
+    return references
+
+
 async def run_final_downloads_check(task: Task, memory: Memory, browser: Browser):
 
     try:
@@ -268,6 +388,9 @@ async def run_final_logging(
         await save_output_data_in_server(task, memory)
         await save_downloads_in_server(task, memory)
         await save_latest_memory_state_locally(task, memory, None)
+        await save_trace_locally(task, memory)
+        await save_network_recording_locally(task, memory)
+        await save_task_result_locally(task, memory)
         await save_trajectory_in_server(task)
         await initiate_callback(task)
 
@@ -280,10 +403,23 @@ async def run_action_node(
     task: Task,
     memory: Memory,
     browser: Browser,
+):
+    check_cancelled()
+    memory.trace.step_index = memory.automation_state.step_index + 1
+    with memory.trace.span("node", "node", step_index=memory.trace.step_index):
+        await _run_action_node(action_node, task, memory, browser)
+
+
+async def _run_action_node(
+    action_node: ActionNode,
+    task: Task,
+    memory: Memory,
+    browser: Browser,
 ):
     memory.update_system_info()
-    await asyncio.sleep(action_node.before_sleep_time)
-    await browser.handle_new_tabs(0)
+    with memory.trace.span("before_sleep", "sleep"):
+        await asyncio.sleep(action_node.before_sleep_time)
+        await browser.handle_new_tabs(0)
 
     memory.automation_state.step_index += 1
     memory.automation_state.try_index = 0
@@ -295,14 +431,15 @@ async def run_action_node(
     # ## TODO: optimize this by taking screenshot and axtree only if needed
     # browser_state_summary = await browser.get_browser_state_summary()
 
-    memory.browser_states.append(
-        BrowserState(
-            url=await browser.get_current_page_url(),
-            screenshot=await browser.get_screenshot(),
-            title=await browser.get_current_page_title(),
-            axtree=None,
+    with memory.trace.span("initial_state", "cdp"):
+        memory.browser_states.append(
+            BrowserState(
+                url=await browser.get_current_page_url(),
+                screenshot=await browser.get_screenshot(),
+                title=await browser.get_current_page_title(),
+                axtree=None,
+            )
         )
-    )
 
     logger.debug(f"-----Running node new {memory.automation_state.step_index}-----")
 
@@ -311,34 +448,40 @@ async def run_action_node(
             ## Assuming network calls are only made during interaction actions and not during extraction actions
             await browser.clear_network_calls()
 
-            await run_interaction_action(
-                action_node.interaction_action, task, memory, browser, 2
-            )
+            with memory.trace.span("interaction_action", "action"):
+                await run_interaction_action(
+                    action_node.interaction_action, task, memory, browser, 2
+                )
         elif action_node.extraction_action:
-            await run_extraction_action(
-                action_node.extraction_action, memory, browser, task
-            )
+            with memory.trace.span("extraction_action", "action"):
+                await run_extraction_action(
+                    action_node.extraction_action, memory, browser, task
+                )
         elif action_node.python_script_action:
-            await run_python_script_action(
-                action_node.python_script_action, memory, browser
-            )
+            with memory.trace.span("python_script_action", "action"):
+                await run_python_script_action(
+                    action_node.python_script_action, memory, browser
+                )
         elif action_node.assertion_action:
-            await run_assertion_action(
-                action_node.assertion_action, memory, browser, task
-            )
+            with memory.trace.span("assertion_action", "action"):
+                await run_assertion_action(
+                    action_node.assertion_action, memory, browser, task
+                )
 
     except Exception as e:
         logger.error(f"Error running node {memory.automation_state.step_index}: {e}")
         raise e
     finally:
-        await save_latest_memory_state_locally(task, memory, action_node)
+        with memory.trace.span("save_state", "io"):
+            await save_latest_memory_state_locally(task, memory, action_node)
         if memory.automation_state.step_index % 5 == 0:
             await save_trajectory_in_server(task)
 
     if action_node.expect_new_tab:
-        found_new_tab, total_time = await browser.handle_new_tabs(
-            action_node.max_new_tab_wait_time
-        )
+        with memory.trace.span("new_tab_wait", "sleep"):
+            found_new_tab, total_time = await browser.handle_new_tabs(
+                action_node.max_new_tab_wait_time
+            )
         if not found_new_tab:
             logger.warning(
                 f"No new tab found after {action_node.max_new_tab_wait_time} seconds, even though expect_new_tab is True"
@@ -347,7 +490,8 @@ async def run_action_node(
             logger.debug(f"Switched to new tab after {total_time} seconds, as expected")
 
     else:
-        await sleep_for_page_to_load(browser, action_node.end_sleep_time)
+        with memory.trace.span("end_sleep", "sleep"):
+            await sleep_for_page_to_load(browser, action_node.end_sleep_time)
 
     logger.debug(f"-----Finished node {memory.automation_state.step_index}-----")
     memory.update_system_info()
@@ -371,10 +515,8 @@ async def sleep_for_page_to_load(browser: Browser, sleep_time: float):
 
 
 def evaluate_condition(condition: str, memory: Memory, task: Task) -> bool:
-    return eval(
-        condition,
-        {},
-        {**task.input_parameters, **memory.variables.generated_variables},
+    return evaluate_compiled_condition(
+        condition, {**task.input_parameters, **memory.variables.generated_variables}
     )
 
 
@@ -464,6 +606,8 @@ async def handle_for_loop_node(
                     status="success",
                 )
             )
+        except TaskCancelledError:
+            raise
         except Exception as e:
             logger.error(
                 f"Error running for loop node {for_loop_node.variable_name}: {e}"
@@ -1,12 +1,23 @@
+import asyncio
 import logging
+import tempfile
 import traceback
+from pathlib import Path
 
 import aiofiles
 import httpx
+from pydantic import ValidationError
 
+from optexity.inference.core.compiled_code import get_code_fn
+from optexity.inference.core.extraction_batch import (
+    get_current_extraction_batch,
+    get_extraction_model,
+    get_extraction_prompts,
+)
 from optexity.inference.core.run_two_fa import run_two_fa_action
 from optexity.inference.infra.browser import Browser
 from optexity.inference.models import GeminiModels, get_llm_model
+from optexity.inference.models.llm_model import LLMModel
 from optexity.schema.actions.extraction_action import (
     ExtractionAction,
     LLMExtraction,
@@ -25,6 +36,17 @@ from optexity.schema.memory import (
     ScreenshotData,
 )
 from optexity.schema.task import Task
+from optexity.schema.token_usage import TokenUsage
+from optexity.utils.pdf import (
+    extract_text_pages,
+    extract_with_patterns,
+    get_page_count,
+    group_text_pages,
+    has_text_layer,
+    merge_extraction_results,
+    split_pdf,
+)
+from optexity.utils.settings import settings
 
 logger = logging.getLogger(__name__)
 
@@ -151,17 +173,14 @@ async def handle_llm_extraction(
     else:
         screenshot = None
 
-    system_instruction = f"""
-    You are an expert in extracting information from a website. You will be given an axtree of a webpage.
-    Your task is to extract the information from the webpage and return it in the format specified by the instructions. You will be first provided the instructions and then the axtree.
-    Instructions: {llm_extraction.extraction_instructions}
-    """
+    extraction_batch = get_current_extraction_batch()
+    if llm_extraction.deferred and extraction_batch is not None:
+        output_data = OutputData(unique_identifier=unique_identifier)
+        memory.variables.output_data.append(output_data)
+        extraction_batch.add(llm_extraction, axtree, screenshot, output_data)
+        return output_data
 
-    prompt = f"""
-    [INPUT]
-    Axtree: {axtree}
-    [/INPUT]
-    """
+    system_instruction, prompt = get_extraction_prompts(llm_extraction, axtree)
 
     if llm_extraction.llm_provider == "gemini":
         model_name = GeminiModels(llm_extraction.llm_model_name)
@@ -169,11 +188,13 @@ async def handle_llm_extraction(
     else:
         raise ValueError(f"Invalid LLM provider: {llm_extraction.llm_provider}")
 
-    response, token_usage = llm_model.get_model_response_with_structured_output(
+    response, token_usage = await asyncio.to_thread(
+        llm_model.get_model_response_with_structured_output,
         prompt=prompt,
         response_schema=llm_extraction.build_model(),
         screenshot=screenshot,
         system_instruction=system_instruction,
+        priority="bulk",
     )
     response_dict = response.model_dump()
     output_data = OutputData(
@@ -247,9 +268,7 @@ async def handle_python_script_extraction(
     task: Task,
     unique_identifier: str | None = None,
 ):
-    local_vars = {}
-    exec(python_script_extraction.script, {}, local_vars)
-    code_fn = local_vars["code_fn"]
+    code_fn = get_code_fn(python_script_extraction.script)
     axtree = memory.browser_states[-1].axtree
     result = await code_fn(axtree)
     if result is not None:
@@ -291,50 +310,200 @@ async def download_request(
 
 async def handle_pdf_extraction(pdf_extraction: PDFExtraction, memory: Memory):
     """
-    Expects the PDF file to be in the downloads directory and the filename to be the same as the one specified in the PDFExtraction schema.
-    If the PDF file is not found, it will use the first PDF file in the downloads directory.
-    If there are multiple PDF files in the downloads directory, it will raise an error.
-    TODO: handle multiple PDF files in the downloads directory.
+    Extracts from every download whose name contains the filename specified in the
+    PDFExtraction schema, or from the only download if none match. Matching PDFs are
+    processed concurrently, and PDFs longer than PDF_CHUNK_PAGES are split into page
+    ranges whose results are merged.
     """
-    pdf_file = None
-    for path in memory.downloads:
-        if pdf_extraction.filename in path.name:
-            pdf_file = path
-            break
-    if pdf_file is None:
+    pdf_files = [
+        path for path in memory.downloads if pdf_extraction.filename in path.name
+    ]
+    if len(pdf_files) == 0:
         if len(memory.downloads) == 1:
-            pdf_file = memory.downloads[0]
+            pdf_files = [memory.downloads[0]]
         else:
             logger.error(
                 f"No matching PDF file found in downloads with filename {pdf_extraction.filename}. Total downloads: {len(memory.downloads)}"
             )
             return
 
-    if pdf_extraction.llm_provider == "gemini":
-        model_name = GeminiModels(pdf_extraction.llm_model_name)
-        llm_model.model_name = model_name
-    else:
-        raise ValueError(f"Invalid LLM provider: {pdf_extraction.llm_provider}")
-
-    system_instruction = "Extract the information from the PDF file and return it in the format specified by the instructions."
-    response, token_usage = llm_model.get_model_response_with_structured_output(
-        prompt=pdf_extraction.extraction_instructions,
-        response_schema=pdf_extraction.build_model(),
-        pdf_url=pdf_file,
-        system_instruction=system_instruction,
+    model = get_extraction_model(
+        pdf_extraction.llm_provider, pdf_extraction.llm_model_name
     )
-    response_dict = response.model_dump()
-    output_data = OutputData(
-        unique_identifier=str(pdf_file.name), json_data=response_dict
+    semaphore = asyncio.Semaphore(settings.PDF_EXTRACTION_CONCURRENCY)
+    system_instruction = "Extract the information from the PDF file and return it in the format specified by the instructions."
+    results = await asyncio.gather(
+        *[
+            extract_pdf_file(
+                pdf_file, pdf_extraction, model, semaphore, system_instruction
+            )
+            for pdf_file in pdf_files
+        ],
+        return_exceptions=True,
     )
+    if all(isinstance(result, Exception) for result in results):
+        raise results[0]
 
-    logger.debug(f"Response: {response_dict}")
-
-    memory.token_usage += token_usage
-    memory.variables.output_data.append(output_data)
+    output_data = None
+    for pdf_file, result in zip(pdf_files, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error extracting from {pdf_file.name}: {result}")
+            continue
+        response_dict, token_usage = result
+        logger.debug(f"Response for {pdf_file.name}: {response_dict}")
+        memory.token_usage += token_usage
+        output_data = OutputData(
+            unique_identifier=str(pdf_file.name), json_data=response_dict
+        )
+        memory.variables.output_data.append(output_data)
 
     memory.browser_states[-1].final_prompt = (
         f"{system_instruction}\n{pdf_extraction.extraction_instructions}"
     )
 
     return output_data
+
+
+async def extract_pdf_file(
+    pdf_file: Path,
+    pdf_extraction: PDFExtraction,
+    model: LLMModel,
+    semaphore: asyncio.Semaphore,
+    system_instruction: str,
+) -> tuple[dict, TokenUsage]:
+    if pdf_extraction.use_text_layer:
+        result = await extract_pdf_text_layer(
+            pdf_file, pdf_extraction, model, semaphore
+        )
+        if result is not None:
+            return result
+
+    try:
+        page_count = await asyncio.to_thread(get_page_count, pdf_file)
+    except Exception as e:
+        logger.warning(
+            f"Could not read pages of {pdf_file.name}, sending it whole: {e}"
+        )
+        page_count = 0
+
+    if page_count <= settings.PDF_CHUNK_PAGES:
+        return await extract_pdf_chunk(
+            pdf_file, pdf_extraction, model, semaphore, system_instruction
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        chunks = await asyncio.to_thread(
+            split_pdf, pdf_file, settings.PDF_CHUNK_PAGES, Path(directory)
+        )
+        logger.info(f"Extracting {pdf_file.name} in {len(chunks)} page ranges")
+        results = await asyncio.gather(
+            *[
+                extract_pdf_chunk(
+                    chunk,
+                    pdf_extraction,
+                    model,
+                    semaphore,
+                    f"{system_instruction}\nThis file holds pages {first_page} to {last_page} of a {page_count} page document. Only extract what these pages contain and leave everything else empty.",
+                )
+                for chunk, first_page, last_page in chunks
+            ]
+        )
+
+    token_usage = TokenUsage()
+    for _, chunk_token_usage in results:
+        token_usage += chunk_token_usage
+    return merge_extraction_results([result for result, _ in results]), token_usage
+
+
+async def extract_pdf_text_layer(
+    pdf_file: Path,
+    pdf_extraction: PDFExtraction,
+    model: LLMModel,
+    semaphore: asyncio.Semaphore,
+) -> tuple[dict, TokenUsage] | None:
+    """
+    Extracts from the PDF's own text layer: with field_patterns alone if they match
+    every field, otherwise by sending the text to the LLM in page ranges of at most
+    PDF_TEXT_MAX_CHARS whose results are merged. Returns None for scanned PDFs,
+    which have no usable text layer.
+    """
+    try:
+        pages = await asyncio.to_thread(extract_text_pages, pdf_file)
+    except Exception as e:
+        logger.warning(f"Could not read the text layer of {pdf_file.name}: {e}")
+        return None
+    if not has_text_layer(pages, settings.PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE):
+        return None
+
+    response_schema = pdf_extraction.build_model()
+    if pdf_extraction.field_patterns is not None:
+        result = extract_with_patterns(
+            "\n".join(pages),
+            pdf_extraction.extraction_format,
+            pdf_extraction.field_patterns,
+        )
+        if result is not None:
+            try:
+                response = response_schema.model_validate(result)
+                logger.info(f"Extracted {pdf_file.name} with field patterns")
+                return response.model_dump(), TokenUsage()
+            except ValidationError as e:
+                logger.debug(f"Field patterns of {pdf_file.name} did not validate: {e}")
+
+    groups = group_text_pages(pages, settings.PDF_TEXT_MAX_CHARS)
+    logger.info(
+        f"Extracting {pdf_file.name} from the text of {len(pages)} pages in {len(groups)} page ranges"
+    )
+    system_instruction = f"""
+    Extract the information from the text of a PDF file and return it in the format specified by the instructions.
+    The text comes from the PDF's text layer with its page layout kept, so table columns are aligned with spaces.
+    Instructions: {pdf_extraction.extraction_instructions}
+    """
+    if len(groups) > 1:
+        system_instruction += f"""
+    You are given some pages of a {len(pages)} page document. Only extract what these pages contain and leave everything else empty.
+    """
+
+    async def _extract_group(group: list[tuple[int, str]]) -> tuple[dict, TokenUsage]:
+        prompt = (
+            "[INPUT]\n"
+            + "\n".join(
+                f"[PAGE {page_number}]\n{text}\n[/PAGE {page_number}]"
+                for page_number, text in group
+            )
+            + "\n[/INPUT]"
+        )
+        async with semaphore:
+            response, token_usage = await asyncio.to_thread(
+                model.get_model_response_with_structured_output,
+                prompt=prompt,
+                response_schema=response_schema,
+                system_instruction=system_instruction,
+                priority="bulk",
+            )
+        return response.model_dump(), token_usage
+
+    results = await asyncio.gather(*[_extract_group(group) for group in groups])
+    token_usage = TokenUsage()
+    for _, group_token_usage in results:
+        token_usage += group_token_usage
+    return merge_extraction_results([result for result, _ in results]), token_usage
+
+
+async def extract_pdf_chunk(
+    pdf_file: Path,
+    pdf_extraction: PDFExtraction,
+    model: LLMModel,
+    semaphore: asyncio.Semaphore,
+    system_instruction: str,
+) -> tuple[dict, TokenUsage]:
+    async with semaphore:
+        response, token_usage = await asyncio.to_thread(
+            model.get_model_response_with_structured_output,
+            prompt=pdf_extraction.extraction_instructions,
+            response_schema=pdf_extraction.build_model(),
+            pdf_url=pdf_file,
+            system_instruction=system_instruction,
+            priority="bulk",
+        )
+    return response.model_dump(), token_usage
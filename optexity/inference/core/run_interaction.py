@@ -12,11 +12,18 @@ from optexity.inference.core.interaction.handle_check import (
     handle_uncheck_element,
 )
 from optexity.inference.core.interaction.handle_click import handle_click_element
+from optexity.inference.core.interaction.handle_fill_form import handle_fill_form
 from optexity.inference.core.interaction.handle_hover import handle_hover_element
 from optexity.inference.core.interaction.handle_input import handle_input_text
 from optexity.inference.core.interaction.handle_keypress import handle_key_press
+from optexity.inference.core.interaction.handle_overlay_popup import (
+    handle_close_overlay_popup,
+)
 from optexity.inference.core.interaction.handle_select import handle_select_option
 from optexity.inference.core.interaction.handle_upload import handle_upload_file
+from optexity.inference.core.interaction.local_error_classifier import (
+    classify_error_locally,
+)
 from optexity.inference.infra.browser import Browser
 from optexity.schema.actions.interaction_action import (
     CloseOverlayPopupAction,
@@ -116,7 +123,7 @@ async def run_interaction_action(
                 interaction_action.agentic_task, task, memory, browser
             )
         elif interaction_action.close_overlay_popup:
-            await handle_agentic_task(
+            await handle_close_overlay_popup(
                 interaction_action.close_overlay_popup, task, memory, browser
             )
         elif interaction_action.go_to_url:
@@ -140,6 +147,15 @@ async def run_interaction_action(
             )
         elif interaction_action.key_press:
             await handle_key_press(interaction_action.key_press, memory, browser)
+        elif interaction_action.fill_form:
+            await handle_fill_form(
+                interaction_action.fill_form,
+                task,
+                memory,
+                browser,
+                interaction_action.max_timeout_seconds_per_try,
+                interaction_action.max_tries,
+            )
     except AssertLocatorPresenceException as e:
         await handle_assert_locator_presence_error(
             e, interaction_action, task, memory, browser, retries_left
@@ -224,19 +240,25 @@ async def handle_assert_locator_presence_error(
 ):
     logger.debug(f"Handling assert locator presence error: {error.command}")
     if retries_left > 1:
-        browser_state_summary = await browser.get_browser_state_summary()
-        memory.browser_states[-1] = BrowserState(
-            url=browser_state_summary.url,
-            screenshot=browser_state_summary.screenshot,
-            title=browser_state_summary.title,
-            axtree=browser_state_summary.dom_state.llm_representation(
-                remove_empty_nodes=task.automation.remove_empty_nodes_in_axtree
-            ),
-        )
-        final_prompt, response, token_usage = error_handler_agent.classify_error(
-            error.command, memory.browser_states[-1].screenshot
-        )
-        memory.token_usage += token_usage
+        response = await classify_error_locally(error.command, browser)
+        if response is not None:
+            logger.debug(f"Error classified locally as {response.error_type}")
+        else:
+            browser_state_summary = await browser.get_browser_state_summary()
+            memory.browser_states[-1] = BrowserState(
+                url=browser_state_summary.url,
+                screenshot=browser_state_summary.screenshot,
+                title=browser_state_summary.title,
+                axtree=browser_state_summary.dom_state.llm_representation(
+                    remove_empty_nodes=task.automation.remove_empty_nodes_in_axtree
+                ),
+            )
+            final_prompt, response, token_usage = await asyncio.to_thread(
+                error_handler_agent.classify_error,
+                error.command,
+                memory.browser_states[-1].screenshot,
+            )
+            memory.token_usage += token_usage
 
         if response.error_type == "website_not_loaded":
             await asyncio.sleep(5)
@@ -245,7 +267,9 @@ async def handle_assert_locator_presence_error(
             )
         elif response.error_type == "overlay_popup_blocking":
             close_overlay_popup_action = CloseOverlayPopupAction()
-            await handle_agentic_task(close_overlay_popup_action, task, memory, browser)
+            await handle_close_overlay_popup(
+                close_overlay_popup_action, task, memory, browser
+            )
             await run_interaction_action(
                 interaction_action, task, memory, browser, retries_left - 1
             )
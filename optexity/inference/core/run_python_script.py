@@ -1,5 +1,6 @@
 import logging
 
+from optexity.inference.core.compiled_code import get_code_fn
 from optexity.inference.infra.browser import Browser
 from optexity.schema.actions.misc_action import PythonScriptAction
 from optexity.schema.memory import Memory
@@ -10,11 +11,7 @@ logger = logging.getLogger(__name__)
 async def run_python_script_action(
     python_script_action: PythonScriptAction, memory: Memory, browser: Browser
 ):
-    local_vars = {}
-    exec(python_script_action.execution_code, {}, local_vars)
-
-    # Get the function
-    code_fn = local_vars["code_fn"]
+    code_fn = get_code_fn(python_script_action.execution_code)
 
     page = await browser.get_current_page()
     await code_fn(page)
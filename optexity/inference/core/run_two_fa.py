@@ -1,13 +1,18 @@
 import asyncio
 import logging
+import time
 from datetime import timedelta
 from urllib.parse import urljoin
 
 import httpx
 
+from optexity.inference.agents.two_fa_extraction.local_extraction import (
+    extract_code_locally,
+)
 from optexity.inference.agents.two_fa_extraction.two_fa_extraction import (
     TwoFAExtraction,
 )
+from optexity.inference.core.cancellation import check_cancelled
 from optexity.schema.actions.two_fa_action import (
     EmailTwoFAAction,
     SlackTwoFAAction,
@@ -17,6 +22,7 @@ from optexity.schema.inference import (
     FetchEmailMessagesRequest,
     FetchMessagesResponse,
     FetchSlackMessagesRequest,
+    Message,
 )
 from optexity.schema.memory import Memory
 from optexity.schema.task import Task
@@ -32,44 +38,60 @@ async def run_two_fa_action(two_fa_action: TwoFAAction, memory: Memory, task: Ta
         f"---------Running 2fa action {two_fa_action.model_dump_json()}---------"
     )
 
-    elapsed = 0
-    messages = None
+    start = time.monotonic()
+    deadline = start + two_fa_action.max_wait_time
+    interval = min(
+        settings.TWO_FA_INITIAL_POLL_INTERVAL_SECONDS, two_fa_action.check_interval
+    )
+    ## The LLM is only asked again once new messages arrive
+    messages_sent_to_llm: set[str] = set()
     code = None
 
-    while elapsed < two_fa_action.max_wait_time:
+    while time.monotonic() < deadline:
+        check_cancelled()
+        poll_start = time.monotonic()
+        wait_seconds = max(
+            0.0, min(settings.TWO_FA_LONG_POLL_SECONDS, deadline - poll_start)
+        )
         messages = await fetch_messages(
-            two_fa_action.action, memory, two_fa_action.max_wait_time, task
+            two_fa_action.action,
+            memory,
+            two_fa_action.max_wait_time,
+            task,
+            wait_seconds,
         )
+        elapsed = time.monotonic() - start
+
         if messages and len(messages) > 0:
-            final_prompt, response, token_usage = two_fa_extraction_agent.extract_code(
-                two_fa_action.instructions, messages
+            code = await extract_code(
+                two_fa_action, messages, memory, messages_sent_to_llm
             )
-            memory.token_usage += token_usage
-            code = None
-            if response.code is not None:
-                if isinstance(response.code, str):
-                    code = response.code
-                elif isinstance(response.code, list):
-                    if len(response.code) > 0:
-                        raise ValueError(f"Multiple 2FA codes found, {response.code}")
-                    else:
-                        code = response.code[0]
-
             if code is not None:
                 logger.debug(
-                    f"2FA code {code} found after {elapsed} seconds from {messages}"
+                    f"2FA code {code} found after {elapsed:.1f} seconds from {messages}"
                 )
                 break
             logger.debug(
-                f"No 2FA code found in messages, {messages}, waiting for {two_fa_action.check_interval} seconds"
+                f"No 2FA code found in messages, {messages}, waiting for {interval} seconds"
             )
         else:
             logger.debug(
-                f"No messages found for 2FA code after {elapsed} seconds, waiting for {two_fa_action.check_interval} seconds"
+                f"No messages found for 2FA code after {elapsed:.1f} seconds, waiting for {interval} seconds"
             )
 
-        await asyncio.sleep(two_fa_action.check_interval)
-        elapsed += two_fa_action.check_interval
+        ## A long-polled request may already have waited longer than the interval
+        await asyncio.sleep(
+            max(
+                0.0,
+                min(
+                    interval - (time.monotonic() - poll_start),
+                    deadline - time.monotonic(),
+                ),
+            )
+        )
+        interval = min(
+            interval * settings.TWO_FA_POLL_BACKOFF, two_fa_action.check_interval
+        )
 
     memory.automation_state.start_2fa_time = None
     if code is None:
@@ -80,11 +102,51 @@ async def run_two_fa_action(two_fa_action: TwoFAAction, memory: Memory, task: Ta
     return code
 
 
+async def extract_code(
+    two_fa_action: TwoFAAction,
+    messages: list[Message],
+    memory: Memory,
+    messages_sent_to_llm: set[str],
+) -> str | None:
+    ## Instructions may pick between codes, which regexes cannot follow
+    if two_fa_action.use_local_extraction and (
+        two_fa_action.instructions is None or two_fa_action.code_regex is not None
+    ):
+        code = extract_code_locally(
+            messages, two_fa_action.code_regex, two_fa_action.sender_regex
+        )
+        if code is not None:
+            logger.debug("2FA code found without the LLM")
+            return code
+
+    message_keys = {
+        message.message_id or f"{message.timestamp}:{message.message_text}"
+        for message in messages
+    }
+    if message_keys <= messages_sent_to_llm:
+        return None
+    messages_sent_to_llm.update(message_keys)
+
+    final_prompt, response, token_usage = await asyncio.to_thread(
+        two_fa_extraction_agent.extract_code, two_fa_action.instructions, messages
+    )
+    memory.token_usage += token_usage
+    if isinstance(response.code, str):
+        return response.code
+    if isinstance(response.code, list):
+        if len(response.code) > 1:
+            raise ValueError(f"Multiple 2FA codes found, {response.code}")
+        if len(response.code) == 1:
+            return response.code[0]
+    return None
+
+
 async def fetch_messages(
     action: EmailTwoFAAction | SlackTwoFAAction,
     memory: Memory,
     max_wait_time: float,
     task: Task,
+    wait_seconds: float | None = None,
 ):
 
     start_2fa_time = memory.automation_state.start_2fa_time
@@ -101,6 +163,7 @@ async def fetch_messages(
             sender_email_address=action.sender_email_address,
             start_2fa_time=start_2fa_time,
             end_2fa_time=end_2fa_time,
+            wait_seconds=wait_seconds,
         )
     elif isinstance(action, SlackTwoFAAction):
         url = urljoin(settings.SERVER_URL, settings.FETCH_SLACK_MESSAGES_ENDPOINT)
@@ -110,10 +173,11 @@ async def fetch_messages(
             sender_name=action.sender_name,
             start_2fa_time=start_2fa_time,
             end_2fa_time=end_2fa_time,
+            wait_seconds=wait_seconds,
         )
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with httpx.AsyncClient(timeout=30.0 + (wait_seconds or 0.0)) as client:
 
             response = await client.post(
                 url, json=body.model_dump(mode="json"), headers=headers
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import shutil
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+
+from optexity.inference.core.logging import (
+    complete_task_in_server,
+    delete_local_data,
+    initiate_callback,
+    save_downloads_in_server,
+    save_output_data_in_server,
+    start_task_in_server,
+)
+from optexity.schema.memory import Memory
+from optexity.schema.task import Task, TaskResult
+from optexity.schema.token_usage import TokenUsage
+from optexity.utils.metrics import (
+    COALESCED_WAITING_TASKS,
+    RESULT_CACHE_ENTRIES,
+    TASKS_DEDUPLICATED_TOTAL,
+)
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIRECTORY = Path("/tmp/optexity/result_cache")
+
+
+class CachedTaskResult(BaseModel):
+    result: TaskResult
+    downloads_directory: Path
+    stored_at: float
+
+
+def get_coalesce_key(task: Task) -> str:
+    """
+    Tasks are only shared between calls of the same user to the same recording and
+    endpoint. Tasks that did not opt in, or have no unique parameters, get a key of
+    their own.
+    """
+    if not task.deduplicate or task.unique_parameters is None:
+        return task.task_id
+    return json.dumps(
+        [task.user_id, task.recording_id, task.endpoint_name, task.unique_parameters],
+        sort_keys=True,
+    )
+
+
+class TaskDeduplicator:
+    """
+    Coalesces tasks that set deduplicate and share a coalesce key onto one execution. While a task is
+    queued or running, duplicates wait on it; once it succeeds its result is kept
+    for TASK_RESULT_CACHE_TTL_SECONDS and later duplicates are answered from it.
+    Failed tasks are not shared, their waiting duplicates are run instead.
+    """
+
+    def __init__(self):
+        self.in_flight: dict[str, list[Task]] = {}
+        self.results: OrderedDict[str, CachedTaskResult] = OrderedDict()
+
+    def submit(self, task: Task) -> Literal["run", "coalesced", "cached"]:
+        if not settings.TASK_DEDUP_ENABLED or not task.deduplicate:
+            return "run"
+
+        key = get_coalesce_key(task)
+        if self.get_cached_result(key) is not None:
+            TASKS_DEDUPLICATED_TOTAL.inc(reason="cached")
+            logger.info(f"Task {task.task_id} answered from cached result")
+            return "cached"
+
+        if key in self.in_flight:
+            self.in_flight[key].append(task)
+            TASKS_DEDUPLICATED_TOTAL.inc(reason="coalesced")
+            COALESCED_WAITING_TASKS.inc()
+            logger.info(f"Task {task.task_id} coalesced onto an in-flight task")
+            return "coalesced"
+
+        self.in_flight[key] = []
+        return "run"
+
+    def get_cached_result(self, key: str) -> CachedTaskResult | None:
+        cached = self.results.get(key)
+        if cached is None:
+            return None
+        if time.monotonic() - cached.stored_at > settings.TASK_RESULT_CACHE_TTL_SECONDS:
+            self.evict(key)
+            return None
+        return cached
+
+    def evict(self, key: str):
+        cached = self.results.pop(key, None)
+        if cached is not None:
+            shutil.rmtree(cached.downloads_directory, ignore_errors=True)
+        RESULT_CACHE_ENTRIES.set(len(self.results))
+
+    def evict_expired(self):
+        for key in list(self.results.keys()):
+            self.get_cached_result(key)
+
+    def store_result(self, task: Task):
+        """
+        Keeps the result the worker saved, with a copy of the downloads. Must run
+        before the task's local data is deleted.
+        """
+        if (
+            not settings.TASK_DEDUP_ENABLED
+            or not task.deduplicate
+            or not task.result_path.exists()
+        ):
+            return
+        try:
+            result = TaskResult.model_validate_json(task.result_path.read_text())
+            if result.status != "success":
+                return
+
+            key = get_coalesce_key(task)
+            downloads_directory = (
+                RESULT_CACHE_DIRECTORY / hashlib.sha256(key.encode()).hexdigest()
+            )
+            self.evict(key)
+            shutil.copytree(task.downloads_directory, downloads_directory)
+            self.results[key] = CachedTaskResult(
+                result=result,
+                downloads_directory=downloads_directory,
+                stored_at=time.monotonic(),
+            )
+            while len(self.results) > settings.TASK_RESULT_CACHE_MAX_ENTRIES:
+                self.evict(next(iter(self.results)))
+            RESULT_CACHE_ENTRIES.set(len(self.results))
+        except Exception as e:
+            logger.error(f"Failed to store result of task {task.task_id}: {e}")
+
+    def remove_waiting(self, task_id: str) -> Task | None:
+        """Takes a coalesced task off the task it waits on, for cancellation."""
+        for waiting in self.in_flight.values():
+            for task in waiting:
+                if task.task_id == task_id:
+                    waiting.remove(task)
+                    COALESCED_WAITING_TASKS.dec()
+                    return task
+        return None
+
+    def complete(self, task: Task) -> tuple[CachedTaskResult | None, list[Task]]:
+        """
+        Called once a task is done. Returns its stored result and the duplicates
+        that waited on it. Without a stored result the returned duplicates must be
+        run; only the first one is returned, the rest keep waiting on it.
+        """
+        key = get_coalesce_key(task)
+        waiting = self.in_flight.pop(key, [])
+        COALESCED_WAITING_TASKS.dec(len(waiting))
+
+        ## A task only runs when its key had no cached result, so an entry now is its own
+        cached = self.results.get(key)
+        if cached is not None:
+            return cached, waiting
+
+        if len(waiting) > 0:
+            self.in_flight[key] = waiting[1:]
+            COALESCED_WAITING_TASKS.inc(len(waiting) - 1)
+        return None, waiting[:1]
+
+
+async def deliver_cached_result(
+    task: Task, cached: CachedTaskResult, unique_child_arn: str, child_process_id: int
+):
+    """Reports a stored result to the server as the outcome of a duplicate task."""
+    try:
+        await start_task_in_server(task)
+
+        shutil.copytree(
+            cached.downloads_directory, task.downloads_directory, dirs_exist_ok=True
+        )
+        memory = Memory(unique_child_arn=unique_child_arn)
+        memory.variables.output_data = cached.result.output_data
+        memory.variables.for_loop_status = cached.result.for_loop_status
+        memory.final_screenshot = cached.result.final_screenshot
+
+        task.status = cached.result.status
+        task.error = cached.result.error
+
+        await complete_task_in_server(task, TokenUsage(), child_process_id)
+        await save_output_data_in_server(task, memory)
+        await save_downloads_in_server(task, memory)
+        await initiate_callback(task)
+    except Exception as e:
+        logger.error(f"Failed to deliver cached result to task {task.task_id}: {e}")
+    finally:
+        await delete_local_data(task)
+
+
+task_deduplicator = TaskDeduplicator()
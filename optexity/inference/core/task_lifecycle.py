@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import signal
+from typing import Literal
+
+from optexity.inference.core.logging import complete_task_in_server, initiate_callback
+from optexity.schema.task import Task
+from optexity.schema.token_usage import TokenUsage
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+StopReason = Literal["cancelled", "timeout"]
+
+
+class RunningTask:
+    def __init__(self, task: Task):
+        self.task = task
+        ## Set once the worker is spawned, the task can be cancelled before that
+        self.proc: asyncio.subprocess.Process | None = None
+        self.cancel_requested = asyncio.Event()
+
+
+async def terminate_process_group(
+    proc: asyncio.subprocess.Process, grace_seconds: float
+):
+    """SIGTERM the process group, then SIGKILL whatever is left after the grace period."""
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=grace_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"Process group {proc.pid} still running after {grace_seconds}s, killing it"
+        )
+
+    ## Also reaps children left behind by a worker that exited on SIGTERM
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    await proc.wait()
+
+
+class TaskLifecycleManager:
+    """
+    Waits on worker processes until they exit, their task's deadline passes or
+    they are cancelled. Stopped workers get SIGTERM, so they end the run at the
+    next node boundary and report it, and SIGKILL once TASK_KILL_GRACE_SECONDS
+    have passed. Tasks are registered when dequeued, so a cancellation during
+    browser setup is honoured before the worker starts.
+    """
+
+    def __init__(self):
+        self.running: dict[str, RunningTask] = {}
+
+    def register(self, task: Task) -> RunningTask:
+        running = RunningTask(task)
+        self.running[task.task_id] = running
+        return running
+
+    def unregister(self, task_id: str):
+        self.running.pop(task_id, None)
+
+    def is_cancelled(self, task_id: str) -> bool:
+        running = self.running.get(task_id)
+        return running is not None and running.cancel_requested.is_set()
+
+    async def wait(
+        self, task: Task, proc: asyncio.subprocess.Process
+    ) -> tuple[int, StopReason | None]:
+        running = self.running.get(task.task_id) or self.register(task)
+        running.proc = proc
+
+        timeout = task.get_remaining_seconds()
+
+        proc_wait = asyncio.ensure_future(proc.wait())
+        cancel_wait = asyncio.ensure_future(running.cancel_requested.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {proc_wait, cancel_wait},
+                timeout=timeout,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if proc_wait in done:
+                return proc.returncode, None
+
+            reason: StopReason = "cancelled" if cancel_wait in done else "timeout"
+            logger.info(f"Stopping task {task.task_id}, reason: {reason}")
+            await terminate_process_group(proc, settings.TASK_KILL_GRACE_SECONDS)
+            return proc.returncode, reason
+        finally:
+            proc_wait.cancel()
+            cancel_wait.cancel()
+            self.unregister(task.task_id)
+
+    def cancel(self, task_id: str) -> bool:
+        running = self.running.get(task_id)
+        if running is None:
+            return False
+        running.cancel_requested.set()
+        return True
+
+
+async def report_stopped_task(task: Task, reason: StopReason, child_process_id: int):
+    """Completes a task the worker never reported, because it was killed or never started."""
+    if reason == "cancelled":
+        task.status = "cancelled"
+        task.error = "Task was cancelled"
+    else:
+        task.status = "failed"
+        task.error = f"Task timed out after {task.get_timeout_seconds()}s"
+
+    await complete_task_in_server(task, TokenUsage(), child_process_id)
+    await initiate_callback(task)
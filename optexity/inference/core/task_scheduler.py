@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+
+from optexity.schema.task import Task
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+## Lower value is served first
+PRIORITY_ORDER: dict[str, int] = {"interactive": 0, "normal": 1, "batch": 2}
+
+## Used to estimate start times until an endpoint has a measured duration
+DEFAULT_TASK_DURATION_SECONDS = 120.0
+DURATION_SMOOTHING = 0.3
+
+
+class ScheduledTask(BaseModel):
+    task: Task
+    sequence: int
+    enqueued_at: float
+
+
+class QueuedTaskInfo(BaseModel):
+    task_id: str
+    position: int
+    priority: str
+    user_id: str
+    endpoint_name: str
+    seconds_until_deadline: float
+    estimated_start_seconds: float
+
+
+class DecayingUsage:
+    """Run time consumed recently, halving every TASK_FAIR_SHARE_HALF_LIFE_SECONDS."""
+
+    def __init__(self):
+        self.value = 0.0
+        self.updated_at = time.monotonic()
+
+    def get(self, now: float) -> float:
+        elapsed = now - self.updated_at
+        return self.value * 0.5 ** (
+            elapsed / settings.TASK_FAIR_SHARE_HALF_LIFE_SECONDS
+        )
+
+    def add(self, seconds: float, now: float):
+        self.value = self.get(now) + seconds
+        self.updated_at = now
+
+
+def get_task_domain(task: Task) -> str:
+    return urlparse(task.automation.url).hostname or ""
+
+
+def get_task_deadline(task: Task) -> datetime:
+    submitted_at = task.allocated_at or task.created_at
+    if submitted_at.tzinfo is None:
+        submitted_at = submitted_at.replace(tzinfo=timezone.utc)
+    return submitted_at + settings.get_task_deadline(task.priority)
+
+
+class TaskScheduler:
+    """
+    Replaces the FIFO task queue. The next task is the first by:
+    1. tasks past their deadline (from created_at/allocated_at and priority)
+    2. priority level
+    3. fair share: recent run time of the task's user and endpoint over their weights
+    4. arrival order
+    Tasks whose target domain is at its concurrency cap are skipped until a slot frees.
+    Keeps the put/get/qsize interface of asyncio.Queue.
+    """
+
+    def __init__(self):
+        self.queued: list[ScheduledTask] = []
+        self.running: dict[str, tuple[Task, float]] = {}
+        self.condition = asyncio.Condition()
+        self.counter = itertools.count()
+        self.user_usage: dict[str, DecayingUsage] = defaultdict(DecayingUsage)
+        self.endpoint_usage: dict[str, DecayingUsage] = defaultdict(DecayingUsage)
+        self.running_domains: dict[str, int] = defaultdict(int)
+        self.durations: dict[str, float] = {}
+
+    def qsize(self) -> int:
+        return len(self.queued)
+
+    async def put(self, task: Task):
+        async with self.condition:
+            self.queued.append(
+                ScheduledTask(
+                    task=task,
+                    sequence=next(self.counter),
+                    enqueued_at=time.monotonic(),
+                )
+            )
+            self.condition.notify_all()
+
+    async def get(self) -> Task:
+        async with self.condition:
+            while True:
+                scheduled = self._next()
+                if scheduled is not None:
+                    break
+                await self.condition.wait()
+
+            self.queued.remove(scheduled)
+            task = scheduled.task
+            self.running[task.task_id] = (task, time.monotonic())
+            self.running_domains[get_task_domain(task)] += 1
+            return task
+
+    async def remove(self, task_id: str) -> Task | None:
+        """Takes a queued task out of the queue, for cancellation."""
+        async with self.condition:
+            for scheduled in self.queued:
+                if scheduled.task.task_id == task_id:
+                    self.queued.remove(scheduled)
+                    return scheduled.task
+        return None
+
+    async def task_done(self, task: Task):
+        """Releases the task's domain slot and charges its run time to its user and endpoint."""
+        async with self.condition:
+            running = self.running.pop(task.task_id, None)
+            if running is not None:
+                now = time.monotonic()
+                duration = now - running[1]
+                self.user_usage[task.user_id].add(duration, now)
+                self.endpoint_usage[task.endpoint_name].add(duration, now)
+                previous = self.durations.get(task.endpoint_name, duration)
+                self.durations[task.endpoint_name] = (
+                    DURATION_SMOOTHING * duration + (1 - DURATION_SMOOTHING) * previous
+                )
+                domain = get_task_domain(task)
+                self.running_domains[domain] = max(0, self.running_domains[domain] - 1)
+            self.condition.notify_all()
+
+    def _sort_key(self, scheduled: ScheduledTask, now: float, wall_now: datetime):
+        task = scheduled.task
+        overdue = get_task_deadline(task) <= wall_now
+        user_share = self.user_usage[task.user_id].get(now) / (
+            settings.TASK_USER_WEIGHTS.get(task.user_id, 1.0)
+        )
+        endpoint_share = self.endpoint_usage[task.endpoint_name].get(now) / (
+            settings.TASK_ENDPOINT_WEIGHTS.get(task.endpoint_name, 1.0)
+        )
+        fair_share = user_share + endpoint_share
+        return (
+            0 if overdue else 1,
+            PRIORITY_ORDER.get(task.priority, PRIORITY_ORDER["normal"]),
+            fair_share,
+            scheduled.sequence,
+        )
+
+    def _is_domain_available(self, task: Task) -> bool:
+        domain = get_task_domain(task)
+        cap = settings.TASK_DOMAIN_CONCURRENCY.get(domain)
+        return cap is None or self.running_domains[domain] < cap
+
+    def _ordered(self) -> list[ScheduledTask]:
+        now = time.monotonic()
+        wall_now = datetime.now(timezone.utc)
+        return sorted(self.queued, key=lambda s: self._sort_key(s, now, wall_now))
+
+    def _next(self) -> ScheduledTask | None:
+        for scheduled in self._ordered():
+            if self._is_domain_available(scheduled.task):
+                return scheduled
+        return None
+
+    def expected_duration(self, task: Task) -> float:
+        return self.durations.get(task.endpoint_name, DEFAULT_TASK_DURATION_SECONDS)
+
+    def queue_positions(self) -> list[QueuedTaskInfo]:
+        """Queued tasks in dispatch order with an estimate of when each will start."""
+        now = time.monotonic()
+        wall_now = datetime.now(timezone.utc)
+        ## Assumes tasks run one at a time, as the task processor does
+        wait = sum(
+            max(0.0, self.expected_duration(task) - (now - started_at))
+            for task, started_at in self.running.values()
+        )
+
+        positions = []
+        for position, scheduled in enumerate(self._ordered()):
+            task = scheduled.task
+            positions.append(
+                QueuedTaskInfo(
+                    task_id=task.task_id,
+                    position=position,
+                    priority=task.priority,
+                    user_id=task.user_id,
+                    endpoint_name=task.endpoint_name,
+                    seconds_until_deadline=(
+                        get_task_deadline(task) - wall_now
+                    ).total_seconds(),
+                    estimated_start_seconds=wait,
+                )
+            )
+            wait += self.expected_duration(task)
+        return positions
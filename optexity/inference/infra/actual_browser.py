@@ -11,7 +11,13 @@ from typing import Literal
 import aiohttp
 from playwright.async_api import ProxySettings
 
+from optexity.inference.infra.profile_template import (
+    clone_profile,
+    discard_profile,
+    ensure_profile_template,
+)
 from optexity.inference.infra.utils import _download_extension, _extract_extension
+from optexity.utils.metrics import BROWSER_START_SECONDS
 from optexity.utils.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -162,22 +168,86 @@ class ActualBrowser:
 
             args += self.get_proxy_args_native()
 
+        args += self.get_extension_args()
+
+        return args
+
+    def get_extension_args(self) -> list[str]:
         extension_paths = self.get_extension_paths()
+        if not extension_paths:
+            return []
 
-        if extension_paths:
-            disable_except = f'--disable-extensions-except={",".join(extension_paths)}'
-            load_extension = f'--load-extension={",".join(extension_paths)}'
-            args.append(disable_except)
-            args.append(load_extension)
-            logger.info(f"Extension args: {load_extension}")
+        disable_except = f'--disable-extensions-except={",".join(extension_paths)}'
+        load_extension = f'--load-extension={",".join(extension_paths)}'
+        logger.info(f"Extension args: {load_extension}")
+        return [disable_except, load_extension]
 
-        return args
+    def get_profile_template_key(self) -> str:
+        backend = "playwright" if settings.USE_PLAYWRIGHT_BROWSER else "native"
+        extension_ids = "_".join(sorted(ext["id"][:8] for ext in self.extensions))
+        return f"{backend}_{self.channel}_{extension_ids}"
+
+    async def build_profile_template(self, profile_directory: pathlib.Path):
+        """Runs the browser once on an empty profile so extensions get registered."""
+        args = [
+            f"--remote-debugging-port={self.port}",
+            "--no-first-run",
+            "--no-default-browser-check",
+        ] + self.get_extension_args()
 
-    async def start(self):
         if settings.USE_PLAYWRIGHT_BROWSER:
-            await self.start_playwright_browser()
-        else:
-            await self.start_native_browser()
+            from patchright.async_api import async_playwright
+
+            async with async_playwright() as playwright:
+                context = await playwright.chromium.launch_persistent_context(
+                    channel=self.channel,
+                    user_data_dir=str(profile_directory),
+                    headless=True,
+                    args=args,
+                    chromium_sandbox=False,
+                )
+                await asyncio.sleep(settings.PROFILE_TEMPLATE_SETTLE_SECONDS)
+                await context.close()
+            return
+
+        proc = await asyncio.create_subprocess_exec(
+            find_chrome_binary(self.channel),
+            f"--user-data-dir={profile_directory}",
+            "--no-sandbox",
+            "--headless=new",
+            *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+            preexec_fn=os.setsid,
+        )
+        try:
+            await self._wait_for_cdp()
+            await asyncio.sleep(settings.PROFILE_TEMPLATE_SETTLE_SECONDS)
+        finally:
+            os.killpg(proc.pid, signal.SIGTERM)
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                os.killpg(proc.pid, signal.SIGKILL)
+
+    async def prepare_user_data_dir(self):
+        """Gives a non-dedicated browser a fresh profile, cloned from the template if possible."""
+        discard_profile(pathlib.Path(self.user_data_dir))
+        if not settings.USE_PROFILE_TEMPLATE:
+            return
+
+        template_directory = await ensure_profile_template(
+            self.get_profile_template_key(), self.build_profile_template
+        )
+        if template_directory is not None:
+            await clone_profile(template_directory, pathlib.Path(self.user_data_dir))
+
+    async def start(self):
+        with BROWSER_START_SECONDS.time():
+            if settings.USE_PLAYWRIGHT_BROWSER:
+                await self.start_playwright_browser()
+            else:
+                await self.start_native_browser()
 
     async def start_native_browser(self):
         try:
@@ -189,7 +259,7 @@ class ActualBrowser:
                 raise NotImplementedError("Proxy is not supported for native browser")
 
             if not self.is_dedicated:
-                shutil.rmtree(self.user_data_dir, ignore_errors=True)
+                await self.prepare_user_data_dir()
 
             self.chrome_path = find_chrome_binary(self.channel)
 
@@ -213,6 +283,9 @@ class ActualBrowser:
 
             from patchright.async_api import async_playwright
 
+            if not self.is_dedicated:
+                await self.prepare_user_data_dir()
+
             self.playwright = await async_playwright().start()
             self.context = await self.playwright.chromium.launch_persistent_context(
                 channel=self.channel,
@@ -247,6 +320,17 @@ class ActualBrowser:
 
         raise RuntimeError("Chrome CDP not reachable")
 
+    async def get_tab_count(self) -> int:
+        url = f"http://localhost:{self.port}/json/list"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, timeout=2) as r:
+                    targets = await r.json()
+            return sum(1 for target in targets if target.get("type") == "page")
+        except Exception as e:
+            logger.error(f"Error getting tab count: {e}")
+            return 0
+
     async def check_browser_alive(self, timeout=10):
         if settings.USE_PLAYWRIGHT_BROWSER:
             try:
@@ -266,7 +350,7 @@ class ActualBrowser:
             await self.stop_native_browser(graceful)
 
         if not self.is_dedicated:
-            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            discard_profile(pathlib.Path(self.user_data_dir))
 
     async def stop_native_browser(self, graceful=True):
         if not self.proc or self.proc.returncode is not None:
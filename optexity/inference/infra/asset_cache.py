@@ -0,0 +1,428 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlparse
+
+import aiofiles
+from pydantic import BaseModel, Field
+
+from optexity.utils.metrics import ASSET_CACHE_REQUESTS_TOTAL
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+## Headers that no longer match once the stored, decoded body is served
+DROPPED_RESPONSE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+## Responses varying on anything else may differ per user or per requesting origin
+ALLOWED_VARY_HEADERS = {"accept-encoding"}
+HEURISTIC_FRESHNESS_FRACTION = 0.1
+MAX_HEURISTIC_FRESHNESS_SECONDS = 24 * 60 * 60
+
+
+class CacheEntry(BaseModel):
+    url: str
+    status: int
+    headers: dict[str, str]
+    body_file: str
+    size: int
+    expires_at: float
+
+
+class DomainCacheStats(BaseModel):
+    hits: int = 0
+    revalidated: int = 0
+    misses: int = 0
+    bytes_served: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total > 0 else 0.0
+
+
+class AssetCacheStats(BaseModel):
+    domains: dict[str, DomainCacheStats] = Field(default_factory=dict)
+    hit_rates: dict[str, float] = Field(default_factory=dict)
+
+
+def parse_cache_control(value: str) -> dict[str, str | None]:
+    directives = {}
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def get_freshness_seconds(headers: dict[str, str]) -> float | None:
+    """Seconds the response may be served without revalidation, None if it must not be stored."""
+    cache_control = parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cache_control or "private" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0.0
+
+    for directive in ("s-maxage", "max-age"):
+        if cache_control.get(directive) is not None:
+            try:
+                return max(0.0, float(cache_control[directive]))
+            except ValueError:
+                pass
+
+    try:
+        date = (
+            parsedate_to_datetime(headers["date"]).timestamp()
+            if "date" in headers
+            else time.time()
+        )
+        if "expires" in headers:
+            return max(
+                0.0, parsedate_to_datetime(headers["expires"]).timestamp() - date
+            )
+        if "last-modified" in headers:
+            age = date - parsedate_to_datetime(headers["last-modified"]).timestamp()
+            return min(
+                MAX_HEURISTIC_FRESHNESS_SECONDS,
+                max(0.0, age * HEURISTIC_FRESHNESS_FRACTION),
+            )
+    except (TypeError, ValueError):
+        pass
+
+    return 0.0 if "etag" in headers else None
+
+
+def is_cacheable_response(status: int, headers: dict[str, str]) -> bool:
+    if status != 200 or "set-cookie" in headers:
+        return False
+    ## Entries are keyed by URL, so CORS headers granted to one origin must not be replayed
+    if headers.get("access-control-allow-origin", "*") != "*":
+        return False
+    vary = {
+        header.strip().lower()
+        for header in headers.get("vary", "").split(",")
+        if header.strip()
+    }
+    return vary <= ALLOWED_VARY_HEADERS
+
+
+def strip_encoding_headers(headers: dict[str, str]) -> dict[str, str]:
+    return {
+        name: value
+        for name, value in headers.items()
+        if name.lower() not in DROPPED_RESPONSE_HEADERS
+    }
+
+
+def get_domain(url: str) -> str:
+    return urlparse(url).hostname or ""
+
+
+class AssetCache:
+    """
+    Disk cache of static responses shared by every browser on the node, served via
+    context.route. Only GETs of ASSET_CACHE_RESOURCE_TYPES that carry no cookies or
+    Authorization, with a cacheable 200 response, are stored. Stale entries are revalidated with their
+    ETag or Last-Modified, and the least recently used entries are evicted once the
+    bodies exceed ASSET_CACHE_MAX_BYTES. The index is SQLite so worker processes can
+    share it; its calls run in a thread so they do not block routing.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.bodies_directory = directory / "bodies"
+        self.bodies_directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = directory / "index.sqlite"
+        self.max_bytes = max_bytes
+        self.stats: dict[str, DomainCacheStats] = defaultdict(DomainCacheStats)
+
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    url TEXT PRIMARY KEY,
+                    entry TEXT NOT NULL,
+                    body_file TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)"
+            )
+            ## Total body size, kept up to date so storing does not sum every entry
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS cache_size (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    size INTEGER NOT NULL
+                )
+                """)
+            connection.execute(
+                "INSERT OR IGNORE INTO cache_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM entries))"
+            )
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS domain_stats (
+                    domain TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    revalidated INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0,
+                    bytes_served INTEGER NOT NULL DEFAULT 0
+                )
+                """)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.index_path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT entry FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url)
+            )
+        entry = CacheEntry.model_validate_json(row[0])
+        ## Also skips entries stored under older, looser rules
+        if not is_cacheable_response(entry.status, entry.headers):
+            return None
+        if not (self.bodies_directory / entry.body_file).exists():
+            return None
+        return entry
+
+    def save_entry(self, entry: CacheEntry):
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT size FROM entries WHERE url = ?", (entry.url,)
+            ).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (
+                    entry.url,
+                    entry.model_dump_json(),
+                    entry.body_file,
+                    entry.size,
+                    time.time(),
+                ),
+            )
+            connection.execute(
+                "UPDATE cache_size SET size = size + ? WHERE id = 0",
+                (entry.size - (row[0] if row is not None else 0),),
+            )
+            total = connection.execute(
+                "SELECT size FROM cache_size WHERE id = 0"
+            ).fetchone()[0]
+            if total > self.max_bytes:
+                self.evict(connection, total)
+
+    def evict(self, connection: sqlite3.Connection, total: int):
+        while total > self.max_bytes:
+            rows = connection.execute(
+                "SELECT url, body_file, size FROM entries ORDER BY last_access LIMIT 50"
+            ).fetchall()
+            if len(rows) == 0:
+                break
+            for url, body_file, size in rows:
+                connection.execute("DELETE FROM entries WHERE url = ?", (url,))
+                ## Bodies are content addressed and may back other URLs
+                still_used = connection.execute(
+                    "SELECT 1 FROM entries WHERE body_file = ? LIMIT 1",
+                    (body_file,),
+                ).fetchone()
+                if still_used is None:
+                    (self.bodies_directory / body_file).unlink(missing_ok=True)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        connection.execute("UPDATE cache_size SET size = ? WHERE id = 0", (total,))
+
+    async def store(self, url: str, status: int, headers: dict[str, str], body: bytes):
+        freshness = get_freshness_seconds(headers)
+        if freshness is None or not is_cacheable_response(status, headers):
+            return
+        if len(body) > self.max_bytes // 10:
+            return
+
+        body_file = hashlib.sha256(body).hexdigest()
+        body_path = self.bodies_directory / body_file
+        if not body_path.exists():
+            temporary_path = body_path.with_name(f"{body_file}.{uuid.uuid4().hex}.tmp")
+            async with aiofiles.open(temporary_path, "wb") as f:
+                await f.write(body)
+            os.replace(temporary_path, body_path)
+
+        await asyncio.to_thread(
+            self.save_entry,
+            CacheEntry(
+                url=url,
+                status=status,
+                headers=headers,
+                body_file=body_file,
+                size=len(body),
+                expires_at=time.time() + freshness,
+            ),
+        )
+
+    async def serve(self, route, entry: CacheEntry, domain: str):
+        async with aiofiles.open(self.bodies_directory / entry.body_file, "rb") as f:
+            body = await f.read()
+        self.stats[domain].bytes_served += len(body)
+        await route.fulfill(
+            status=entry.status,
+            headers=strip_encoding_headers(entry.headers),
+            body=body,
+        )
+
+    def is_cacheable_request(self, method: str, resource_type: str, url: str) -> bool:
+        return (
+            method == "GET"
+            and resource_type in settings.ASSET_CACHE_RESOURCE_TYPES
+            and urlparse(url).scheme in ("http", "https")
+        )
+
+    async def handle(self, route, context):
+        request = route.request
+        if not self.is_cacheable_request(
+            request.method, request.resource_type, request.url
+        ):
+            await route.fallback()
+            return
+
+        ## route.fetch sends the context's cookies, which the intercepted headers do not show
+        request_headers = await request.all_headers()
+        if (
+            "authorization" in request_headers
+            or "cookie" in request_headers
+            or len(await context.cookies(request.url)) > 0
+        ):
+            await route.fallback()
+            return
+
+        domain = get_domain(request.url)
+        try:
+            entry = await asyncio.to_thread(self.lookup, request.url)
+        except Exception as e:
+            logger.debug(f"Asset cache lookup failed for {request.url}: {e}")
+            entry = None
+
+        if entry is not None and entry.expires_at > time.time():
+            self.stats[domain].hits += 1
+            ASSET_CACHE_REQUESTS_TOTAL.inc(result="hit")
+            await self.serve(route, entry, domain)
+            return
+
+        fetch_headers = dict(request.headers)
+        if entry is not None:
+            if "etag" in entry.headers:
+                fetch_headers["if-none-match"] = entry.headers["etag"]
+            if "last-modified" in entry.headers:
+                fetch_headers["if-modified-since"] = entry.headers["last-modified"]
+
+        try:
+            response = await route.fetch(headers=fetch_headers)
+        except Exception as e:
+            logger.debug(f"Asset cache fetch failed for {request.url}: {e}")
+            await route.fallback()
+            return
+
+        if entry is not None and response.status == 304:
+            freshness = get_freshness_seconds({**entry.headers, **response.headers})
+            entry.expires_at = time.time() + (freshness or 0.0)
+            try:
+                await asyncio.to_thread(self.save_entry, entry)
+            except Exception as e:
+                logger.debug(f"Could not refresh {request.url} in asset cache: {e}")
+            self.stats[domain].revalidated += 1
+            ASSET_CACHE_REQUESTS_TOTAL.inc(result="revalidated")
+            await self.serve(route, entry, domain)
+            return
+
+        body = await response.body()
+        self.stats[domain].misses += 1
+        ASSET_CACHE_REQUESTS_TOTAL.inc(result="miss")
+        try:
+            await self.store(request.url, response.status, response.headers, body)
+        except Exception as e:
+            logger.debug(f"Could not store {request.url} in asset cache: {e}")
+
+        await route.fulfill(
+            status=response.status,
+            headers=strip_encoding_headers(response.headers),
+            body=body,
+        )
+
+    def get_stats(self) -> AssetCacheStats:
+        return AssetCacheStats(
+            domains=dict(self.stats),
+            hit_rates={domain: stats.hit_rate for domain, stats in self.stats.items()},
+        )
+
+    def flush_stats(self):
+        """Adds this process's counts to the node-wide per-domain stats."""
+        with self._connect() as connection:
+            for domain, stats in self.stats.items():
+                connection.execute(
+                    """
+                    INSERT INTO domain_stats (domain, hits, revalidated, misses, bytes_served)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(domain) DO UPDATE SET
+                        hits = hits + excluded.hits,
+                        revalidated = revalidated + excluded.revalidated,
+                        misses = misses + excluded.misses,
+                        bytes_served = bytes_served + excluded.bytes_served
+                    """,
+                    (
+                        domain,
+                        stats.hits,
+                        stats.revalidated,
+                        stats.misses,
+                        stats.bytes_served,
+                    ),
+                )
+        self.stats.clear()
+
+    def get_node_stats(self) -> AssetCacheStats:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT domain, hits, revalidated, misses, bytes_served FROM domain_stats"
+            ).fetchall()
+        domains = {
+            domain: DomainCacheStats(
+                hits=hits,
+                revalidated=revalidated,
+                misses=misses,
+                bytes_served=bytes_served,
+            )
+            for domain, hits, revalidated, misses, bytes_served in rows
+        }
+        return AssetCacheStats(
+            domains=domains,
+            hit_rates={domain: stats.hit_rate for domain, stats in domains.items()},
+        )
+
+
+_asset_cache: AssetCache | None = None
+
+
+def get_asset_cache() -> AssetCache:
+    global _asset_cache
+    if _asset_cache is None:
+        _asset_cache = AssetCache(
+            Path(settings.ASSET_CACHE_DIRECTORY), settings.ASSET_CACHE_MAX_BYTES
+        )
+    return _asset_cache
@@ -1,11 +1,15 @@
 import asyncio
 import base64
+import hashlib
 import json
 import logging
 import re
+import time
+from pathlib import Path
 from typing import Literal
 from uuid import uuid4
 
+import aiofiles
 import patchright.async_api
 import playwright.async_api
 from browser_use import Agent, BrowserSession, ChatGoogle
@@ -14,11 +18,25 @@ from patchright._impl._errors import TimeoutError as PatchrightTimeoutError
 from playwright._impl._errors import TimeoutError as PlaywrightTimeoutError
 from playwright.async_api import Download, Locator, Page, Request, Response
 
+from optexity.inference.infra.asset_cache import AssetCache
+from optexity.inference.infra.resource_blocker import ResourceBlocker
 from optexity.schema.memory import Memory, NetworkRequest, NetworkResponse
+from optexity.schema.recording import NetworkRecord
+from optexity.schema.trace import trace_span
+from optexity.utils.locator_compiler import compile_locator_command
 from optexity.utils.settings import settings
 
 logger = logging.getLogger(__name__)
 
+## Requests that never settle, so they do not keep a page counted as loading
+IGNORED_ACTIVITY_RESOURCE_TYPES = {
+    "ping",
+    "beacon",
+    "websocket",
+    "eventsource",
+    "media",
+}
+
 
 class Browser:
     def __init__(
@@ -59,11 +77,23 @@ class Browser:
         self.all_active_downloads_done.set()
 
         self.network_calls: list[NetworkResponse | NetworkRequest] = []
+        ## Monotonic time of the last request started or finished, for network quiet checks
+        self.last_network_activity = 0.0
+        ## HTTP status of the document each page's main frame last navigated to
+        self.main_frame_statuses: dict[Page, int] = {}
+        ## Set to record every response body for replay
+        self.network_recording_directory: Path | None = None
+        ## Set to abort requests excluded by the automation's resource policy
+        self.resource_blocker: ResourceBlocker | None = None
+        ## Set to serve static assets from the node's shared cache
+        self.asset_cache: AssetCache | None = None
 
     async def start(self):
         logger.debug("Starting browser")
         try:
             await self.stop()
+            self.last_network_activity = 0.0
+            self.main_frame_statuses = {}
 
             if self.stealth:
                 from patchright.async_api import async_playwright
@@ -81,8 +111,26 @@ class Browser:
                 for i in range(len(self.context.pages) - 1, 0, -1):
                     await self.context.pages[i].close()
 
+            ## The last route added runs first, so blocked requests never reach the cache
+            if self.asset_cache is not None:
+                asset_cache = self.asset_cache
+                context = self.context
+                await self.context.route(
+                    "**/*", lambda route: asset_cache.handle(route, context)
+                )
+            if self.resource_blocker is not None:
+                await self.context.route("**/*", self.resource_blocker.handle)
+
             self.context.on("request", lambda req: self.log_request(req))
+            self.context.on("request", lambda req: self.track_network_activity(req))
+            self.context.on(
+                "requestfinished", lambda req: self.track_network_activity(req)
+            )
+            self.context.on(
+                "requestfailed", lambda req: self.track_network_activity(req)
+            )
             self.context.on("response", lambda resp: self.log_response(resp))
+            self.context.on("response", lambda resp: self.record_response(resp))
             self.context.on(
                 "response", lambda resp: self.handle_random_url_downloads(resp)
             )
@@ -147,6 +195,11 @@ class Browser:
 
         self.context = None
 
+    def get_browser_session(self) -> BrowserSession | None:
+        if self.backend_agent is None:
+            return None
+        return self.backend_agent.browser_session
+
     async def get_current_page(
         self,
     ) -> playwright.async_api.Page | patchright.async_api.Page:
@@ -235,7 +288,7 @@ class Browser:
         page = await self.get_current_page()
         if page is None:
             return None
-        locator: Locator = eval(f"page.{command}")
+        locator: Locator = compile_locator_command(command).build(page)
         return locator
 
     def get_xpath_from_index(self, index: int) -> str:
@@ -268,11 +321,12 @@ class Browser:
         if self.backend_agent is None:
             raise ValueError("Backend agent is not set")
 
-        browser_state_summary = await self.backend_agent.browser_session.get_browser_state_summary(
-            include_screenshot=True,  # always capture even if use_vision=False so that cloud sync is useful (it's fast now anyway)
-            include_recent_events=False,
-            cached=False,
-        )
+        with trace_span("get_browser_state_summary", "cdp"):
+            browser_state_summary = await self.backend_agent.browser_session.get_browser_state_summary(
+                include_screenshot=True,  # always capture even if use_vision=False so that cloud sync is useful (it's fast now anyway)
+                include_recent_events=False,
+                cached=False,
+            )
 
         return browser_state_summary
 
@@ -373,7 +427,19 @@ class Browser:
             # logger.error(f"Could not get body: {e}")
             pass
 
+    def track_network_activity(self, req: Request):
+        if req.resource_type in IGNORED_ACTIVITY_RESOURCE_TYPES:
+            return
+        self.last_network_activity = time.monotonic()
+
     async def log_response(self, response: Response):
+        try:
+            request = response.request
+            if request.is_navigation_request() and request.frame.parent_frame is None:
+                self.main_frame_statuses[request.frame.page] = response.status
+        except Exception:
+            pass
+
         try:
             body = await response.json()
         except Exception:
@@ -411,6 +477,35 @@ class Browser:
             )
         )
 
+    async def record_response(self, response: Response):
+        if self.network_recording_directory is None:
+            return
+        try:
+            body_file = None
+            try:
+                body = await response.body()
+                body_file = hashlib.sha256(body).hexdigest()
+                body_path = self.network_recording_directory / body_file
+                if not body_path.exists():
+                    async with aiofiles.open(body_path, "wb") as f:
+                        await f.write(body)
+            except Exception:
+                ## Redirects and aborted requests have no body
+                pass
+
+            self.memory.recording.network.append(
+                NetworkRecord(
+                    step_index=self.memory.trace.step_index,
+                    method=response.request.method,
+                    url=response.url,
+                    status=response.status,
+                    headers=response.headers,
+                    body_file=body_file,
+                )
+            )
+        except Exception as e:
+            logger.debug(f"Could not record response for {response.url}: {e}")
+
     async def clear_network_calls(self):
         self.network_calls.clear()
 
@@ -418,7 +513,8 @@ class Browser:
         page = await self.get_current_page()
         if page is None:
             return None
-        screenshot_bytes = await page.screenshot(full_page=full_page)
+        with trace_span("screenshot", "cdp", full_page=full_page):
+            screenshot_bytes = await page.screenshot(full_page=full_page)
         screenshot_base64 = base64.b64encode(screenshot_bytes).decode("utf-8")
 
         return screenshot_base64
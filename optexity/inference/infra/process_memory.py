@@ -0,0 +1,196 @@
+import asyncio
+import logging
+
+import psutil
+from pydantic import BaseModel
+
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BROWSER_PROCESS_NAMES = ("chrome", "chromium")
+
+
+class ProcessTreeMemory(BaseModel):
+    """RSS in MB of the server process tree, split by role."""
+
+    server_mb: float = 0.0
+    worker_mb: float = 0.0
+    browser_mb: float = 0.0
+    renderer_mb: float = 0.0
+    renderer_count: int = 0
+    ## e.g. the playwright driver
+    other_mb: float = 0.0
+
+    @property
+    def total_mb(self) -> float:
+        return self.server_mb + self.worker_mb + self.browser_mb + self.other_mb
+
+
+class TaskMemoryUsage(BaseModel):
+    start: ProcessTreeMemory
+    end: ProcessTreeMemory
+    peak_total_mb: float
+    peak_browser_mb: float
+    delta_total_mb: float
+    delta_browser_mb: float
+    delta_worker_mb: float
+
+
+def is_browser_process(process: psutil.Process) -> bool:
+    name = process.name().lower()
+    return any(browser_name in name for browser_name in BROWSER_PROCESS_NAMES)
+
+
+def is_renderer_process(process: psutil.Process) -> bool:
+    return "--type=renderer" in process.cmdline()
+
+
+def sample_process_tree(
+    server_pid: int, worker_pid: int | None = None
+) -> ProcessTreeMemory:
+    """
+    Walks the server and its descendants. Chrome processes count as browser, the
+    worker's other descendants as worker and everything else as other.
+    """
+    usage = ProcessTreeMemory()
+    try:
+        server = psutil.Process(server_pid)
+        usage.server_mb = server.memory_info().rss / (1024**2)
+        descendants = server.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return usage
+
+    worker_pids = set()
+    if worker_pid is not None:
+        try:
+            worker = psutil.Process(worker_pid)
+            worker_pids = {worker_pid} | {
+                child.pid for child in worker.children(recursive=True)
+            }
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+
+    for process in descendants:
+        try:
+            rss_mb = process.memory_info().rss / (1024**2)
+            if is_browser_process(process):
+                usage.browser_mb += rss_mb
+                if is_renderer_process(process):
+                    usage.renderer_mb += rss_mb
+                    usage.renderer_count += 1
+            elif process.pid in worker_pids:
+                usage.worker_mb += rss_mb
+            else:
+                usage.other_mb += rss_mb
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+
+    return usage
+
+
+class TaskMemorySampler:
+    """Samples the process tree in the background while a task runs."""
+
+    def __init__(self, server_pid: int, worker_pid: int | None = None):
+        self.server_pid = server_pid
+        self.worker_pid = worker_pid
+        self.start_usage: ProcessTreeMemory | None = None
+        self.last_usage: ProcessTreeMemory | None = None
+        self.peak_total_mb = 0.0
+        self.peak_browser_mb = 0.0
+        self.sampler: asyncio.Task | None = None
+
+    async def sample(self) -> ProcessTreeMemory:
+        ## The tree walk reads /proc for every Chrome process, keep it off the event loop
+        usage = await asyncio.to_thread(
+            sample_process_tree, self.server_pid, self.worker_pid
+        )
+        self.last_usage = usage
+        self.peak_total_mb = max(self.peak_total_mb, usage.total_mb)
+        self.peak_browser_mb = max(self.peak_browser_mb, usage.browser_mb)
+        return usage
+
+    async def _run(self):
+        self.start_usage = await self.sample()
+        while True:
+            await asyncio.sleep(settings.TASK_MEMORY_SAMPLE_INTERVAL_SECONDS)
+            await self.sample()
+
+    def start(self):
+        self.sampler = asyncio.create_task(self._run())
+
+    async def stop(self) -> TaskMemoryUsage:
+        if self.sampler is not None:
+            self.sampler.cancel()
+            try:
+                await self.sampler
+            except asyncio.CancelledError:
+                pass
+            self.sampler = None
+        end = await self.sample()
+        start = self.start_usage or end
+        return TaskMemoryUsage(
+            start=start,
+            end=end,
+            peak_total_mb=self.peak_total_mb,
+            peak_browser_mb=self.peak_browser_mb,
+            delta_total_mb=end.total_mb - start.total_mb,
+            delta_browser_mb=end.browser_mb - start.browser_mb,
+            delta_worker_mb=end.worker_mb - start.worker_mb,
+        )
+
+
+class BrowserRecyclePolicy:
+    """
+    Decides when a reused browser should be restarted, from its memory after each
+    task, how fast that grows, its open tabs and the tasks run since launch.
+    """
+
+    def __init__(self):
+        self.task_count = 0
+        self.browser_mb_after_task: list[float] = []
+
+    def reset(self):
+        self.task_count = 0
+        self.browser_mb_after_task = []
+
+    def record_task(self, usage: ProcessTreeMemory):
+        self.task_count += 1
+        self.browser_mb_after_task.append(usage.browser_mb)
+        self.browser_mb_after_task = self.browser_mb_after_task[
+            -settings.BROWSER_RECYCLE_GROWTH_WINDOW :
+        ]
+
+    def growth_mb_per_task(self) -> float:
+        if len(self.browser_mb_after_task) < 2:
+            return 0.0
+        return (self.browser_mb_after_task[-1] - self.browser_mb_after_task[0]) / (
+            len(self.browser_mb_after_task) - 1
+        )
+
+    def get_restart_reason(
+        self,
+        usage: ProcessTreeMemory,
+        container_memory_fraction: float,
+        tab_count: int,
+    ) -> str | None:
+        growth = self.growth_mb_per_task()
+        if (
+            container_memory_fraction
+            > settings.BROWSER_RECYCLE_CONTAINER_MEMORY_FRACTION
+        ):
+            return "memory_exceeded"
+        ## Restart before the next task would take the browser over its limit
+        if usage.browser_mb + max(0.0, growth) > settings.BROWSER_RECYCLE_MAX_RSS_MB:
+            return "browser_memory"
+        if (
+            len(self.browser_mb_after_task) >= settings.BROWSER_RECYCLE_GROWTH_WINDOW
+            and growth > settings.BROWSER_RECYCLE_MAX_GROWTH_MB_PER_TASK
+        ):
+            return "memory_growth"
+        if tab_count > settings.BROWSER_RECYCLE_MAX_TABS:
+            return "too_many_tabs"
+        if self.task_count >= settings.BROWSER_RECYCLE_MAX_TASKS:
+            return "task_count"
+        return None
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TEMPLATE_DIRECTORY = Path("/tmp/optexity/profile_templates")
+## Left behind by the Chrome that built the template, clones must not inherit them
+PROFILE_LOCK_FILES = [
+    "SingletonLock",
+    "SingletonSocket",
+    "SingletonCookie",
+    "DevToolsActivePort",
+    "lockfile",
+]
+
+_template_lock = asyncio.Lock()
+_cleanup_tasks: set[asyncio.Task] = set()
+## Whether copy-on-write clones work from a template to a profile parent directory
+_reflink_support: dict[tuple[Path, Path], bool] = {}
+_swept_directories: set[Path] = set()
+
+
+def get_template_directory(key: str) -> Path:
+    return PROFILE_TEMPLATE_DIRECTORY / key
+
+
+def get_ready_marker(template_directory: Path) -> Path:
+    return template_directory.with_name(f"{template_directory.name}.ready")
+
+
+async def ensure_profile_template(
+    key: str, build: Callable[[Path], Awaitable[None]]
+) -> Path | None:
+    """
+    Returns the template profile for key, building it once with build if needed.
+    Templates are built in a scratch directory and renamed into place, so other
+    processes never clone a half written one. Returns None if the build fails.
+    """
+    template_directory = get_template_directory(key)
+    sweep_trash(PROFILE_TEMPLATE_DIRECTORY)
+    if get_ready_marker(template_directory).exists():
+        return template_directory
+
+    async with _template_lock:
+        if get_ready_marker(template_directory).exists():
+            return template_directory
+
+        build_directory = template_directory.with_name(
+            f"{template_directory.name}.{uuid.uuid4().hex}.building"
+        )
+        try:
+            build_directory.mkdir(parents=True)
+            await build(build_directory)
+            for name in PROFILE_LOCK_FILES:
+                (build_directory / name).unlink(missing_ok=True)
+            try:
+                os.rename(build_directory, template_directory)
+            except OSError:
+                ## Another process finished its template first
+                discard_profile(build_directory)
+            get_ready_marker(template_directory).touch()
+            logger.info(f"Built profile template {template_directory}")
+        except Exception as e:
+            logger.error(f"Failed to build profile template {key}: {e}")
+            discard_profile(build_directory)
+            return None
+
+    return template_directory
+
+
+def get_reflink_command() -> list[str]:
+    if platform.system() == "Darwin":
+        return ["cp", "-a", "-c"]
+    return ["cp", "-a", "--reflink=always"]
+
+
+def _supports_reflink(template_directory: Path, target_parent: Path) -> bool:
+    """Clones a small file once, since ext4 and overlayfs reject every reflink."""
+    key = (template_directory, target_parent)
+    if key not in _reflink_support:
+        probe_name = f".reflink_probe.{uuid.uuid4().hex}"
+        source = template_directory.parent / probe_name
+        target = target_parent / probe_name
+        try:
+            source.write_bytes(b"probe")
+            result = subprocess.run(
+                get_reflink_command() + [str(source), str(target)],
+                capture_output=True,
+            )
+            _reflink_support[key] = result.returncode == 0
+        except OSError:
+            _reflink_support[key] = False
+        finally:
+            source.unlink(missing_ok=True)
+            target.unlink(missing_ok=True)
+        logger.info(
+            f"Profile clones from {template_directory} use {'reflink' if _reflink_support[key] else 'copy'}"
+        )
+    return _reflink_support[key]
+
+
+def _clone_profile(template_directory: Path, target_directory: Path) -> str:
+    target_directory.parent.mkdir(parents=True, exist_ok=True)
+    ## Chrome rewrites its databases in place, so only copy-on-write clones are safe
+    if _supports_reflink(template_directory, target_directory.parent):
+        result = subprocess.run(
+            get_reflink_command() + [str(template_directory), str(target_directory)],
+            capture_output=True,
+        )
+        if result.returncode == 0:
+            return "reflink"
+        shutil.rmtree(target_directory, ignore_errors=True)
+
+    shutil.copytree(template_directory, target_directory, symlinks=True)
+    return "copy"
+
+
+async def clone_profile(template_directory: Path, target_directory: Path):
+    sweep_trash(target_directory.parent)
+    method = await asyncio.to_thread(
+        _clone_profile, template_directory, target_directory
+    )
+    logger.debug(f"Cloned profile template to {target_directory} using {method}")
+
+
+def sweep_trash(directory: Path):
+    """Deletes profiles discarded by processes that exited before removing them, once per process."""
+    if directory in _swept_directories or not directory.exists():
+        return
+    _swept_directories.add(directory)
+    for trash_directory in directory.glob("*.trash"):
+        _delete_in_background(trash_directory)
+
+
+def discard_profile(profile_directory: Path):
+    """
+    Moves a profile out of the way and deletes it in the background, so the
+    directory can be reused immediately.
+    """
+    if not profile_directory.exists():
+        return
+
+    trash_directory = profile_directory.with_name(
+        f"{profile_directory.name}.{uuid.uuid4().hex}.trash"
+    )
+    try:
+        os.rename(profile_directory, trash_directory)
+    except OSError:
+        ## The path may be cloned into right after this returns, so it must be gone now
+        shutil.rmtree(profile_directory, ignore_errors=True)
+        return
+
+    _delete_in_background(trash_directory)
+
+
+def _delete_in_background(directory: Path):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        shutil.rmtree(directory, ignore_errors=True)
+        return
+
+    cleanup = loop.create_task(
+        asyncio.to_thread(shutil.rmtree, directory, ignore_errors=True)
+    )
+    _cleanup_tasks.add(cleanup)
+    cleanup.add_done_callback(_cleanup_tasks.discard)
@@ -0,0 +1,100 @@
+import logging
+import re
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from pydantic import BaseModel, Field
+
+from optexity.schema.automation import ResourceBlockingPolicy
+from optexity.utils.metrics import RESOURCES_BLOCKED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+## Typical transfer sizes, used to estimate the bytes a blocked request would have cost
+TYPICAL_RESOURCE_BYTES: dict[str, int] = {
+    "image": 30_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 20_000,
+    "script": 40_000,
+    "texttrack": 5_000,
+    "other": 10_000,
+}
+
+
+class ResourceBlockingStats(BaseModel):
+    requests_blocked: int = 0
+    requests_allowed: int = 0
+    estimated_bytes_saved: int = 0
+    blocked_by_type: dict[str, int] = Field(default_factory=dict)
+    blocked_by_domain: dict[str, int] = Field(default_factory=dict)
+
+
+class ResourceBlocker:
+    """Aborts requests the automation's ResourceBlockingPolicy excludes, via context.route."""
+
+    def __init__(self, policy: ResourceBlockingPolicy, allow_images: bool = False):
+        self.blocked_resource_types = set(policy.blocked_resource_types)
+        if allow_images:
+            self.blocked_resource_types.discard("image")
+        self.blocked_domains = [domain.lower() for domain in policy.blocked_domains]
+        self.blocked_url_patterns = [
+            re.compile(pattern) for pattern in policy.blocked_url_patterns
+        ]
+        self.allowed_url_patterns = [
+            re.compile(pattern) for pattern in policy.allowed_url_patterns
+        ]
+        self.blocked_by_type: dict[str, int] = defaultdict(int)
+        self.blocked_by_domain: dict[str, int] = defaultdict(int)
+        self.requests_allowed = 0
+        self.estimated_bytes_saved = 0
+
+    def should_block(self, url: str, resource_type: str, is_navigation: bool) -> bool:
+        ## Blocking a document would break the page itself
+        if is_navigation or resource_type == "document":
+            return False
+        if any(pattern.search(url) for pattern in self.allowed_url_patterns):
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+
+        hostname = (urlparse(url).hostname or "").lower()
+        if any(
+            hostname == domain or hostname.endswith(f".{domain}")
+            for domain in self.blocked_domains
+        ):
+            return True
+        return any(pattern.search(url) for pattern in self.blocked_url_patterns)
+
+    async def handle(self, route):
+        request = route.request
+        try:
+            block = self.should_block(
+                request.url, request.resource_type, request.is_navigation_request()
+            )
+        except Exception as e:
+            logger.debug(f"Could not apply resource policy to {request.url}: {e}")
+            block = False
+
+        if not block:
+            self.requests_allowed += 1
+            await route.fallback()
+            return
+
+        resource_type = request.resource_type
+        self.blocked_by_type[resource_type] += 1
+        self.blocked_by_domain[urlparse(request.url).hostname or ""] += 1
+        self.estimated_bytes_saved += TYPICAL_RESOURCE_BYTES.get(
+            resource_type, TYPICAL_RESOURCE_BYTES["other"]
+        )
+        RESOURCES_BLOCKED_TOTAL.inc(resource_type=resource_type)
+        await route.abort("blockedbyclient")
+
+    def stats(self) -> ResourceBlockingStats:
+        return ResourceBlockingStats(
+            requests_blocked=sum(self.blocked_by_type.values()),
+            requests_allowed=self.requests_allowed,
+            estimated_bytes_saved=self.estimated_bytes_saved,
+            blocked_by_type=dict(self.blocked_by_type),
+            blocked_by_domain=dict(self.blocked_by_domain),
+        )
@@ -1,9 +1,22 @@
+from optexity.utils.settings import settings
+
 from .llm_model import GeminiModels, HumanModels, OpenAIModels
+from .router import TieredModelRouter
 
 
 def get_llm_model(
     model_name: GeminiModels | HumanModels | OpenAIModels, use_structured_output: bool
 ):
+    if settings.LLM_BACKEND == "stub":
+        from .stub import StubLLMModel
+
+        return StubLLMModel(model_name, use_structured_output)
+
+    if settings.LLM_BACKEND == "replay":
+        from .replay import ReplayLLMModel
+
+        return ReplayLLMModel(model_name, use_structured_output)
+
     if isinstance(model_name, GeminiModels):
         from .gemini import Gemini
 
@@ -1,20 +1,29 @@
 import base64
 import logging
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
 import httpx
 from google import genai
-from google.genai import types
+from google.genai import errors, types
 from pydantic import BaseModel, ValidationError
 
+from optexity.utils.pdf import get_file_hash
+from optexity.utils.settings import settings
 from optexity.utils.utils import is_local_path, is_url
 
 from .llm_model import GeminiModels, LLMModel, TokenUsage
 
 logger = logging.getLogger(__name__)
 
+## Uploaded PDFs by content hash, shared by every model instance in the process
+_uploaded_files: dict[str, tuple[types.File, float]] = {}
+_uploaded_files_lock = threading.Lock()
+
 
 class Gemini(LLMModel):
 
@@ -28,11 +37,64 @@ class Gemini(LLMModel):
         except Exception as e:
             raise ValueError("Invalid GOOGLE_API_KEY")
 
+    def get_error_status_code(self, e: Exception) -> int | None:
+        if isinstance(e, errors.APIError):
+            return e.code
+        return super().get_error_status_code(e)
+
+    def get_pdf_part(self, pdf_url: str | Path) -> types.Part | types.File:
+        """
+        Small PDFs are sent inline. Larger ones go through the Files API, streamed
+        from disk, and their handles are reused for documents with the same content.
+        """
+        if is_url(pdf_url):
+            with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+                with httpx.stream("GET", str(pdf_url), follow_redirects=True) as r:
+                    r.raise_for_status()
+                    for block in r.iter_bytes():
+                        f.write(block)
+                f.flush()
+                return self.get_pdf_part(f.name)
+        if not is_local_path(pdf_url):
+            raise ValueError(f"PDF not found: {pdf_url}")
+
+        path = Path(str(pdf_url))
+        if path.stat().st_size <= settings.PDF_INLINE_MAX_BYTES:
+            return types.Part.from_bytes(
+                data=path.read_bytes(), mime_type="application/pdf"
+            )
+
+        content_hash = get_file_hash(path)
+        with _uploaded_files_lock:
+            cached = _uploaded_files.get(content_hash)
+        if cached is not None and cached[1] > time.time():
+            return cached[0]
+
+        start = time.monotonic()
+        file = self.client.files.upload(
+            file=path, config={"mime_type": "application/pdf"}
+        )
+        while file.state is not None and file.state.name == "PROCESSING":
+            time.sleep(1)
+            file = self.client.files.get(name=file.name)
+        if file.state is not None and file.state.name == "FAILED":
+            raise ValueError(f"Gemini could not process {path.name}")
+        logger.info(
+            f"Uploaded {path.name} ({path.stat().st_size} bytes) in {time.monotonic() - start:.2f}s"
+        )
+
+        with _uploaded_files_lock:
+            _uploaded_files[content_hash] = (
+                file,
+                time.time() + settings.PDF_UPLOAD_CACHE_SECONDS,
+            )
+        return file
+
     def _get_model_response_with_structured_output(
         self,
         prompt: str,
         response_schema: type[BaseModel],
-        screenshot: Optional[str] = None,
+        screenshot: Optional[str | list[str]] = None,
         pdf_url: Optional[str | Path] = None,
         system_instruction: Optional[str] = None,
     ) -> tuple[BaseModel, TokenUsage]:
@@ -43,31 +105,16 @@ class Gemini(LLMModel):
         final_prompt = prompt
 
         if screenshot is not None:
+            screenshots = screenshot if isinstance(screenshot, list) else [screenshot]
             final_prompt = [
                 types.Part.from_bytes(
-                    data=base64.b64decode(screenshot),
+                    data=base64.b64decode(image),
                     mime_type="image/png",
-                ),
-                prompt,
-            ]
+                )
+                for image in screenshots
+            ] + [prompt]
         if pdf_url is not None:
-            if is_local_path(pdf_url):
-                final_prompt = [
-                    types.Part.from_bytes(
-                        data=Path(str(pdf_url)).read_bytes(),
-                        mime_type="application/pdf",
-                    ),
-                    prompt,
-                ]
-            elif is_url(pdf_url):
-                doc_data = httpx.get(str(pdf_url)).content
-                final_prompt = [
-                    types.Part.from_bytes(
-                        data=doc_data,
-                        mime_type="application/pdf",
-                    ),
-                    prompt,
-                ]
+            final_prompt = [self.get_pdf_part(pdf_url), prompt]
         response = None
         parsed_response = None
         token_usage = TokenUsage()
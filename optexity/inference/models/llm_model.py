@@ -9,7 +9,11 @@ from typing import Optional
 import tokencost.costs
 from pydantic import BaseModel, ValidationError
 
+from optexity.inference.models.rate_limiter import LLMPriority, get_rate_limiter
+from optexity.schema.recording import record_llm_call
 from optexity.schema.token_usage import TokenUsage
+from optexity.schema.trace import trace_span
+from optexity.utils.metrics import LLM_CALL_SECONDS, LLM_ERRORS_TOTAL
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +28,7 @@ class GeminiModels(Enum):
     GEMINI_1_5_FLASH = "gemini-1.5-flash"
     GEMINI_2_0_FLASH = "gemini-2.0-flash"
     GEMINI_2_5_FLASH = "gemini-2.5-flash"
-    GEMINI_2_5_FLASH_LITE = "gemini-2.5-flash-lite-preview-06-17"
+    GEMINI_2_5_FLASH_LITE = "gemini-2.5-flash-lite"
     GEMINI_2_5_PRO = "gemini-2.5-pro"
 
 
@@ -55,25 +59,77 @@ class LLMModel:
         self,
         prompt: str,
         response_schema: type[BaseModel],
-        screenshot: Optional[str] = None,
+        screenshot: Optional[str | list[str]] = None,
         pdf_url: Optional[str | Path] = None,
         system_instruction: Optional[str] = None,
     ) -> tuple[BaseModel, TokenUsage]:
         raise NotImplementedError("This method should be implemented by subclasses.")
 
+    def estimate_tokens(self, prompt: str, system_instruction: Optional[str]) -> int:
+        ## Rough estimate of ~4 characters per token, corrected after the call
+        return (len(prompt) + len(system_instruction or "")) // 4
+
+    def get_error_status_code(self, e: Exception) -> int | None:
+        """HTTP status of a provider error, overridden by clients with typed errors."""
+        status_code = getattr(e, "status_code", None)
+        return status_code if isinstance(status_code, int) else None
+
+    def get_retry_after_seconds(self, e: Exception) -> float | None:
+        """Returns the provider's requested back-off if the error is a rate limit."""
+        if self.get_error_status_code(e) != 429:
+            return None
+
+        response = getattr(e, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None and headers.get("retry-after") is not None:
+            try:
+                return float(headers.get("retry-after"))
+            except ValueError:
+                pass
+
+        match = re.search(r"retryDelay['\"]?:\s*['\"]?(\d+(?:\.\d+)?)s", str(e))
+        if match:
+            return float(match.group(1))
+        return 20.0
+
     def get_model_response(
-        self, prompt: str, system_instruction: Optional[str] = None
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        priority: LLMPriority = "interactive",
     ) -> tuple[str, TokenUsage]:
 
+        rate_limiter = get_rate_limiter(self.model_name.value)
+        estimated_tokens = self.estimate_tokens(prompt, system_instruction)
+
         max_retries = 3
         for i in range(max_retries):
             try:
-                return self._get_model_response(prompt, system_instruction)
+                with trace_span("rate_limiter_wait", "sleep"):
+                    rate_limiter.acquire(estimated_tokens, priority)
+                with (
+                    trace_span("llm_call", "llm", model=self.model_name.value),
+                    LLM_CALL_SECONDS.time(model=self.model_name.value),
+                ):
+                    response, token_usage = self._get_model_response(
+                        prompt, system_instruction
+                    )
+                rate_limiter.record_usage(estimated_tokens, token_usage.total_tokens)
+                record_llm_call(self.model_name.value, None, response)
+                return response, token_usage
             except Exception as e:
                 logger.error(f"LLM Error during inference: {e}")
+                retry_after = self.get_retry_after_seconds(e)
+                LLM_ERRORS_TOTAL.inc(
+                    model=self.model_name.value,
+                    rate_limited=str(retry_after is not None).lower(),
+                )
+                if retry_after is not None:
+                    rate_limiter.pause(retry_after)
                 if i < max_retries - 1:
                     logger.info(f"Retrying... {i + 1}/{max_retries}")
-                    time.sleep(5)
+                    if retry_after is None:
+                        time.sleep(5)
                 continue
         raise Exception("Max retries exceeded for LLM")
 
@@ -81,34 +137,65 @@ class LLMModel:
         self,
         prompt: str,
         response_schema: type[BaseModel],
-        screenshot: Optional[str] = None,
+        screenshot: Optional[str | list[str]] = None,
         pdf_url: Optional[str | Path] = None,
         system_instruction: Optional[str] = None,
+        priority: LLMPriority = "interactive",
+        max_retries: int = 3,
     ) -> tuple[BaseModel, TokenUsage]:
 
+        rate_limiter = get_rate_limiter(self.model_name.value)
+        estimated_tokens = self.estimate_tokens(prompt, system_instruction)
+
         total_token_usage = TokenUsage()
-        max_retries = 3
         last_exception = ""
         for i in range(max_retries):
             try:
                 # raise Exception("Test error")
-                parsed_response, token_usage = (
-                    self._get_model_response_with_structured_output(
-                        prompt=prompt,
-                        response_schema=response_schema,
-                        screenshot=screenshot,
-                        pdf_url=pdf_url,
-                        system_instruction=system_instruction,
+                with trace_span("rate_limiter_wait", "sleep"):
+                    rate_limiter.acquire(estimated_tokens, priority)
+                with (
+                    trace_span(
+                        "llm_call",
+                        "llm",
+                        model=self.model_name.value,
+                        schema=response_schema.__name__,
+                    ),
+                    LLM_CALL_SECONDS.time(model=self.model_name.value),
+                ):
+                    parsed_response, token_usage = (
+                        self._get_model_response_with_structured_output(
+                            prompt=prompt,
+                            response_schema=response_schema,
+                            screenshot=screenshot,
+                            pdf_url=pdf_url,
+                            system_instruction=system_instruction,
+                        )
                     )
-                )
+                rate_limiter.record_usage(estimated_tokens, token_usage.total_tokens)
                 total_token_usage += token_usage
                 if parsed_response is not None:
+                    record_llm_call(
+                        self.model_name.value,
+                        response_schema.__name__,
+                        parsed_response.model_dump(mode="json"),
+                    )
                     return parsed_response, total_token_usage
             except Exception as e:
                 logger.error(f"LLM with structured output Error during inference: {e}")
+                ## On a rate limit the limiter holds every caller until Retry-After
+                ## has passed, so there is no extra fixed sleep here.
+                retry_after = self.get_retry_after_seconds(e)
+                LLM_ERRORS_TOTAL.inc(
+                    model=self.model_name.value,
+                    rate_limited=str(retry_after is not None).lower(),
+                )
+                if retry_after is not None:
+                    rate_limiter.pause(retry_after)
                 if i < max_retries - 1:
                     logger.info(f"Retrying... {i + 1}/{max_retries}")
-                    time.sleep(20)
+                    if retry_after is None:
+                        time.sleep(20)
                 last_exception = str(e)
 
         raise Exception(
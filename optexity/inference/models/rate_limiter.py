@@ -0,0 +1,231 @@
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Literal
+
+from optexity.utils.metrics import LLM_RATE_LIMIT_WAIT_SECONDS, LLM_RATE_LIMITED_TOTAL
+from optexity.utils.settings import settings
+
+logger = logging.getLogger(__name__)
+
+LLMPriority = Literal["interactive", "bulk"]
+
+## Lower value is served first
+PRIORITY_ORDER: dict[str, int] = {"interactive": 0, "bulk": 1}
+
+## How often queued callers check the shared buckets
+POLL_SECONDS = 0.1
+## Waiters of crashed processes stop heartbeating and are dropped after this
+WAITER_EXPIRY_SECONDS = 10.0
+
+
+def refill(tokens: float, capacity: float, elapsed: float) -> float:
+    return min(capacity, tokens + elapsed * capacity / 60.0)
+
+
+def seconds_until_available(tokens: float, capacity: float, amount: float) -> float:
+    amount = min(amount, capacity)
+    if tokens >= amount:
+        return 0.0
+    return (amount - tokens) / (capacity / 60.0)
+
+
+class ModelRateLimiter:
+    """
+    Token-bucket limiter on requests and tokens per minute for one model. The buckets
+    live in a SQLite file shared by every worker on the node, so the limit holds
+    across tasks. Callers register as waiters and only the oldest waiter of the most
+    urgent priority takes from the buckets, so interactive calls are served before
+    bulk ones.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        path: Path,
+    ):
+        self.model_name = model_name
+        self.requests_capacity = float(requests_per_minute)
+        self.tokens_capacity = float(tokens_per_minute)
+        self.path = path
+        self.local = threading.local()
+
+        try:
+            with self._transaction() as connection:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS buckets (
+                        model TEXT PRIMARY KEY,
+                        requests REAL NOT NULL,
+                        tokens REAL NOT NULL,
+                        last_refill REAL NOT NULL,
+                        paused_until REAL NOT NULL DEFAULT 0
+                    )
+                    """)
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS waiters (
+                        ticket TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        priority INTEGER NOT NULL,
+                        enqueued_at REAL NOT NULL,
+                        heartbeat REAL NOT NULL
+                    )
+                    """)
+                connection.execute(
+                    "INSERT OR IGNORE INTO buckets (model, requests, tokens, last_refill) VALUES (?, ?, ?, ?)",
+                    (
+                        model_name,
+                        self.requests_capacity,
+                        self.tokens_capacity,
+                        time.time(),
+                    ),
+                )
+        except sqlite3.Error as e:
+            logger.warning(
+                f"Could not set up the LLM rate limiter for {model_name}: {e}"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        ## One connection per thread, LLM calls run in worker threads
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def _try_acquire(self, ticket: str, estimated_tokens: int) -> float:
+        """Takes from the buckets if ticket is first in line, else returns how long to wait."""
+        with self._transaction() as connection:
+            now = time.time()
+            connection.execute(
+                "UPDATE waiters SET heartbeat = ? WHERE ticket = ?", (now, ticket)
+            )
+            connection.execute(
+                "DELETE FROM waiters WHERE heartbeat < ?",
+                (now - WAITER_EXPIRY_SECONDS,),
+            )
+            head = connection.execute(
+                "SELECT ticket FROM waiters WHERE model = ? ORDER BY priority, enqueued_at LIMIT 1",
+                (self.model_name,),
+            ).fetchone()
+            requests, tokens, last_refill, paused_until = connection.execute(
+                "SELECT requests, tokens, last_refill, paused_until FROM buckets WHERE model = ?",
+                (self.model_name,),
+            ).fetchone()
+
+            elapsed = max(0.0, now - last_refill)
+            requests = refill(requests, self.requests_capacity, elapsed)
+            tokens = refill(tokens, self.tokens_capacity, elapsed)
+            wait_time = max(
+                paused_until - now,
+                seconds_until_available(requests, self.requests_capacity, 1),
+                seconds_until_available(tokens, self.tokens_capacity, estimated_tokens),
+            )
+            is_head = head is not None and head[0] == ticket
+            if is_head and wait_time <= 0:
+                requests -= 1
+                tokens -= min(estimated_tokens, self.tokens_capacity)
+            connection.execute(
+                "UPDATE buckets SET requests = ?, tokens = ?, last_refill = ? WHERE model = ?",
+                (requests, tokens, now, self.model_name),
+            )
+            if not is_head:
+                return POLL_SECONDS
+            return wait_time
+
+    def acquire(self, estimated_tokens: int, priority: LLMPriority = "interactive"):
+        """Blocks the calling thread, so LLM calls are made through asyncio.to_thread."""
+        start = time.monotonic()
+        ticket = uuid.uuid4().hex
+        try:
+            with self._transaction() as connection:
+                now = time.time()
+                connection.execute(
+                    "INSERT INTO waiters VALUES (?, ?, ?, ?, ?)",
+                    (ticket, self.model_name, PRIORITY_ORDER[priority], now, now),
+                )
+            try:
+                while True:
+                    wait_time = self._try_acquire(ticket, estimated_tokens)
+                    if wait_time <= 0:
+                        break
+                    time.sleep(min(wait_time, POLL_SECONDS))
+            finally:
+                with self._transaction() as connection:
+                    connection.execute(
+                        "DELETE FROM waiters WHERE ticket = ?", (ticket,)
+                    )
+        except sqlite3.Error as e:
+            ## The limiter must not stop LLM calls when its file is unusable
+            logger.warning(f"LLM rate limiter unavailable for {self.model_name}: {e}")
+
+        queue_time = time.monotonic() - start
+        LLM_RATE_LIMIT_WAIT_SECONDS.observe(
+            queue_time, model=self.model_name, priority=priority
+        )
+        if queue_time > 1:
+            logger.info(
+                f"LLM call to {self.model_name} ({priority}) queued for {queue_time:.2f} seconds"
+            )
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int):
+        """Corrects the token bucket once the real token count of a call is known."""
+        try:
+            with self._transaction() as connection:
+                connection.execute(
+                    "UPDATE buckets SET tokens = tokens - ? WHERE model = ?",
+                    (actual_tokens - estimated_tokens, self.model_name),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not record LLM usage for {self.model_name}: {e}")
+
+    def pause(self, seconds: float):
+        """Blocks all calls to this model, used when the provider returns Retry-After."""
+        LLM_RATE_LIMITED_TOTAL.inc(model=self.model_name)
+        try:
+            with self._transaction() as connection:
+                connection.execute(
+                    "UPDATE buckets SET paused_until = MAX(paused_until, ?) WHERE model = ?",
+                    (time.time() + seconds, self.model_name),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not pause LLM calls to {self.model_name}: {e}")
+
+
+_rate_limiters: dict[str, ModelRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model_name: str) -> ModelRateLimiter:
+    with _rate_limiters_lock:
+        if model_name not in _rate_limiters:
+            limits = settings.LLM_RATE_LIMITS.get(model_name, {})
+            _rate_limiters[model_name] = ModelRateLimiter(
+                model_name,
+                requests_per_minute=limits.get(
+                    "requests_per_minute", settings.LLM_DEFAULT_REQUESTS_PER_MINUTE
+                ),
+                tokens_per_minute=limits.get(
+                    "tokens_per_minute", settings.LLM_DEFAULT_TOKENS_PER_MINUTE
+                ),
+                path=Path(settings.LLM_RATE_LIMITER_PATH),
+            )
+        return _rate_limiters[model_name]
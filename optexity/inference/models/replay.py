@@ -0,0 +1,85 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from optexity.inference.models.rate_limiter import LLMPriority
+from optexity.schema.recording import LLMCallRecord, record_llm_call
+from optexity.schema.trace import trace_span
+
+from .llm_model import GeminiModels, HumanModels, LLMModel, OpenAIModels, TokenUsage
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMissError(Exception):
+    pass
+
+
+class ReplayLLMModel(LLMModel):
+    """
+    Answers with the responses recorded for the step being replayed, in call order
+    per response schema. The replay engine loads the calls of each step before
+    running it and reads the misses and unused calls afterwards.
+    """
+
+    pending: list[LLMCallRecord] = []
+    misses: list[str] = []
+
+    def __init__(
+        self,
+        model_name: GeminiModels | HumanModels | OpenAIModels,
+        use_structured_output: bool,
+    ):
+        super().__init__(model_name, use_structured_output)
+
+    @classmethod
+    def load_step(cls, calls: list[LLMCallRecord]):
+        cls.pending = list(calls)
+        cls.misses = []
+
+    def _pop(self, schema_name: str | None) -> LLMCallRecord:
+        for i, call in enumerate(self.pending):
+            if call.schema_name == schema_name:
+                return self.pending.pop(i)
+        ReplayLLMModel.misses.append(schema_name or "text")
+        raise ReplayMissError(f"No recorded LLM response left for {schema_name}")
+
+    def get_model_response(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        priority: LLMPriority = "interactive",
+    ) -> tuple[str, TokenUsage]:
+        ## No rate limiting or retries, a miss is final
+        with trace_span("llm_call", "llm", model=self.model_name.value, replay=True):
+            response = str(self._pop(None).response)
+        record_llm_call(self.model_name.value, None, response)
+        return response, TokenUsage()
+
+    def get_model_response_with_structured_output(
+        self,
+        prompt: str,
+        response_schema: type[BaseModel],
+        screenshot: Optional[str | list[str]] = None,
+        pdf_url: Optional[str | Path] = None,
+        system_instruction: Optional[str] = None,
+        priority: LLMPriority = "interactive",
+        max_retries: int = 3,
+    ) -> tuple[BaseModel, TokenUsage]:
+        with trace_span(
+            "llm_call",
+            "llm",
+            model=self.model_name.value,
+            schema=response_schema.__name__,
+            replay=True,
+        ):
+            call = self._pop(response_schema.__name__)
+            parsed_response = response_schema.model_validate(call.response)
+        record_llm_call(
+            self.model_name.value,
+            response_schema.__name__,
+            parsed_response.model_dump(mode="json"),
+        )
+        return parsed_response, TokenUsage()
@@ -0,0 +1,88 @@
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from pydantic import BaseModel
+
+from optexity.inference.models.llm_model import GeminiModels, LLMModel
+from optexity.inference.models.rate_limiter import LLMPriority
+from optexity.schema.token_usage import TierUsage, TokenUsage
+
+logger = logging.getLogger(__name__)
+
+
+class TieredModelRouter:
+    """
+    Sends a call to the cheapest tier first and escalates to the next tier only when
+    the validator rejects the answer or the call fails. Tiers before the last get a
+    single attempt, so a failing tier escalates at once instead of retrying. The
+    answer of the last tier is returned even if it does not validate.
+    """
+
+    def __init__(self, tiers: list[GeminiModels], use_structured_output: bool):
+        from optexity.inference.models import get_llm_model
+
+        if len(tiers) == 0:
+            raise ValueError("At least one model tier is required")
+        self.models: list[LLMModel] = [
+            get_llm_model(tier, use_structured_output) for tier in tiers
+        ]
+
+    def get_model_response_with_structured_output(
+        self,
+        prompt: str,
+        response_schema: type[BaseModel],
+        validate: Callable[[BaseModel], bool],
+        screenshot: Optional[str | list[str]] = None,
+        pdf_url: Optional[str | Path] = None,
+        system_instruction: Optional[str] = None,
+        priority: LLMPriority = "interactive",
+    ) -> tuple[BaseModel, TokenUsage]:
+
+        total_token_usage = TokenUsage()
+        last_exception = None
+
+        for tier_index, model in enumerate(self.models):
+            is_last_tier = tier_index == len(self.models) - 1
+            model_name = model.model_name.value
+            start = time.monotonic()
+            response = None
+            try:
+                response, token_usage = model.get_model_response_with_structured_output(
+                    prompt=prompt,
+                    response_schema=response_schema,
+                    screenshot=screenshot,
+                    pdf_url=pdf_url,
+                    system_instruction=system_instruction,
+                    priority=priority,
+                    max_retries=3 if is_last_tier else 1,
+                )
+                total_token_usage += token_usage
+            except Exception as e:
+                logger.error(f"Model tier {model_name} failed: {e}")
+                last_exception = e
+                token_usage = TokenUsage()
+
+            is_valid = response is not None and validate(response)
+            escalated = not is_valid and not is_last_tier
+            total_token_usage += TokenUsage(
+                tier_usage={
+                    model_name: TierUsage(
+                        calls=1,
+                        escalations=int(escalated),
+                        latency_seconds=time.monotonic() - start,
+                        total_cost=token_usage.total_cost,
+                    )
+                }
+            )
+
+            if is_valid or (is_last_tier and response is not None):
+                return response, total_token_usage
+
+            if escalated:
+                logger.debug(
+                    f"Escalating from {model_name} to {self.models[tier_index + 1].model_name.value}"
+                )
+
+        raise Exception(f"All model tiers failed: {last_exception}")
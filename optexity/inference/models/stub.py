@@ -0,0 +1,85 @@
+import logging
+import time
+import types
+import typing
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel
+
+from .llm_model import GeminiModels, HumanModels, LLMModel, OpenAIModels, TokenUsage
+
+logger = logging.getLogger(__name__)
+
+
+def _default_value(annotation: Any) -> Any:
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin in (typing.Union, types.UnionType):
+        if type(None) in args:
+            return None
+        return _default_value(args[0])
+    if origin is Literal:
+        return args[0]
+    if origin in (list, tuple, set):
+        return []
+    if origin is dict:
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return build_default_response(annotation).model_dump()
+    if annotation is bool:
+        return False
+    if annotation is int:
+        return 0
+    if annotation is float:
+        return 0.0
+    return ""
+
+
+def build_default_response(response_schema: type[BaseModel]) -> BaseModel:
+    """Builds the smallest valid instance of a schema, filling required fields."""
+    data = {
+        name: _default_value(field.annotation)
+        for name, field in response_schema.model_fields.items()
+        if field.is_required()
+    }
+    return response_schema.model_validate(data)
+
+
+class StubLLMModel(LLMModel):
+    """
+    Deterministic stand-in for a real model, used by the benchmark suite. Structured
+    responses come from `responses` keyed by schema name, falling back to the
+    smallest valid instance of the schema. Never touches the network.
+    """
+
+    responses: dict[str, dict] = {}
+    latency_seconds: float = 0.0
+
+    def __init__(
+        self,
+        model_name: GeminiModels | HumanModels | OpenAIModels,
+        use_structured_output: bool,
+    ):
+        super().__init__(model_name, use_structured_output)
+
+    def _get_model_response(
+        self, prompt: str, system_instruction: Optional[str] = None
+    ) -> tuple[str, TokenUsage]:
+        time.sleep(self.latency_seconds)
+        return "", TokenUsage()
+
+    def _get_model_response_with_structured_output(
+        self,
+        prompt: str,
+        response_schema: type[BaseModel],
+        screenshot: Optional[str | list[str]] = None,
+        pdf_url: Optional[str | Path] = None,
+        system_instruction: Optional[str] = None,
+    ) -> tuple[BaseModel, TokenUsage]:
+        time.sleep(self.latency_seconds)
+        canned = self.responses.get(response_schema.__name__)
+        if canned is not None:
+            return response_schema.model_validate(canned), TokenUsage()
+        return build_default_response(response_schema), TokenUsage()
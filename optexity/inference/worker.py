@@ -1,7 +1,12 @@
 import asyncio
 import json
+import signal
 import sys
 
+from optexity.inference.core.cancellation import (
+    TaskCancellation,
+    set_current_cancellation,
+)
 from optexity.inference.core.run_automation import run_automation
 from optexity.schema.task import Task
 
@@ -11,6 +16,11 @@ async def main():
     unique_child_arn = sys.argv[2]
     child_process_id = int(sys.argv[3])
 
+    ## The parent sends SIGTERM to cancel, the run stops at the next node boundary
+    cancellation = TaskCancellation(deadline_at=task.deadline_at)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, cancellation.request)
+    set_current_cancellation(cancellation)
+
     await run_automation(task, unique_child_arn, child_process_id)
 
 
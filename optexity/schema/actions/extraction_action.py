@@ -1,3 +1,4 @@
+import re
 from typing import Any, List, Literal, Optional
 from uuid import uuid4
 
@@ -14,6 +15,8 @@ class LLMExtraction(BaseModel):
     output_variable_names: list[str] | None = None
     llm_provider: Literal["gemini"] = "gemini"
     llm_model_name: str = "gemini-2.5-flash"
+    ## Collected and extracted together with other deferred extractions later in the task
+    deferred: bool = False
 
     def build_model(self):
         return build_model(self.extraction_format)
@@ -32,6 +35,10 @@ class LLMExtraction(BaseModel):
     def validate_output_var_in_format(self):
 
         if self.output_variable_names is not None:
+            if self.deferred:
+                raise ValueError(
+                    "Deferred extractions cannot set output_variable_names, their values are not known until the batch runs"
+                )
             for key in self.output_variable_names:
                 if key not in self.extraction_format:
                     raise ValueError(
@@ -112,6 +119,11 @@ class PDFExtraction(BaseModel):
     extraction_instructions: str
     llm_provider: Literal["gemini"] = "gemini"
     llm_model_name: str = "gemini-2.5-flash"
+    ## Read text-native PDFs from their text layer instead of sending the file, which
+    ## loses content only present in images, stamps or checkboxes
+    use_text_layer: bool = False
+    ## Regex per field of a flat extraction_format, the LLM is skipped if all match
+    field_patterns: dict[str, str] | None = None
 
     def build_model(self):
         return build_model(self.extraction_format)
@@ -126,6 +138,22 @@ class PDFExtraction(BaseModel):
             return v
         raise ValueError("extraction_format must be either a string or a dict")
 
+    @model_validator(mode="after")
+    def validate_field_patterns(self):
+        if self.field_patterns is not None:
+            if not self.use_text_layer:
+                raise ValueError("field_patterns need use_text_layer to be enabled")
+            for key, pattern in self.field_patterns.items():
+                if key not in self.extraction_format:
+                    raise ValueError(
+                        f"Field pattern {key} not found in extraction_format"
+                    )
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid field pattern for {key}: {e}")
+        return self
+
     def replace(self, pattern: str, replacement: str):
         self.extraction_instructions = self.extraction_instructions.replace(
             pattern, replacement
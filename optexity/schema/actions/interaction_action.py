@@ -5,6 +5,7 @@ from uuid import uuid4
 from pydantic import BaseModel, Field, model_validator
 
 from optexity.schema.actions.prompts import overlay_popup_prompt
+from optexity.utils.locator_compiler import validate_locator_command
 
 
 class Locator(BaseModel):
@@ -48,6 +49,9 @@ class BaseAction(BaseModel):
         if model.command is not None and model.command.strip() == "":
             model.command = None
 
+        if model.command is not None:
+            validate_locator_command(model.command)
+
         return model
 
     def replace(self, pattern: str, replacement: str):
@@ -142,6 +146,35 @@ class InputTextAction(BaseAction):
         return self
 
 
+class FormField(BaseModel):
+    input_text: InputTextAction | None = None
+    select_option: SelectOptionAction | None = None
+
+    @model_validator(mode="after")
+    def validate_one_field(self):
+        if (self.input_text is None) == (self.select_option is None):
+            raise ValueError(
+                "Exactly one of input_text or select_option must be provided"
+            )
+        return self
+
+    def replace(self, pattern: str, replacement: str):
+        if self.input_text:
+            self.input_text.replace(pattern, replacement)
+        if self.select_option:
+            self.select_option.replace(pattern, replacement)
+        return self
+
+
+class FillFormAction(BaseModel):
+    fields: list[FormField]
+
+    def replace(self, pattern: str, replacement: str):
+        for field in self.fields:
+            field.replace(pattern, replacement)
+        return self
+
+
 class DownloadUrlAsPdfAction(BaseModel):
     # Used when the current page is a PDF and we want to download it
     download_filename: str = Field(default_factory=lambda: str(uuid4()))
@@ -293,6 +326,7 @@ class InteractionAction(BaseModel):
     agentic_task: AgenticTask | None = None
     close_overlay_popup: CloseOverlayPopupAction | None = None
     key_press: KeyPressAction | None = None
+    fill_form: FillFormAction | None = None
 
     @model_validator(mode="after")
     def validate_one_interaction(cls, model: "InteractionAction"):
@@ -316,12 +350,13 @@ class InteractionAction(BaseModel):
             "agentic_task": model.agentic_task,
             "close_overlay_popup": model.close_overlay_popup,
             "key_press": model.key_press,
+            "fill_form": model.fill_form,
         }
         non_null = [k for k, v in provided.items() if v is not None]
 
         if len(non_null) != 1:
             raise ValueError(
-                "Exactly one of click_element, input_text, select_option, check, uncheck, hover, download_url_as_pdf, scroll, upload_file, go_to_url, go_back, switch_tab, close_current_tab, close_all_but_last_tab, close_tabs_until, key_press, or agentic_task must be provided"
+                "Exactly one of click_element, input_text, select_option, check, uncheck, hover, download_url_as_pdf, scroll, upload_file, go_to_url, go_back, switch_tab, close_current_tab, close_all_but_last_tab, close_tabs_until, key_press, fill_form, or agentic_task must be provided"
             )
 
         if (
@@ -360,5 +395,7 @@ class InteractionAction(BaseModel):
             self.upload_file.replace(pattern, replacement)
         if self.key_press:
             self.key_press.replace(pattern, replacement)
+        if self.fill_form:
+            self.fill_form.replace(pattern, replacement)
 
         return self
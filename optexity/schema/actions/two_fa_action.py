@@ -21,4 +21,11 @@ class TwoFAAction(BaseModel):
     instructions: str | None = None
     output_variable_name: str
     max_wait_time: float = 300.0
+    ## Longest gap between polls, polling starts sub-second and backs off to it
     check_interval: float = 30.0
+    ## Regex whose first group is the code, replaces the built-in OTP patterns
+    code_regex: str | None = None
+    ## Only messages whose sender matches are read locally
+    sender_regex: str | None = None
+    ## Read obvious codes with regexes before asking the LLM
+    use_local_extraction: bool = True
@@ -1,13 +1,15 @@
 import logging
+import re
 from typing import Annotated, Any, ForwardRef, Literal
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
+from optexity.inference.core.compiled_code import check_condition
 from optexity.schema.actions.assertion_action import AssertionAction
 from optexity.schema.actions.extraction_action import ExtractionAction
 from optexity.schema.actions.interaction_action import InteractionAction
 from optexity.schema.actions.misc_action import PythonScriptAction
-from optexity.utils.utils import get_onepassword_value, get_totp_code
+from optexity.utils.secret_store import get_fresh_totp_code, resolve_onepassword_value
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +62,16 @@ class SecureParameter(BaseModel):
             )
         return self
 
+    @property
+    def onepassword_reference(self) -> tuple[str, str, str] | None:
+        if self.onepassword is None:
+            return None
+        return (
+            self.onepassword.vault_name,
+            self.onepassword.item_name,
+            self.onepassword.field_name,
+        )
+
 
 class ActionNode(BaseModel):
     type: Literal["action_node"]
@@ -140,13 +152,13 @@ class ActionNode(BaseModel):
 
                 if isinstance(value, SecureParameter):
                     if value.onepassword:
-                        str_value = await get_onepassword_value(
+                        str_value = await resolve_onepassword_value(
                             value.onepassword.vault_name,
                             value.onepassword.item_name,
                             value.onepassword.field_name,
                         )
                         if value.onepassword.type == "totp_secret":
-                            str_value = get_totp_code(
+                            str_value = await get_fresh_totp_code(
                                 str_value, value.onepassword.digits
                             )
 
@@ -155,7 +167,7 @@ class ActionNode(BaseModel):
                             "Amazon Secrets Manager is not implemented yet"
                         )
                     elif value.totp:
-                        str_value = get_totp_code(
+                        str_value = await get_fresh_totp_code(
                             value.totp.totp_secret, value.totp.digits
                         )
 
@@ -174,6 +186,19 @@ class ActionNode(BaseModel):
         return self
 
 
+def uses_screenshots(value: Any) -> bool:
+    """Whether a dumped node tree has a screenshot source or assertion."""
+    if isinstance(value, dict):
+        if "screenshot" in (value.get("source") or []):
+            return True
+        if value.get("screenshot") is not None:
+            return True
+        return any(uses_screenshots(v) for v in value.values())
+    if isinstance(value, list):
+        return any(uses_screenshots(v) for v in value)
+    return False
+
+
 class ForLoopNode(BaseModel):
     # Loops through range of values of {variable_name[index]}
     type: Literal["for_loop_node"]
@@ -234,6 +259,11 @@ class IfElseNode(BaseModel):
     if_nodes: list[ActionNode | IfElseNodeRef | ForLoopNodeRef]
     else_nodes: list[ActionNode | IfElseNodeRef | ForLoopNodeRef] = []
 
+    @field_validator("condition")
+    def validate_condition(cls, v: str):
+        check_condition(v)
+        return v
+
     @model_validator(mode="before")
     def migrate_old_nodes(cls, data: dict[str, Any]):
         for key in ["if_nodes", "else_nodes"]:
@@ -302,6 +332,31 @@ class Parameters(BaseModel):
         return self
 
 
+class ResourceBlockingPolicy(BaseModel):
+    """
+    Requests to skip while the automation runs. Domains match their subdomains too,
+    URL patterns are regular expressions and allowed_url_patterns override all blocks.
+    """
+
+    blocked_resource_types: list[
+        Literal["image", "media", "font", "stylesheet", "script", "texttrack", "other"]
+    ] = []
+    blocked_domains: list[str] = []
+    blocked_url_patterns: list[str] = []
+    allowed_url_patterns: list[str] = []
+    ## Images still load when a node reads a screenshot
+    allow_images_for_screenshots: bool = True
+
+    @field_validator("blocked_url_patterns", "allowed_url_patterns")
+    def validate_url_patterns(cls, v: list[str]):
+        for pattern in v:
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"Invalid URL pattern {pattern}: {e}")
+        return v
+
+
 ## TODO: fix expected downloads for ForLoop
 class Automation(BaseModel):
     browser_channel: Literal["chromium", "chrome"] = "chromium"
@@ -315,6 +370,15 @@ class Automation(BaseModel):
     automation_description: str | None = None
     automation_endpoint: str | None = None
     post_processing_nodes: list[ActionNode] = []
+    ## Falls back to TASK_TIMEOUT_SECONDS
+    timeout_seconds: float | None = None
+    resource_blocking: ResourceBlockingPolicy | None = None
+
+    def uses_screenshots(self) -> bool:
+        """Whether any node extracts from or asserts on a screenshot."""
+        return uses_screenshots(
+            self.model_dump(include={"nodes", "post_processing_nodes"})
+        )
 
     @model_validator(mode="before")
     def migrate_old_nodes(cls, data: dict[str, Any]):
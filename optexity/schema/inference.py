@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from pydantic import BaseModel, Field, model_validator
 
@@ -14,6 +15,12 @@ class InferenceRequest(BaseModel):
     is_dedicated: bool = (
         False  ## Only used in local mode. For cloud mode, the task is dedicated is defined on dashboard.
     )
+    ## Only used in local mode, orders the local task queue
+    priority: Literal["interactive", "normal", "batch"] = "normal"
+    ## Only used in local mode, overrides the automation's timeout
+    timeout_seconds: float | None = None
+    ## Only used in local mode, shares the run and recent result of identical requests
+    deduplicate: bool = False
 
     @model_validator(mode="after")
     def validate_unique_parameter_names(self):
@@ -33,6 +40,8 @@ class FetchEmailMessagesRequest(BaseModel):
     sender_email_address: str  # sender's email address
     start_2fa_time: datetime
     end_2fa_time: datetime
+    ## Lets the server hold the request until a message arrives
+    wait_seconds: float | None = None
 
     @model_validator(mode="after")
     def validate_time_parameters(self):
@@ -57,6 +66,8 @@ class FetchSlackMessagesRequest(BaseModel):
     sender_name: str
     start_2fa_time: datetime
     end_2fa_time: datetime
+    ## Lets the server hold the request until a message arrives
+    wait_seconds: float | None = None
 
     @model_validator(mode="after")
     def validate_time_parameters(self):
@@ -78,6 +89,7 @@ class FetchSlackMessagesRequest(BaseModel):
 class Message(BaseModel):
     message_id: str | None = None
     message_text: str
+    sender: str | None = None
     timestamp: datetime
 
     @model_validator(mode="after")
@@ -88,3 +100,7 @@ class Message(BaseModel):
 
 class FetchMessagesResponse(BaseModel):
     messages: list[Message]
+
+
+class CancelTaskRequest(BaseModel):
+    task_id: str
@@ -8,7 +8,9 @@ import psutil
 from playwright.async_api import Download
 from pydantic import BaseModel, Field, model_validator
 
+from optexity.schema.recording import Recording
 from optexity.schema.token_usage import TokenUsage
+from optexity.schema.trace import Trace
 
 
 class NetworkRequest(BaseModel):
@@ -153,6 +155,8 @@ class Memory(BaseModel):
     downloads: list[Path] = Field(default_factory=list)
     final_screenshot: str | None = Field(default=None)
     system_info_tracking: list[SystemInfo] = Field(default_factory=list)
+    trace: Trace = Field(default_factory=Trace)
+    recording: Recording = Field(default_factory=Recording)
     unique_child_arn: str
 
     model_config = {
@@ -0,0 +1,60 @@
+from contextvars import ContextVar
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from optexity.schema.trace import get_current_step_index
+
+_current_recording: ContextVar["Recording | None"] = ContextVar(
+    "current_recording", default=None
+)
+
+
+class LLMCallRecord(BaseModel):
+    step_index: int
+    model_name: str
+    ## None for plain text responses
+    schema_name: str | None = None
+    response: Any
+
+
+class NetworkRecord(BaseModel):
+    step_index: int
+    method: str
+    url: str
+    status: int
+    headers: dict[str, str] = Field(default_factory=dict)
+    ## Name of the body file in the network directory, None when there is no body
+    body_file: str | None = None
+
+
+class Recording(BaseModel):
+    """
+    Everything a run received from outside the engine: LLM answers and, when
+    RECORD_NETWORK_TRAFFIC is on, network responses. Consumed by the replay engine.
+    """
+
+    llm_calls: list[LLMCallRecord] = Field(default_factory=list)
+    network: list[NetworkRecord] = Field(default_factory=list)
+
+    def llm_calls_for_step(self, step_index: int) -> list[LLMCallRecord]:
+        return [call for call in self.llm_calls if call.step_index == step_index]
+
+
+def set_current_recording(recording: Recording | None):
+    _current_recording.set(recording)
+
+
+def record_llm_call(model_name: str, schema_name: str | None, response: Any):
+    """Appends an LLM answer to the current run's recording, or does nothing outside a run."""
+    recording = _current_recording.get()
+    if recording is None:
+        return
+    recording.llm_calls.append(
+        LLMCallRecord(
+            step_index=get_current_step_index(),
+            model_name=model_name,
+            schema_name=schema_name,
+            response=response,
+        )
+    )
@@ -2,7 +2,7 @@ import base64
 import json
 import string
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from io import BytesIO
 from pathlib import Path
 from typing import Literal, Optional
@@ -11,8 +11,9 @@ from PIL import Image
 from pydantic import BaseModel, Field, computed_field, model_validator
 
 from optexity.schema.automation import Automation, SecureParameter
-from optexity.schema.memory import ForLoopStatus, SystemInfo
+from optexity.schema.memory import ForLoopStatus, OutputData, SystemInfo
 from optexity.schema.token_usage import TokenUsage
+from optexity.utils.settings import settings
 
 BASE62 = string.digits + string.ascii_lowercase + string.ascii_uppercase
 
@@ -26,6 +27,9 @@ def uuid_str_to_base62(uuid_str: str) -> str:
     return "".join(reversed(out))
 
 
+TaskPriority = Literal["interactive", "normal", "batch"]
+
+
 class CallbackUrl(BaseModel):
     url: str
     api_key: str | None = None
@@ -68,11 +72,17 @@ class Task(BaseModel):
     use_proxy: bool = False
 
     dedup_key: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    ## Opt-in, coalesces with identical tasks and reuses their recent result
+    deduplicate: bool = False
     retry_count: int = 0
     max_retries: int = 1
     api_key: str
     callback_url: CallbackUrl | None = None
     is_dedicated: bool = False
+    priority: TaskPriority = "normal"
+    ## Overrides automation.timeout_seconds, deadline_at is set when the task starts
+    timeout_seconds: float | None = None
+    deadline_at: Optional[datetime] = None
 
     class Config:
         json_encoders = {datetime: lambda v: v.isoformat() if v is not None else None}
@@ -97,6 +107,16 @@ class Task(BaseModel):
     def log_file_path(self) -> Path:
         return self.logs_directory / "optexity.log"
 
+    @computed_field
+    @property
+    def worker_metrics_path(self) -> Path:
+        return self.task_directory / "worker_metrics.json"
+
+    @computed_field
+    @property
+    def result_path(self) -> Path:
+        return self.task_directory / "result.json"
+
     @model_validator(mode="after")
     def validate_unique_parameters(self):
         ## TODO: we do not do dedup using secure parameters yet, need to add support for that
@@ -131,6 +151,19 @@ class Task(BaseModel):
 
         return self
 
+    def get_timeout_seconds(self) -> float:
+        if self.timeout_seconds is not None:
+            return self.timeout_seconds
+        if self.automation.timeout_seconds is not None:
+            return self.automation.timeout_seconds
+        return settings.TASK_TIMEOUT_SECONDS
+
+    def get_remaining_seconds(self) -> float | None:
+        """Seconds left before deadline_at, None if the task has no deadline yet."""
+        if self.deadline_at is None:
+            return None
+        return max(0.0, (self.deadline_at - datetime.now(timezone.utc)).total_seconds())
+
     def proxy_session_id(
         self, proxy_provider: Literal["oxylabs", "brightdata", "other"] | None
     ) -> str | None:
@@ -142,6 +175,16 @@ class Task(BaseModel):
             return "default"
 
 
+class TaskResult(BaseModel):
+    """What a finished task reported, kept so duplicate tasks can be answered from it."""
+
+    status: Literal["success", "failed", "cancelled"]
+    error: str | None = None
+    output_data: list[OutputData] = Field(default_factory=list)
+    for_loop_status: list[list[ForLoopStatus]] = Field(default_factory=list)
+    final_screenshot: str | None = None
+
+
 class TaskCreateRequest(BaseModel):
     task_id: str
     recording_id: str
@@ -1,4 +1,37 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+
+class TierUsage(BaseModel):
+    calls: int = 0
+    escalations: int = 0
+    latency_seconds: float = 0
+    total_cost: float = 0
+
+    def __add__(self, other: "TierUsage") -> "TierUsage":
+        return TierUsage(
+            calls=self.calls + other.calls,
+            escalations=self.escalations + other.escalations,
+            latency_seconds=self.latency_seconds + other.latency_seconds,
+            total_cost=self.total_cost + other.total_cost,
+        )
+
+    def __sub__(self, other: "TierUsage") -> "TierUsage":
+        return TierUsage(
+            calls=self.calls - other.calls,
+            escalations=self.escalations - other.escalations,
+            latency_seconds=self.latency_seconds - other.latency_seconds,
+            total_cost=self.total_cost - other.total_cost,
+        )
+
+
+def merge_tier_usage(
+    a: dict[str, TierUsage], b: dict[str, TierUsage], subtract: bool = False
+) -> dict[str, TierUsage]:
+    merged = dict(a)
+    for model_name, usage in b.items():
+        current = merged.get(model_name, TierUsage())
+        merged[model_name] = current - usage if subtract else current + usage
+    return merged
 
 
 class TokenUsage(BaseModel):
@@ -15,6 +48,9 @@ class TokenUsage(BaseModel):
     thoughts_cost: float = 0
     total_cost: float = 0
 
+    ## Per model latency and cost of calls made through TieredModelRouter
+    tier_usage: dict[str, TierUsage] = Field(default_factory=dict)
+
     def __add__(self, other: "TokenUsage") -> "TokenUsage":
         return TokenUsage(
             input_tokens=self.input_tokens + other.input_tokens,
@@ -29,6 +65,7 @@ class TokenUsage(BaseModel):
             tool_use_cost=self.tool_use_cost + other.tool_use_cost,
             thoughts_cost=self.thoughts_cost + other.thoughts_cost,
             total_cost=self.total_cost + other.total_cost,
+            tier_usage=merge_tier_usage(self.tier_usage, other.tier_usage),
         )
 
     def __sub__(self, other: "TokenUsage") -> "TokenUsage":
@@ -45,4 +82,7 @@ class TokenUsage(BaseModel):
             tool_use_cost=self.tool_use_cost - other.tool_use_cost,
             thoughts_cost=self.thoughts_cost - other.thoughts_cost,
             total_cost=self.total_cost - other.total_cost,
+            tier_usage=merge_tier_usage(
+                self.tier_usage, other.tier_usage, subtract=True
+            ),
         )
@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Literal
+
+from pydantic import BaseModel, Field, PrivateAttr
+
+SpanCategory = Literal[
+    "task", "node", "action", "try", "llm", "cdp", "sleep", "upload", "io"
+]
+
+_current_trace: ContextVar["Trace | None"] = ContextVar("current_trace", default=None)
+_current_span_id: ContextVar[int | None] = ContextVar("current_span_id", default=None)
+
+
+class Span(BaseModel):
+    id: int
+    parent_id: int | None = None
+    name: str
+    category: SpanCategory
+    step_index: int
+    ## Thread or asyncio task the span ran on, exported as the Chrome trace tid
+    track: int = 1
+    start_us: float
+    duration_us: float | None = None
+    attributes: dict[str, Any] = Field(default_factory=dict)
+
+
+class Trace(BaseModel):
+    """
+    Nested timing spans for one automation run (task -> node -> action -> try ->
+    llm / cdp / upload). Exported in Chrome trace event format, which can be opened
+    in chrome://tracing or Perfetto.
+    """
+
+    spans: list[Span] = Field(default_factory=list)
+    step_index: int = -1
+    ## Track names by track, spans of concurrent tasks and threads go on separate tracks
+    track_names: dict[int, str] = Field(default_factory=dict)
+
+    _span_ids: Iterator[int] = PrivateAttr()
+    _tracks: dict[tuple[int, int | None], int] = PrivateAttr(default_factory=dict)
+    _tracks_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context: Any):
+        self._span_ids = itertools.count(len(self.spans))
+
+    def get_track(self) -> int:
+        """Track of the calling thread and asyncio task, allocated on first use."""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        thread = threading.current_thread()
+        key = (thread.ident or 0, id(task) if task is not None else None)
+        with self._tracks_lock:
+            if key not in self._tracks:
+                track = len(self._tracks) + 1
+                self._tracks[key] = track
+                self.track_names[track] = (
+                    task.get_name() if task is not None else thread.name
+                )
+            return self._tracks[key]
+
+    @contextmanager
+    def span(
+        self, name: str, category: SpanCategory, **attributes: Any
+    ) -> Iterator[Span]:
+        span = Span(
+            id=next(self._span_ids),
+            parent_id=_current_span_id.get(),
+            name=name,
+            category=category,
+            step_index=self.step_index,
+            track=self.get_track(),
+            start_us=time.time() * 1e6,
+            attributes=attributes,
+        )
+        self.spans.append(span)
+        token = _current_span_id.set(span.id)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration_us = (time.perf_counter() - start) * 1e6
+            _current_span_id.reset(token)
+
+    def to_chrome_trace(self, step_index: int | None = None) -> dict:
+        now_us = time.time() * 1e6
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": track,
+                "args": {"name": track_name},
+            }
+            for track, track_name in self.track_names.items()
+        ]
+        for span in self.spans:
+            if step_index is not None and span.step_index != step_index:
+                continue
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": round(span.start_us),
+                    "dur": round(
+                        span.duration_us
+                        if span.duration_us is not None
+                        else now_us - span.start_us
+                    ),
+                    "pid": 1,
+                    "tid": span.track,
+                    "args": {
+                        "id": span.id,
+                        "parent_id": span.parent_id,
+                        "step_index": span.step_index,
+                        **span.attributes,
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def set_current_trace(trace: Trace | None):
+    _current_trace.set(trace)
+
+
+def get_current_step_index() -> int:
+    trace = _current_trace.get()
+    if trace is None:
+        return -1
+    return trace.step_index
+
+
+@contextmanager
+def trace_span(
+    name: str, category: SpanCategory, **attributes: Any
+) -> Iterator[Span | None]:
+    """Records a span on the current run's trace, or does nothing outside a run."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, category, **attributes) as span:
+        yield span
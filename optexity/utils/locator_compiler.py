@@ -0,0 +1,139 @@
+import ast
+import re
+from functools import lru_cache
+from typing import Any
+
+## Methods and properties a command may chain, starting from the page
+LOCATOR_METHODS = {
+    "locator",
+    "get_by_role",
+    "get_by_text",
+    "get_by_label",
+    "get_by_placeholder",
+    "get_by_alt_text",
+    "get_by_title",
+    "get_by_test_id",
+    "frame_locator",
+    "nth",
+    "filter",
+    "and_",
+    "or_",
+}
+LOCATOR_PROPERTIES = {"first", "last", "content_frame", "owner"}
+REGEX_FLAGS = {"I", "IGNORECASE", "M", "MULTILINE", "S", "DOTALL", "X", "VERBOSE"}
+
+## {variable[index]} placeholders are replaced before the command runs
+PLACEHOLDER_PATTERN = re.compile(r"\{[A-Za-z_][^{}\"']*\}")
+
+
+class CompiledLocator:
+    """A parsed command: the chain of locator calls to apply to a page."""
+
+    def __init__(self, steps: list[tuple[str, tuple, dict] | str]):
+        self.steps = steps
+
+    def build(self, page):
+        locator = page
+        for step in self.steps:
+            if isinstance(step, str):
+                locator = getattr(locator, step)
+                continue
+            method, args, kwargs = step
+            locator = getattr(locator, method)(
+                *[_build_value(value, page) for value in args],
+                **{key: _build_value(value, page) for key, value in kwargs.items()},
+            )
+        return locator
+
+
+def _build_value(value: Any, page) -> Any:
+    if isinstance(value, CompiledLocator):
+        return value.build(page)
+    if isinstance(value, list):
+        return [_build_value(v, page) for v in value]
+    return value
+
+
+def _compile_chain(node: ast.expr) -> list:
+    if isinstance(node, ast.Name) and node.id == "page":
+        return []
+    if isinstance(node, ast.Attribute):
+        if node.attr not in LOCATOR_PROPERTIES:
+            raise ValueError(f"unsupported property {node.attr}")
+        return _compile_chain(node.value) + [node.attr]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        method = node.func.attr
+        if method not in LOCATOR_METHODS:
+            raise ValueError(f"unsupported method {method}")
+        if any(keyword.arg is None for keyword in node.keywords):
+            raise ValueError(f"** arguments are not supported in {method}")
+        args = tuple(_compile_value(arg) for arg in node.args)
+        kwargs = {
+            keyword.arg: _compile_value(keyword.value) for keyword in node.keywords
+        }
+        return _compile_chain(node.func.value) + [(method, args, kwargs)]
+    raise ValueError(f"unsupported expression {ast.unparse(node)}")
+
+
+def _compile_regex_flags(node: ast.expr) -> int:
+    if (
+        isinstance(node, ast.Attribute)
+        and isinstance(node.value, ast.Name)
+        and node.value.id == "re"
+        and node.attr in REGEX_FLAGS
+    ):
+        return getattr(re, node.attr)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.BitOr):
+        return _compile_regex_flags(node.left) | _compile_regex_flags(node.right)
+    raise ValueError(f"unsupported regex flags {ast.unparse(node)}")
+
+
+def _compile_value(node: ast.expr) -> Any:
+    if isinstance(node, ast.Constant):
+        return node.value
+    if (
+        isinstance(node, ast.UnaryOp)
+        and isinstance(node.op, ast.USub)
+        and isinstance(node.operand, ast.Constant)
+        and isinstance(node.operand.value, (int, float))
+    ):
+        return -node.operand.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [_compile_value(element) for element in node.elts]
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id == "re"
+        and node.func.attr == "compile"
+    ):
+        if len(node.args) == 0 or not isinstance(node.args[0], ast.Constant):
+            raise ValueError("re.compile needs a string pattern")
+        flags = 0
+        if len(node.args) > 1:
+            flags = _compile_regex_flags(node.args[1])
+        for keyword in node.keywords:
+            if keyword.arg != "flags":
+                raise ValueError(f"unsupported re.compile argument {keyword.arg}")
+            flags = _compile_regex_flags(keyword.value)
+        return re.compile(node.args[0].value, flags)
+    ## Nested locators, e.g. filter(has=page.locator("...")), are built against the same page
+    return CompiledLocator(_compile_chain(node))
+
+
+@lru_cache(maxsize=2048)
+def compile_locator_command(command: str) -> CompiledLocator:
+    """Parses a Playwright locator command such as get_by_role("button", name="Save").nth(0)."""
+    try:
+        tree = ast.parse(f"page.{command.strip()}", mode="eval")
+        steps = _compile_chain(tree.body)
+    except (SyntaxError, TypeError, ValueError, re.error) as e:
+        raise ValueError(f"Invalid locator command `{command}`: {e}")
+    if len(steps) == 0:
+        raise ValueError(f"Invalid locator command `{command}`: no locator")
+    return CompiledLocator(steps)
+
+
+def validate_locator_command(command: str):
+    """Checks a command that may still hold {variable} placeholders."""
+    compile_locator_command(PLACEHOLDER_PATTERN.sub("0", command))
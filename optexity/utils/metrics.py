@@ -0,0 +1,333 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict[str, str]) -> tuple[str, ...]:
+    if set(labels.keys()) != set(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {list(labels.keys())}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: tuple[str, ...], key: tuple[str, ...], **extra) -> str:
+    pairs = list(zip(labelnames, key)) + list(extra.items())
+    if len(pairs) == 0:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: list[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: list[str]):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(
+                    f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                )
+        return lines
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {"|".join(key): value for key, value in self.values.items()}
+
+    def merge(self, snapshot: dict):
+        with self.lock:
+            for joined_key, value in snapshot.items():
+                key = tuple(joined_key.split("|")) if self.labelnames else ()
+                self.values[key] = self.values.get(key, 0) + value
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: list[str]):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = value
+
+    def set_max(self, value: float, **labels: str):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = max(self.values.get(key, value), value)
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for key, value in self.values.items():
+                lines.append(
+                    f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+                )
+        return lines
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: list[str],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        ## per label key: (per bucket counts, sum, count)
+        self.values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = _label_key(self.labelnames, labels)
+        with self.lock:
+            counts, total, count = self.values.get(
+                key, ([0] * len(self.buckets), 0.0, 0)
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        with self.lock:
+            for key, (counts, total, count) in self.values.items():
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.labelnames, key, le=bound)
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.labelnames, key, le="+Inf")
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "|".join(key): [list(counts), total, count]
+                for key, (counts, total, count) in self.values.items()
+            }
+
+    def merge(self, snapshot: dict):
+        with self.lock:
+            for joined_key, (counts, total, count) in snapshot.items():
+                key = tuple(joined_key.split("|")) if self.labelnames else ()
+                current_counts, current_total, current_count = self.values.get(
+                    key, ([0] * len(self.buckets), 0.0, 0)
+                )
+                self.values[key] = (
+                    [a + b for a, b in zip(current_counts, counts)],
+                    current_total + total,
+                    current_count + count,
+                )
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus text-format registry. Counters and histograms recorded in
+    the worker process are carried back to the server with snapshot()/merge().
+    """
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+
+    def counter(
+        self, name: str, documentation: str, labelnames: list[str] | None = None
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames or []))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: list[str] | None = None
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames or []))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: list[str] | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames or [], buckets))
+
+    def _register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        return {
+            name: metric.snapshot()
+            for name, metric in self.metrics.items()
+            if isinstance(metric, (Counter, Histogram))
+        }
+
+    def merge(self, snapshot: dict):
+        for name, values in snapshot.items():
+            metric = self.metrics.get(name)
+            if isinstance(metric, (Counter, Histogram)):
+                metric.merge(values)
+
+    def save_snapshot(self, path: Path):
+        try:
+            path.write_text(json.dumps(self.snapshot()))
+        except Exception as e:
+            logger.error(f"Failed to save metrics snapshot: {e}")
+
+    def merge_snapshot_file(self, path: Path):
+        try:
+            if path.exists():
+                self.merge(json.loads(path.read_text()))
+        except Exception as e:
+            logger.error(f"Failed to merge metrics snapshot: {e}")
+
+
+metrics = MetricsRegistry()
+
+TASK_QUEUE_DEPTH = metrics.gauge(
+    "optexity_task_queue_depth", "Number of tasks waiting in the local queue"
+)
+TASK_RUNNING = metrics.gauge(
+    "optexity_task_running", "1 if a task is currently running, else 0"
+)
+TASKS_TOTAL = metrics.counter(
+    "optexity_tasks_total", "Tasks finished by the task processor", ["result"]
+)
+TASK_DURATION_SECONDS = metrics.histogram(
+    "optexity_task_duration_seconds", "Wall-clock duration of a task"
+)
+TASK_QUEUE_WAIT_SECONDS = metrics.histogram(
+    "optexity_task_queue_wait_seconds", "Time a task spent in the local queue"
+)
+BROWSER_START_SECONDS = metrics.histogram(
+    "optexity_browser_start_seconds", "Time to launch the actual browser"
+)
+BROWSER_RESTARTS_TOTAL = metrics.counter(
+    "optexity_browser_restarts_total", "Actual browser restarts", ["reason"]
+)
+LLM_CALL_SECONDS = metrics.histogram(
+    "optexity_llm_call_seconds", "Latency of a single LLM call", ["model"]
+)
+LLM_ERRORS_TOTAL = metrics.counter(
+    "optexity_llm_errors_total", "Failed LLM calls", ["model", "rate_limited"]
+)
+LLM_RATE_LIMIT_WAIT_SECONDS = metrics.histogram(
+    "optexity_llm_rate_limit_wait_seconds",
+    "Time an LLM call waited for the node-wide rate limiter",
+    ["model", "priority"],
+)
+LLM_RATE_LIMITED_TOTAL = metrics.counter(
+    "optexity_llm_rate_limited_total",
+    "Rate limit responses from the LLM provider",
+    ["model"],
+)
+UPLOAD_SECONDS = metrics.histogram(
+    "optexity_upload_seconds", "Latency of uploads to the server", ["kind"]
+)
+UPLOAD_ERRORS_TOTAL = metrics.counter(
+    "optexity_upload_errors_total", "Failed uploads to the server", ["kind"]
+)
+TASKS_DEDUPLICATED_TOTAL = metrics.counter(
+    "optexity_tasks_deduplicated_total",
+    "Tasks answered without running, by coalescing or from the result cache",
+    ["reason"],
+)
+COALESCED_WAITING_TASKS = metrics.gauge(
+    "optexity_coalesced_waiting_tasks", "Duplicate tasks waiting on an in-flight task"
+)
+RESULT_CACHE_ENTRIES = metrics.gauge(
+    "optexity_result_cache_entries", "Task results kept for deduplication"
+)
+MEMORY_USED_MB = metrics.gauge(
+    "optexity_memory_used_mb", "Container memory used at the last sample"
+)
+MEMORY_HIGH_WATER_MB = metrics.gauge(
+    "optexity_memory_high_water_mb", "Highest container memory used since start"
+)
+RESOURCES_BLOCKED_TOTAL = metrics.counter(
+    "optexity_resources_blocked_total",
+    "Requests aborted by an automation's resource blocking policy",
+)
+ASSET_CACHE_REQUESTS_TOTAL = metrics.counter(
+    "optexity_asset_cache_requests_total",
+    "Cacheable asset requests by result (hit, revalidated, miss)",
+)
+BROWSER_RSS_MB = metrics.gauge(
+    "optexity_browser_rss_mb", "RSS of all browser processes at the last sample"
+)
+
+
+@contextmanager
+def track_upload(kind: str):
+    start = time.monotonic()
+    try:
+        yield
+    except Exception:
+        UPLOAD_ERRORS_TOTAL.inc(kind=kind)
+        raise
+    finally:
+        UPLOAD_SECONDS.observe(time.monotonic() - start, kind=kind)
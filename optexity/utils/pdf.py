@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+logger = logging.getLogger(__name__)
+
+
+def get_file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_page_count(path: Path) -> int:
+    return len(PdfReader(path).pages)
+
+
+def split_pdf(
+    path: Path, pages_per_chunk: int, directory: Path
+) -> list[tuple[Path, int, int]]:
+    """Writes page ranges of path to directory, returns (chunk, first page, last page) with 1-based pages."""
+    reader = PdfReader(path)
+    chunks = []
+    for start in range(0, len(reader.pages), pages_per_chunk):
+        end = min(start + pages_per_chunk, len(reader.pages))
+        writer = PdfWriter()
+        for page in reader.pages[start:end]:
+            writer.add_page(page)
+        chunk_path = directory / f"{path.stem}_pages_{start + 1}_{end}.pdf"
+        with open(chunk_path, "wb") as f:
+            writer.write(f)
+        chunks.append((chunk_path, start + 1, end))
+    return chunks
+
+
+def is_missing(value) -> bool:
+    ## Chunks leave fields they cannot see empty rather than absent
+    return value is None or value == "" or value == [] or value == {}
+
+
+def merge_extraction_results(results: list[dict]) -> dict:
+    """
+    Merges the answers extracted from chunks of one document: lists are concatenated,
+    nested objects merged field by field, and other fields take the first value found.
+    """
+    merged = {}
+    for result in results:
+        for key, value in result.items():
+            current = merged.get(key)
+            if key not in merged or (is_missing(current) and not is_missing(value)):
+                merged[key] = value
+            elif isinstance(current, list) and isinstance(value, list):
+                merged[key] = current + value
+            elif isinstance(current, dict) and isinstance(value, dict):
+                merged[key] = merge_extraction_results([current, value])
+    return merged
+
+
+def extract_text_pages(path: Path) -> list[str]:
+    """Text layer of every page, laid out so table columns stay aligned."""
+    pages = []
+    for page in PdfReader(path).pages:
+        try:
+            pages.append(page.extract_text(extraction_mode="layout"))
+        except Exception:
+            pages.append(page.extract_text())
+    return pages
+
+
+def has_text_layer(pages: list[str], min_chars_per_page: int) -> bool:
+    if len(pages) == 0:
+        return False
+    total_chars = sum(len(page.strip()) for page in pages)
+    return total_chars >= min_chars_per_page * len(pages)
+
+
+def group_text_pages(pages: list[str], max_chars: int) -> list[list[tuple[int, str]]]:
+    """
+    Groups the non-empty pages, as (page number, text), into consecutive page ranges
+    of at most max_chars each. A page longer than max_chars gets a range of its own.
+    """
+    groups = []
+    current = []
+    current_chars = 0
+    for index, page in enumerate(pages):
+        if not page.strip():
+            continue
+        if len(current) > 0 and current_chars + len(page) > max_chars:
+            groups.append(current)
+            current = []
+            current_chars = 0
+        current.append((index + 1, page))
+        current_chars += len(page)
+    if len(current) > 0:
+        groups.append(current)
+    return groups
+
+
+def extract_with_patterns(
+    text: str, extraction_format: dict, field_patterns: dict[str, str]
+) -> dict | None:
+    """
+    Fills a flat extraction_format from the first capture group of each field's
+    regex. Returns None unless every field is matched, so the caller can fall back.
+    """
+    result = {}
+    for key, value_type in extraction_format.items():
+        pattern = field_patterns.get(key)
+        if not isinstance(value_type, str) or pattern is None:
+            return None
+        match = re.search(pattern, text, re.MULTILINE)
+        if match is None:
+            return None
+        value = (match.group(1) if match.groups() else match.group(0)).strip()
+        if value_type in ("int", "float"):
+            value = re.sub(r"[^0-9.\-]", "", value)
+        result[key] = value
+    return result
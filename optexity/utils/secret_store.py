@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+import pyotp
+
+from optexity.utils.settings import settings
+from optexity.utils.utils import get_onepassword_value
+
+logger = logging.getLogger(__name__)
+
+_current_secret_store: ContextVar["SecretStore | None"] = ContextVar(
+    "current_secret_store", default=None
+)
+
+OnePasswordReference = tuple[str, str, str]
+
+
+class SecretValue:
+    """
+    A resolved secret that reprs and logs as ****. reveal returns a plain str, so
+    the plaintext also lives in the fields and Playwright calls it is passed to;
+    clear only wipes this copy.
+    """
+
+    def __init__(self, value: str):
+        self._buffer = bytearray(value.encode())
+
+    def reveal(self) -> str:
+        return self._buffer.decode()
+
+    def clear(self):
+        for i in range(len(self._buffer)):
+            self._buffer[i] = 0
+        self._buffer = bytearray()
+
+    def __repr__(self) -> str:
+        return "SecretValue(****)"
+
+
+class SecretStore:
+    """
+    Per-task store of resolved 1Password values. prefetch resolves every
+    reference concurrently in the background, and lookups of a reference still in
+    flight wait on that fetch instead of starting another one.
+    """
+
+    def __init__(self):
+        self.values: dict[OnePasswordReference, SecretValue] = {}
+        self.fetches: dict[OnePasswordReference, asyncio.Task] = {}
+
+    def _fetch(self, reference: OnePasswordReference) -> asyncio.Task:
+        fetch = self.fetches.get(reference)
+        ## A failed prefetch is retried once the value is actually needed
+        if fetch is not None and fetch.done() and not fetch.cancelled():
+            if fetch.exception() is not None:
+                del self.fetches[reference]
+        if reference not in self.fetches:
+            self.fetches[reference] = asyncio.create_task(
+                get_onepassword_value(*reference)
+            )
+        return self.fetches[reference]
+
+    async def prefetch(self, references: list[OnePasswordReference]):
+        start = time.monotonic()
+        results = await asyncio.gather(
+            *[self.get(reference) for reference in set(references)],
+            return_exceptions=True,
+        )
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        logger.info(
+            f"Prefetched {len(results) - failed} of {len(results)} secrets in {time.monotonic() - start:.2f}s"
+        )
+
+    async def get(self, reference: OnePasswordReference) -> str:
+        if reference not in self.values:
+            value = await self._fetch(reference)
+            if reference not in self.values:
+                self.values[reference] = SecretValue(value)
+        return self.values[reference].reveal()
+
+    def clear(self):
+        for fetch in self.fetches.values():
+            fetch.cancel()
+        for value in self.values.values():
+            value.clear()
+        self.fetches = {}
+        self.values = {}
+        ## Drops the plaintext kept by the 1Password lookup cache
+        get_onepassword_value.cache_clear()
+
+
+def set_current_secret_store(store: SecretStore | None):
+    _current_secret_store.set(store)
+
+
+async def resolve_onepassword_value(
+    vault_name: str, item_name: str, field_name: str
+) -> str:
+    store = _current_secret_store.get()
+    if store is None:
+        return await get_onepassword_value(vault_name, item_name, field_name)
+    return await store.get((vault_name, item_name, field_name))
+
+
+async def get_fresh_totp_code(totp_secret: str, digits: int = 6) -> str:
+    """Generates a TOTP code, waiting for the next window if the current one is about to expire."""
+    totp = pyotp.TOTP(totp_secret, digits=digits)
+    remaining = totp.interval - time.time() % totp.interval
+    if remaining < settings.TOTP_MIN_VALIDITY_SECONDS:
+        logger.debug(f"TOTP code expires in {remaining:.1f}s, waiting for the next one")
+        await asyncio.sleep(remaining)
+    return totp.now()
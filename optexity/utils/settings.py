@@ -1,5 +1,6 @@
 import logging
 import os
+from datetime import timedelta
 from typing import Literal
 
 from pydantic import model_validator
@@ -42,12 +43,105 @@ class Settings(BaseSettings):
     PROXY_COUNTRY: str | None = None
     PROXY_PROVIDER: Literal["oxylabs", "brightdata", "other"] | None = None
 
+    LLM_DEFAULT_REQUESTS_PER_MINUTE: int = 1000
+    LLM_DEFAULT_TOKENS_PER_MINUTE: int = 1_000_000
+    ## e.g. {"gemini-2.5-flash": {"requests_per_minute": 1000, "tokens_per_minute": 1000000}}
+    LLM_RATE_LIMITS: dict[str, dict[str, int]] = {}
+    ## Shared by every worker on the node so the limits hold across tasks
+    LLM_RATE_LIMITER_PATH: str = "/tmp/optexity/llm_rate_limiter.sqlite"
+
+    ## Coalesce tasks with the same user, recording, endpoint and unique parameters, and answer repeats from recent results.
+    ## Only tasks that set deduplicate take part, this switches it off for the whole node.
+    TASK_DEDUP_ENABLED: bool = True
+    TASK_RESULT_CACHE_TTL_SECONDS: float = 600
+    TASK_RESULT_CACHE_MAX_ENTRIES: int = 100
+
+    ## Default run time limit, and how long a cancelled worker may take to report before SIGKILL
+    TASK_TIMEOUT_SECONDS: float = 600
+    TASK_KILL_GRACE_SECONDS: float = 30
+
+    ## Non-dedicated browsers start from a copy-on-write clone of a prepared profile
+    USE_PROFILE_TEMPLATE: bool = True
+    PROFILE_TEMPLATE_SETTLE_SECONDS: float = 3
+
+    ## Opt-in disk cache of static assets shared by all browsers on the node
+    ASSET_CACHE_ENABLED: bool = False
+    ASSET_CACHE_DIRECTORY: str = "/tmp/optexity/asset_cache"
+    ASSET_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    ASSET_CACHE_RESOURCE_TYPES: list[str] = ["script", "stylesheet", "font", "image"]
+
+    ## 2FA message polling: long-poll wait per request, then backoff between polls
+    TWO_FA_LONG_POLL_SECONDS: float = 20
+    TWO_FA_INITIAL_POLL_INTERVAL_SECONDS: float = 0.5
+    TWO_FA_POLL_BACKOFF: float = 1.5
+
+    ## TOTP codes closer than this to expiry are skipped for the next one
+    TOTP_MIN_VALIDITY_SECONDS: float = 3
+
+    ## Accepts IfElseNode conditions that use syntax or names the condition checks reject
+    ALLOW_UNRESTRICTED_CONDITIONS: bool = False
+
+    ## Deferred LLM extractions with the same model and format are sent this many per request
+    DEFERRED_EXTRACTION_BATCH_SIZE: int = 10
+
+    ## Larger PDFs are uploaded once per content hash, long ones are split into page ranges
+    PDF_INLINE_MAX_BYTES: int = 4 * 1024 * 1024
+    PDF_UPLOAD_CACHE_SECONDS: float = 47 * 60 * 60
+    PDF_CHUNK_PAGES: int = 20
+    PDF_EXTRACTION_CONCURRENCY: int = 4
+
+    ## PDFs with this much text per page are extracted from their text layer
+    PDF_TEXT_LAYER_MIN_CHARS_PER_PAGE: int = 100
+    PDF_TEXT_MAX_CHARS: int = 200_000
+
+    ## smart_select: a single pattern this similar to an option is taken without the LLM,
+    ## otherwise the LLM only sees the top k candidates of large selects
+    SELECT_FUZZY_MATCH_THRESHOLD: float = 0.9
+    SELECT_LLM_TOP_K: int = 30
+    ## Below this trigram similarity, and with no word or acronym match, the LLM sees every option
+    SELECT_LLM_MIN_SIMILARITY: float = 0.5
+    SELECT_OPTION_INDEX_CACHE_SIZE: int = 64
+
+    ## Restarts a reused browser when any limit is hit
+    BROWSER_RECYCLE_CONTAINER_MEMORY_FRACTION: float = 0.6
+    BROWSER_RECYCLE_MAX_RSS_MB: float = 2048
+    BROWSER_RECYCLE_MAX_GROWTH_MB_PER_TASK: float = 100
+    BROWSER_RECYCLE_GROWTH_WINDOW: int = 5
+    BROWSER_RECYCLE_MAX_TABS: int = 20
+    BROWSER_RECYCLE_MAX_TASKS: int = 50
+    TASK_MEMORY_SAMPLE_INTERVAL_SECONDS: float = 1.0
+    ## Adds per-task process memory usage to output data as "memory_usage"
+    RECORD_TASK_MEMORY_USAGE: bool = True
+
+    ## Local task scheduling, weights default to 1.0 and domains are uncapped
+    TASK_PRIORITY_DEADLINE_SECONDS: dict[str, float] = {
+        "interactive": 120,
+        "normal": 900,
+        "batch": 3600,
+    }
+    TASK_USER_WEIGHTS: dict[str, float] = {}
+    TASK_ENDPOINT_WEIGHTS: dict[str, float] = {}
+    TASK_DOMAIN_CONCURRENCY: dict[str, int] = {}
+    TASK_FAIR_SHARE_HALF_LIFE_SECONDS: float = 600
+
+    ## "stub" is used by `optexity bench`, "replay" by `optexity replay`
+    LLM_BACKEND: Literal["live", "stub", "replay"] = "live"
+    ## Saves every network response under logs/network so the run can be replayed
+    RECORD_NETWORK_TRAFFIC: bool = False
+
     @model_validator(mode="after")
     def validate_local_callback_url(self):
         if self.DEPLOYMENT == "prod" and self.LOCAL_CALLBACK_URL is not None:
             raise ValueError("LOCAL_CALLBACK_URL is not allowed in prod mode")
         return self
 
+    def get_task_deadline(self, priority: str) -> timedelta:
+        return timedelta(
+            seconds=self.TASK_PRIORITY_DEADLINE_SECONDS.get(
+                priority, self.TASK_PRIORITY_DEADLINE_SECONDS["normal"]
+            )
+        )
+
     class Config:
         env_file = env_path if env_path else None
         extra = "allow"
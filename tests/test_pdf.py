@@ -0,0 +1,25 @@
+from optexity.utils.pdf import merge_extraction_results
+
+
+def test_merge_extraction_results_fills_fields_left_empty_by_earlier_chunks():
+    chunks = [
+        {"name": "", "total": None, "items": [], "address": {"city": ""}},
+        {"name": "ACME", "total": 10, "items": [{"sku": "A"}], "address": {}},
+        {
+            "name": "Other",
+            "total": 20,
+            "items": [{"sku": "B"}],
+            "address": {"city": "Berlin"},
+        },
+    ]
+
+    assert merge_extraction_results(chunks) == {
+        "name": "ACME",
+        "total": 10,
+        "items": [{"sku": "A"}, {"sku": "B"}],
+        "address": {"city": "Berlin"},
+    }
+
+
+def test_merge_extraction_results_keeps_empty_fields_no_chunk_found():
+    assert merge_extraction_results([{"name": ""}, {"name": None}]) == {"name": ""}